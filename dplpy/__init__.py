@@ -50,12 +50,20 @@ if _missing_dependencies:  # pragma: no cover
 del _hard_dependencies, _dependency, _missing_dependencies
 
 
-from readers import readers
+from readers import readers, iter_series
+from readers_cache import ReadersCache
+from readers_incremental import IncrementalReader
+from collection import RingWidthCollection
+from read_many import read_many
+from convert import convert
+from catalog import RingWidthCatalog
+from readers_url import readers_url, readers_url_many
 from summary import summary
 from stats import stats
 from report import report
 from plot import plot
 from detrend import detrend
+from detrend_cache import DetrendCache, set_detrend_cache
 from autoreg import ar_func, autoreg
 from chron import chron
 from chron_stabilized import chron_stabilized
@@ -63,15 +71,27 @@ from xdate import xdate, xdate_plot
 from series_corr import series_corr
 from interseries_cor import interseries_cor
 from writers import writers
+from columnar import write_columnar, read_columnar, ColumnarWriter
 from cli import help, readme
 
 __all__ = [
     "readers",
+    "iter_series",
+    "ReadersCache",
+    "IncrementalReader",
+    "RingWidthCollection",
+    "read_many",
+    "convert",
+    "RingWidthCatalog",
+    "readers_url",
+    "readers_url_many",
     "summary",
     "stats",
     "report",
     "plot",
     "detrend",
+    "DetrendCache",
+    "set_detrend_cache",
     "ar_func",
     "autoreg",
     "chron",
@@ -81,6 +101,9 @@ __all__ = [
     "series_corr",
     "interseries_cor",
     "writers",
+    "write_columnar",
+    "read_columnar",
+    "ColumnarWriter",
     "help",
     "readme",
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
 from .command import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
@@ -32,8 +32,9 @@ from statsmodels.tsa.ar_model import ar_select_order
 import pandas as pd
 import numpy as np
 import warnings
+from parallel import check_n_jobs, is_numeric_frame, map_columns
 
-def ar_func(data: pd.DataFrame | pd.Series, max_lag=5) -> (pd.DataFrame | pd.Series):
+def ar_func(data: pd.DataFrame | pd.Series, max_lag=5, n_jobs=1, executor=None) -> (pd.DataFrame | pd.Series):
     """Auto Regressive (AR) functions 
       
     Extended Summary
@@ -48,6 +49,13 @@ def ar_func(data: pd.DataFrame | pd.Series, max_lag=5) -> (pd.DataFrame | pd.Ser
         from such a dataframe.
     lag: int, default 5
         max lag to consider when selecting the AR model.
+    n_jobs : int, default 1
+        number of worker processes the series of a dataframe are modeled in. None uses
+        all available cores. The values are shared with the workers through shared memory
+        and the results are the same as with n_jobs=1.
+    executor : concurrent.futures.Executor, optional
+        executor to run the chunks of series on instead of a new pool of n_jobs worker
+        processes. n_jobs then sets how many workers the series are split for.
    
     Returns
     -------
@@ -60,13 +68,17 @@ def ar_func(data: pd.DataFrame | pd.Series, max_lag=5) -> (pd.DataFrame | pd.Ser
     >>> dpl.ar_func(data['series name']) -> returns residuals plus mean of best fit 
                                             from AR models with max lag of either 5 
                                             (default) or specified number
+    >>> dpl.ar_func(data, n_jobs=8) -> models all series of the dataframe in 8 processes
     
     References
     ----------
     .. [1] https:/opendendro.org/dplpy-man/#ar_func 
     
     """
+    n_jobs = check_n_jobs(n_jobs)
     if isinstance(data, pd.DataFrame):
+        if (n_jobs > 1 or executor is not None) and is_numeric_frame(data):
+            return ar_func_frame(data, max_lag, n_jobs, executor)
         start_df = pd.DataFrame(index=pd.Index(data.index))
         to_concat = [start_df]
         for column in data.columns:
@@ -79,6 +91,23 @@ def ar_func(data: pd.DataFrame | pd.Series, max_lag=5) -> (pd.DataFrame | pd.Ser
     else:
         raise TypeError("Data argument should be either pandas dataframe or pandas series.")
 
+# Models the columns of a dataframe in worker processes with ar_columns, and gathers
+# their results in a dataframe laid out as the concatenation of ar_func() would be.
+def ar_func_frame(data: pd.DataFrame, max_lag, n_jobs, executor=None) -> pd.DataFrame:
+    values = data.to_numpy(dtype=float)
+    jobs = lambda start, stop: (data.index, data.columns[start:stop], max_lag)
+    outputs, _ = map_columns(ar_columns, values, jobs, [values.shape], n_jobs, executor)
+    return pd.DataFrame(outputs[0], index=pd.Index(data.index), columns=list(data.columns))
+
+# Models columns start:stop of the values of a dataframe in a worker process, writing the
+# residuals plus mean of each of them into the output in shared memory, at their years.
+def ar_columns(columns, job, values, outputs):
+    index, names, max_lag = job
+    start, stop = columns
+    for j, name in enumerate(names):
+        res = ar_func_series(pd.Series(values[:, start + j], index=index, name=name), max_lag)
+        outputs[0][index.get_indexer(res.index), start + j] = res.to_numpy()
+
 # This function returns residuals plus mean of the best fit AR
 # model of the data.
 def ar_func_series(data: pd.Series, max_lag) -> pd.Series: 
@@ -0,0 +1,253 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: catalog.py
+# Project: OpenDendro dplPy
+# Description: SQLite catalog of the series held in an archive of ring width files.
+#              Rwl files are scanned using only the series name and start year of
+#              each line and the number of values on it, without converting the ring
+#              widths, to record the first and last year, number of values and
+#              precision of every series. Files are only scanned again when their
+#              size or modification time changes, and queries on the catalog tell
+#              which files are worth reading.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> catalog = dpl.RingWidthCatalog("itrdb.sqlite")
+# >>> catalog.update("/itrdb/northamerica/usa", header=True)
+# >>> sites = catalog.files(start=1450, end=1500, min_series=10)
+# >>> data, errors = dpl.read_many(sites["path"].tolist(), header=True)
+
+import contextlib
+import os
+import sqlite3
+
+import pandas as pd
+from readers import resolve_input, open_input, open_text, split_rwl_line
+from read_many import find_files, site_name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS series (
+    path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE,
+    series TEXT NOT NULL,
+    first_year INTEGER,
+    last_year INTEGER,
+    count INTEGER NOT NULL,
+    precision REAL,
+    PRIMARY KEY (path, series)
+);
+CREATE INDEX IF NOT EXISTS series_years ON series (first_year, last_year);
+"""
+
+
+class RingWidthCatalog:
+    """Catalog of the series held in an archive of ring width files
+
+    Extended Summary
+    ----------------
+    Keeps, in a SQLite database, the first and last year, number of values
+    and precision of every series of every file added with update(). Rwl
+    files are scanned without converting their ring widths, and unchanged
+    files are skipped on later updates. files() and series() then find the
+    files or series covering a period, so batch jobs only read the files
+    they need.
+
+    Parameters
+    ----------
+    database : str
+        path of the SQLite database file, created if it doesn't exist.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> catalog = dpl.RingWidthCatalog("itrdb.sqlite")
+    >>> errors = catalog.update("/itrdb/northamerica/usa", header=True)
+    >>> catalog.files(start=1450, end=1500, min_series=10)
+    >>> catalog.series(start=1450, end=1500, site="ca533")
+
+    """
+
+    def __init__(self, database):
+        self.database = os.fspath(database)
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def connect(self):
+        db = sqlite3.connect(self.database)
+        db.execute("PRAGMA foreign_keys = ON")
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def update(self, paths, skip_lines=0, header=False):
+        """Adds files to the catalog, or scans them again if they changed
+
+        Parameters
+        ----------
+        paths : str or list of str
+            a directory (searched recursively), a glob pattern, or a list of
+            file paths, as in dpl.read_many().
+        skip_lines : int, default 0
+            lines to skip at the top of each file.
+        header : boolean, default False
+            whether a 3-line header is at the top of the .rwl files.
+
+        Returns
+        -------
+        errors : dict
+            error message for each file that couldn't be scanned.
+        """
+        errors = {}
+        with self.connect() as db:
+            known = {path: (mtime_ns, size, error) for path, mtime_ns, size, error
+                     in db.execute("SELECT path, mtime_ns, size, error FROM files")}
+
+            # Forget files that were removed from the disk
+            for path in known:
+                if not os.path.exists(resolve_input(path)[0]):
+                    db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+            for filename in find_files(paths):
+                path = os.path.abspath(filename)
+                stat = os.stat(resolve_input(path)[0])
+                if path in known and known[path][:2] == (stat.st_mtime_ns, stat.st_size):
+                    if known[path][2] is not None:
+                        errors[filename] = known[path][2]
+                    continue
+
+                try:
+                    rows = scan_file(path, skip_lines, header)
+                    error = None
+                except (OSError, ValueError, IndexError, KeyError) as err:
+                    rows = []
+                    error = type(err).__name__ + ": " + str(err).strip()
+                    errors[filename] = error
+
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+                db.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                           (path, site_name(path), stat.st_mtime_ns, stat.st_size, error))
+                db.executemany("INSERT INTO series VALUES (?, ?, ?, ?, ?, ?)",
+                               [(path,) + row for row in rows])
+        return errors
+
+    def files(self, start=None, end=None, min_series=1, site=None) -> pd.DataFrame:
+        """Files holding at least `min_series` series that cover every year from
+        `start` to `end`. Returns their path, site name and number of such series.
+        """
+        where, parameters = conditions(start, end, site)
+        query = ("SELECT files.path, files.site, COUNT(*) AS series FROM series JOIN files USING (path)"
+                 + where + " GROUP BY files.path HAVING COUNT(*) >= ? ORDER BY files.path")
+        with self.connect() as db:
+            return pd.read_sql_query(query, db, params=parameters + [min_series])
+
+    def series(self, start=None, end=None, site=None) -> pd.DataFrame:
+        """Series that cover every year from `start` to `end`, with the file
+        holding them, their first and last year, number of values and precision.
+        """
+        where, parameters = conditions(start, end, site)
+        query = ("SELECT files.path, files.site, series, first_year, last_year, count, precision"
+                 " FROM series JOIN files USING (path)" + where + " ORDER BY files.path, series.rowid")
+        with self.connect() as db:
+            return pd.read_sql_query(query, db, params=parameters)
+
+    def __len__(self):
+        with self.connect() as db:
+            return db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+# Builds the WHERE clause of catalog queries
+def conditions(start, end, site):
+    clauses, parameters = [], []
+    if start is not None:
+        clauses.append("first_year <= ?")
+        parameters.append(int(start))
+    if end is not None:
+        clauses.append("last_year >= ?")
+        parameters.append(int(end))
+    if site is not None:
+        clauses.append("files.site = ?")
+        parameters.append(site)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), parameters
+
+# Returns (series, first year, last year, number of values, precision) for each series of a file
+def scan_file(path, skip_lines, header):
+    name = resolve_input(path)[3].upper()
+    if name.endswith(".CSV"):
+        return scan_csv(path, skip_lines)
+    elif name.endswith((".RWL", ".RAW")):
+        return scan_rwl(path, skip_lines + 3 if header is True else skip_lines)
+    raise ValueError("unsupported file type: " + os.path.basename(path))
+
+# Reads the layout of the series of a .rwl file from the start year of each line and the
+# positions of its values and stop markers, without converting the values themselves.
+def scan_rwl(path, skip_lines):
+    series = {}
+    with open_text(path) as rwl_file:
+        for line_ct, line in enumerate(rwl_file, start=1):
+            line = line.rstrip("\n")
+            if line_ct <= skip_lines or len(line.strip()) < 7:
+                continue
+            try:
+                series_id, line_start, dataline = split_rwl_line(line)
+            except (ValueError, IndexError):
+                raise ValueError("Error reading line " + str(line_ct) + ": " + line.strip())
+            info = series.setdefault(series_id, {"first": None, "last": None, "years": set(), "precision": None})
+            for i, field in enumerate(dataline):
+                if field.strip() == "999":
+                    info["precision"] = 0.01
+                elif field.strip() == "-9999":
+                    info["precision"] = 0.001
+                else:
+                    info["years"].add(line_start + i)
+
+    rows = []
+    for series_id, info in series.items():
+        if info["precision"] is None:
+            raise ValueError("no stop marker found for series: " + series_id)
+        years = info["years"]
+        rows.append((series_id, min(years, default=None), max(years, default=None), len(years), info["precision"]))
+    return rows
+
+# Reads a .csv file and finds where each of its series starts and ends
+def scan_csv(path, skip_lines):
+    path_on_disk, compression, member, _ = resolve_input(path)
+    with open_input(path_on_disk, compression, member) as stream:
+        data = pd.read_csv(stream, skiprows=skip_lines).set_index("Year")
+    rows = []
+    for series_id, values in data.items():
+        values = values.dropna()
+        first = int(values.index[0]) if len(values) else None
+        last = int(values.index[-1]) if len(values) else None
+        rows.append((str(series_id), first, last, len(values), None))
+    return rows
@@ -38,10 +38,11 @@ import pandas as pd
 import numpy as np
 from tbrm import tbrm
 from autoreg import ar_func
+from collection import RingWidthCollection
 
 # Main function for creating chronology of series. Formats input, prewhitens if necessary
 # and produces output mean value chronology in a dataframe.
-def chron(rwi_data: pd.DataFrame, biweight=True, prewhiten=False, plot=True):
+def chron(rwi_data: pd.DataFrame | RingWidthCollection, biweight=True, prewhiten=False, plot=True):
     """Creates a mean value chronology for a dataset of tree-ring widths.
     
     Extended Summary
@@ -55,8 +56,8 @@ def chron(rwi_data: pd.DataFrame, biweight=True, prewhiten=False, plot=True):
     
     Parameters
     ----------
-    data : pandas dataframe
-        a pandas dataframe imported from dpl.readers()
+    data : pandas dataframe or RingWidthCollection
+        a pandas dataframe imported from dpl.readers(), or a RingWidthCollection
     biweight : boolean, default True
         use Tukey's bi-weight robust mean   
     prewhiten : boolean, default False   
@@ -84,12 +85,12 @@ def chron(rwi_data: pd.DataFrame, biweight=True, prewhiten=False, plot=True):
     .. [1] https:/opendendro.org/dplpy-man/#chron
     
     """
-    if not isinstance(rwi_data, pd.DataFrame):
+    if not isinstance(rwi_data, (pd.DataFrame, RingWidthCollection)):
         raise TypeError("Expected pandas dataframe as input, got " + str(type(rwi_data)) + " instead")
     
     chron_data = {}
-    for series in rwi_data:
-        series_data = rwi_data[series].dropna()
+    for series, series_data in rwi_data.items():
+        series_data = series_data.dropna()
         for year, value in series_data.items():
             if year not in chron_data:
                 chron_data[year] = [1, value]
@@ -138,8 +139,8 @@ def get_whitened_chron_info(rwi_data, chron_data, biweight):
     whitened_data = {}
     ar_fit_data = {}
 
-    for series in rwi_data:
-        series_data = rwi_data[series].dropna()
+    for series, series_data in rwi_data.items():
+        series_data = series_data.dropna()
         ar_fit_data[series] = ar_func(series_data)
 
         for year, value in ar_fit_data[series].items():
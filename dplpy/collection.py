@@ -0,0 +1,197 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: collection.py
+# Project: OpenDendro dplPy
+# Description: Compact storage for a set of tree-ring series. Instead of a dense
+#              year x series dataframe padded with NaNs, the values of all series
+#              are stored back to back in one array, with the start year and offset
+#              of each series kept alongside (CSR style).
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl")
+# >>> rwc = dpl.RingWidthCollection.from_dataframe(data)
+# >>> rwc["CAM011"]
+# >>> rwi = dpl.detrend(rwc, plot=False)
+# >>> dpl.chron(rwi, plot=False)
+
+import numpy as np
+import pandas as pd
+
+
+class RingWidthCollection:
+    """Compact collection of tree-ring series
+
+    Extended Summary
+    ----------------
+    Stores the values of many series, each spanning its own first to last
+    measured year, in a single concatenated array. `offsets[i]:offsets[i+1]`
+    is the slice of `values` belonging to the i-th series, which starts in
+    `start_years[i]`. Gaps inside a series are kept as NaN, but nothing is
+    stored before a series starts or after it ends.
+
+    Parameters
+    ----------
+    values : array-like
+        values of all series, concatenated in series order.
+    offsets : array-like
+        start position of each series in `values`, followed by len(values).
+    start_years : array-like
+        year of the first value of each series.
+    names : list of str
+        name of each series.
+    index : pandas index, optional
+        years to use for the dense layout in to_dataframe(). Defaults to the
+        range from the earliest start year to the latest end year.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> data = dpl.readers("../tests/data/rwl/ca533.rwl")
+    >>> rwc = dpl.RingWidthCollection.from_dataframe(data)
+    >>> rwc["CAM011"] # values of CAM011, without copying
+    >>> rwc.years("CAM011")
+    >>> rwc.to_dataframe() # back to the year x series layout of dpl.readers()
+
+    """
+
+    def __init__(self, values, offsets, start_years, names, index=None):
+        self.values = np.asarray(values, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.start_years = np.asarray(start_years, dtype=np.int64)
+        self.names = [str(name) for name in names]
+
+        if len(self.offsets) != len(self.names) + 1 or len(self.start_years) != len(self.names):
+            raise ValueError("expected one start year and one offset per series, plus a final offset")
+        if self.offsets[0] != 0 or self.offsets[-1] != len(self.values) or (np.diff(self.offsets) < 0).any():
+            raise ValueError("offsets should increase from 0 to the number of values")
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("series names should be unique")
+
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        if index is None:
+            index = pd.Index(np.arange(self.first_year, self.last_year + 1), name="Year")
+        self.index = index
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame):
+        """Builds a collection from a dataframe of series, such as one returned
+        by dpl.readers(). Leading and trailing NaNs of each series are dropped.
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError("Expected pandas dataframe as input, got " + str(type(data)) + " instead")
+        years = data.index.to_numpy()
+        if len(years) > 1 and not (np.diff(years) == 1).all():
+            raise ValueError("dataframe index should be consecutive years")
+
+        dense = data.to_numpy(dtype=float)
+        valid = ~np.isnan(dense)
+        has_values = valid.any(axis=0)
+        first = np.where(has_values, np.argmax(valid, axis=0), 0)
+        last = np.where(has_values, len(dense) - 1 - np.argmax(valid[::-1], axis=0), -1)
+        lengths = last - first + 1
+
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        values = np.concatenate([dense[first[i]:last[i] + 1, i] for i in range(dense.shape[1])] + [np.empty(0)])
+        start_years = years[first] if len(years) > 0 else np.zeros(len(first), dtype=np.int64)
+        return cls(values, offsets, start_years, data.columns, index=data.index)
+
+    @classmethod
+    def from_series(cls, series):
+        """Builds a collection from an iterable of (name, start year, values)."""
+        names, start_years, arrays = [], [], []
+        for name, start_year, values in series:
+            names.append(name)
+            start_years.append(start_year)
+            arrays.append(np.asarray(values, dtype=float))
+        offsets = np.concatenate(([0], np.cumsum([len(values) for values in arrays], dtype=np.int64)))
+        return cls(np.concatenate(arrays + [np.empty(0)]), offsets, start_years, names)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Expands the collection into a year x series dataframe like the
+        ones returned by dpl.readers().
+        """
+        lengths = self.lengths
+        series_of_value = np.repeat(np.arange(len(self.names)), lengths)
+        years = np.repeat(self.start_years - self.offsets[:-1], lengths) + np.arange(len(self.values))
+        rows = self.index.get_indexer(years)
+        if (rows < 0).any():
+            raise ValueError("collection has years outside of its index")
+
+        dense = np.full((len(self.index), len(self.names)), np.nan)
+        dense[rows, series_of_value] = self.values
+        return pd.DataFrame(dense, index=self.index, columns=pd.Index(self.names, dtype=object))
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def end_years(self):
+        return self.start_years + self.lengths - 1
+
+    @property
+    def first_year(self):
+        return int(self.start_years[self.lengths > 0].min()) if (self.lengths > 0).any() else 0
+
+    @property
+    def last_year(self):
+        return int(self.end_years[self.lengths > 0].max()) if (self.lengths > 0).any() else -1
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __getitem__(self, name):
+        i = self._positions[name]
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def years(self, name):
+        """Years covered by a series."""
+        i = self._positions[name]
+        return np.arange(self.start_years[i], self.start_years[i] + self.offsets[i + 1] - self.offsets[i])
+
+    def series(self, name) -> pd.Series:
+        """A series as a pandas series indexed by year, sharing memory with the collection."""
+        return pd.Series(self[name], index=pd.Index(self.years(name), name=self.index.name), name=name, copy=False)
+
+    def items(self):
+        """Iterates over (name, pandas series) pairs, like DataFrame.items()."""
+        for name in self.names:
+            yield name, self.series(name)
+
+    def with_values(self, values):
+        """A collection with the same layout as this one, holding different values."""
+        return RingWidthCollection(values, self.offsets, self.start_years, self.names, index=self.index)
+
+    def __repr__(self):
+        return ("RingWidthCollection(" + str(len(self)) + " series, " + str(len(self.values))
+                + " values, years " + str(self.first_year) + "-" + str(self.last_year) + ")")
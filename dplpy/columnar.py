@@ -0,0 +1,268 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: columnar.py
+# Project: OpenDendro dplPy
+# Description: Binary columnar files (Parquet and Arrow IPC/Feather) for ring widths,
+#              ring width indices and chronologies. A dataframe is stored as a table
+#              with its year index and one column per series (or chronology column,
+#              such as the sample depth), keeping the dtypes of the columns, so it
+#              reads back exactly as it was written. Metadata about the series is
+#              kept in the file too. Large datasets can be written a block of years
+#              at a time. Needs pyarrow (pip install pyarrow).
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl")
+# >>> dpl.writers(data, "ca533", "parquet")
+# >>> data = dpl.readers("ca533.parquet")
+# >>> some = dpl.read_columnar("ca533.parquet", columns=["CAM011", "CAM021"])
+
+import json
+import os
+
+import pandas as pd
+
+# Columnar formats, by name and file extension
+COLUMNAR_FORMATS = {"parquet": "parquet", "arrow": "arrow", "feather": "arrow"}
+
+# Schema metadata key holding the metadata of the series
+METADATA_KEY = b"dplpy"
+
+
+def write_columnar(data: pd.DataFrame, filename, format=None, metadata=None, chunk_years=None):
+    """Writes a dataframe to a Parquet or Arrow (Feather) file
+
+    Extended Summary
+    ----------------
+    Stores the year index and every column of the dataframe (ring widths,
+    ring width indices, or the columns of a chronology such as its sample
+    depth) with their dtypes, so dpl.readers() or dpl.read_columnar() return
+    the same dataframe. Metadata about the series is stored in the file and
+    read back into the `attrs` of the dataframe.
+
+    Parameters
+    ----------
+    data : pandas dataframe
+        dataframe indexed by year, such as one returned by dpl.readers(),
+        dpl.detrend() or dpl.chron().
+    filename : str
+        file to write, ending in .parquet, .arrow or .feather unless `format`
+        is given.
+    format : str, optional
+        'parquet' or 'arrow'. Guessed from the file extension by default.
+    metadata : dict, optional
+        metadata of the series, such as {"CAM011": {"species": "PILO"}},
+        which must be JSON serializable. Defaults to data.attrs["series"].
+    chunk_years : int, optional
+        number of years written at a time (row groups of Parquet files,
+        record batches of Arrow files). All years at once by default.
+
+    Returns
+    -------
+    None
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> data = dpl.readers("../tests/data/rwl/ca533.rwl")
+    >>> dpl.write_columnar(data, "ca533.parquet", metadata={"CAM011": {"species": "PILO"}})
+    >>> dpl.write_columnar(dpl.chron(dpl.detrend(data), plot=False), "ca533_crn.arrow")
+
+    """
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("Expected input data to be pandas dataframe, not " + str(type(data)))
+    if chunk_years is not None and (not isinstance(chunk_years, int) or chunk_years < 1):
+        raise ValueError("chunk_years should be a positive integer")
+    if metadata is None:
+        metadata = data.attrs.get("series")
+
+    with ColumnarWriter(filename, format=format, metadata=metadata) as writer:
+        step = chunk_years or max(1, len(data))
+        for start in range(0, max(1, len(data)), step):
+            writer.write(data.iloc[start:start + step])
+
+
+class ColumnarWriter:
+    """Writes a dataframe to a Parquet or Arrow (Feather) file a block of years at a time
+
+    Extended Summary
+    ----------------
+    Each call to write() appends the years of a dataframe to the file, so
+    datasets can be written as they are produced without holding them in
+    memory at once. Every block must have the same columns, with the same
+    dtypes, as the first one, and follow the years written before it. The
+    file is complete once the writer is closed.
+
+    Parameters
+    ----------
+    filename : str
+        file to write, ending in .parquet, .arrow or .feather unless `format`
+        is given.
+    format : str, optional
+        'parquet' or 'arrow'. Guessed from the file extension by default.
+    metadata : dict, optional
+        metadata of the series, which must be JSON serializable.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> with dpl.ColumnarWriter("network.parquet") as writer:
+    ...     for block in blocks_of_years: # dataframes with the same series
+    ...         writer.write(block)
+
+    """
+
+    def __init__(self, filename, format=None, metadata=None):
+        self.pyarrow = import_pyarrow()
+        self.filename = os.fspath(filename)
+        self.format = columnar_format(self.filename, format)
+        self.metadata = None if metadata is None else json.dumps({"series": metadata})
+        self.writer = None
+        self.schema = None
+        self.last_year = None
+
+    def write(self, data: pd.DataFrame):
+        """Appends the years of a dataframe to the file."""
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError("Expected input data to be pandas dataframe, not " + str(type(data)))
+        table = self.pyarrow.Table.from_pandas(data, preserve_index=True)
+        if self.writer is None:
+            schema = table.schema
+            if self.metadata is not None:
+                schema = schema.with_metadata({**(schema.metadata or {}), METADATA_KEY: self.metadata.encode()})
+            self.writer = self.open(schema)
+            self.schema = schema
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            raise ValueError("Expected the same columns and dtypes as the years written before:\n"
+                             + str(self.schema.remove_metadata()))
+        elif len(data) and self.last_year is not None and data.index[0] <= self.last_year:
+            raise ValueError("Expected years after " + str(self.last_year) + ", got " + str(data.index[0]))
+
+        self.writer.write_table(table.replace_schema_metadata(self.schema.metadata))
+        if len(data):
+            self.last_year = data.index[-1]
+
+    def open(self, schema):
+        if self.format == "parquet":
+            import pyarrow.parquet
+            return pyarrow.parquet.ParquetWriter(self.filename, schema)
+        import pyarrow.ipc
+        return pyarrow.ipc.new_file(self.filename, schema)
+
+    def close(self):
+        """Finishes the file."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_columnar(filename, columns=None, format=None) -> pd.DataFrame:
+    """Reads a Parquet or Arrow (Feather) file written by dplpy
+
+    Extended Summary
+    ----------------
+    Returns the dataframe that was written, indexed by year. Metadata about
+    the series, if any was stored, is in the `series` entry of the attrs of
+    the dataframe. Only the series named in `columns` are read from the file,
+    which is much faster than reading all of them on large files.
+
+    Parameters
+    ----------
+    filename : str
+        a .parquet, .arrow or .feather file.
+    columns : list of str, optional
+        series (or other columns) to read. All of them by default.
+    format : str, optional
+        'parquet' or 'arrow'. Guessed from the file extension by default.
+
+    Returns
+    -------
+    data : pandas dataframe
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> data = dpl.read_columnar("ca533.parquet")
+    >>> data.attrs["series"]
+    >>> some = dpl.read_columnar("ca533.parquet", columns=["CAM011", "CAM021"])
+
+    """
+    pyarrow = import_pyarrow()
+    filename = os.fspath(filename) if isinstance(filename, (str, os.PathLike)) else filename
+    format = columnar_format(filename if isinstance(filename, str) else "", format)
+    if format == "parquet":
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(filename, columns=columns, use_pandas_metadata=True)
+    else:
+        import pyarrow.ipc
+        source = pyarrow.memory_map(filename) if isinstance(filename, str) else filename
+        with pyarrow.ipc.open_file(source) as reader:
+            table = reader.read_all()
+        if columns is not None:
+            index_columns = [name for name in pandas_index_columns(table.schema) if name not in columns]
+            table = table.select(index_columns + list(columns))
+
+    data = table.to_pandas()
+    metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+    if metadata is not None:
+        series = json.loads(metadata)["series"]
+        if columns is not None and isinstance(series, dict):
+            series = {name: value for name, value in series.items() if name in columns}
+        data.attrs["series"] = series
+    return data
+
+
+# Returns 'parquet' or 'arrow', from the format given or the extension of the file
+def columnar_format(filename, format=None):
+    if format is None:
+        extension = os.path.splitext(filename)[1][1:].lower()
+        if extension not in COLUMNAR_FORMATS:
+            raise ValueError("Unable to tell the format of " + str(filename) + ". Accepted formats are parquet and arrow")
+        return COLUMNAR_FORMATS[extension]
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError("unsupported columnar format " + repr(format) + ". Accepted formats are parquet and arrow")
+    return COLUMNAR_FORMATS[format]
+
+
+# Names of the columns holding the index of the dataframe, from the pandas metadata of a table
+def pandas_index_columns(schema):
+    pandas_metadata = schema.pandas_metadata or {}
+    return [name for name in pandas_metadata.get("index_columns", []) if isinstance(name, str)]
+
+
+# pyarrow is only needed for the columnar formats, so it's imported when they are used
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is needed to read and write .parquet and .arrow files. Install it with: pip install pyarrow")
+    return pyarrow
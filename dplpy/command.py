@@ -0,0 +1,68 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: command.py
+# Project: OpenDendro dplPy
+# Description: Command line interface of the package, run with `python -m dplpy`.
+#
+# example command line application:
+# $ python -m dplpy convert ../tests/data/rwl --to csv --output-dir csv --header
+# $ python -m dplpy convert "archive/*.rwl.gz" --to parquet --jobs 8
+
+import argparse
+import time
+
+from convert import convert, print_summary, CONVERT_FORMATS
+from read_many import find_files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m dplpy", description="dplPy command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    converter = commands.add_parser("convert", help="convert ring width files to another format in parallel",
+                                    description="Converts ring width files to another format in parallel, "
+                                                "skipping files whose target is up to date.")
+    converter.add_argument("paths", nargs="+",
+                           help="directories (searched recursively), glob patterns or files to convert")
+    converter.add_argument("--to", dest="format", required=True, choices=CONVERT_FORMATS,
+                           help="format to convert the files to")
+    converter.add_argument("--output-dir", default=None,
+                           help="directory to write the converted files to (default: next to each source)")
+    converter.add_argument("--jobs", type=int, default=None,
+                           help="number of worker processes (default: all cores)")
+    converter.add_argument("--header", action="store_true", help="rwl files have a 3-line header")
+    converter.add_argument("--skip-lines", type=int, default=0, help="lines to skip at the top of each file")
+    converter.add_argument("--engine", choices=("python", "numpy"), default="numpy",
+                           help="reader and writer engine (default: numpy)")
+    converter.add_argument("--force", action="store_true", help="convert files even if their target is up to date")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    paths = args.paths[0] if len(args.paths) == 1 else [path for pattern in args.paths for path in find_files(pattern)]
+    summary = convert(paths, args.format, output_dir=args.output_dir, n_jobs=args.jobs, skip_lines=args.skip_lines,
+                      header=args.header, engine=args.engine, force=args.force)
+    print_summary(summary, elapsed=time.perf_counter() - start)
+    return 1 if (summary["status"] == "failed").any() else 0
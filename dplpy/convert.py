@@ -0,0 +1,203 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: convert.py
+# Project: OpenDendro dplPy
+# Description: Converts many ring width files to another format in parallel worker
+#              processes. Each file is read with readers() and written with writers()
+#              to a temporary file that is renamed over the target once complete, so
+#              an interrupted batch never leaves half-written files behind. Targets
+#              newer than their source are skipped, and the time taken by each file
+#              and the errors met are returned in a summary.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> summary = dpl.convert("/itrdb/northamerica/usa", "parquet", output_dir="/itrdb/parquet", header=True)
+# >>> summary[summary["status"] == "failed"]
+#
+# example command line application:
+# $ python -m dplpy convert /itrdb/northamerica/usa --to parquet --output-dir /itrdb/parquet --header
+
+import contextlib
+import io
+import os
+import time
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from readers import readers, resolve_input
+from read_many import find_files, read_error, site_name
+from writers import writers
+
+# Formats files can be converted to
+CONVERT_FORMATS = ("csv", "rwl", "parquet", "arrow")
+
+
+def convert(paths, format, output_dir=None, n_jobs=None, skip_lines=0, header=False, engine="numpy", force=False):
+    """Converts many ring width data files to another format in parallel
+
+    Extended Summary
+    ----------------
+    Reads every file matched by `paths` with dpl.readers() and writes it with
+    dpl.writers(), spreading the files over a pool of worker processes.
+    Nothing is printed. Each file is written to a temporary file next to its
+    target, then renamed over it, so targets are either complete or left as
+    they were. Targets modified after their source are skipped unless
+    `force` is True. Files that can't be converted don't stop the others.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        a directory (searched recursively for .csv, .rwl and .raw files,
+        including compressed ones such as .rwl.gz), a glob pattern, or a list
+        of file paths, as in dpl.read_many().
+    format : str
+        format to convert the files to: 'csv', 'rwl', 'parquet' or 'arrow'.
+    output_dir : str, optional
+        directory the converted files are written to, created if needed.
+        Files are written next to their source by default. Converted files
+        are named after their source, e.g. ca533.rwl.gz becomes ca533.csv.
+    n_jobs : int, default None
+        number of worker processes. None uses all available cores, 1 converts
+        the files one after the other in the current process.
+    skip_lines : int, default 0
+        passed to dpl.readers() for every file.
+    header : boolean, default False
+        passed to dpl.readers() for every file.
+    engine : str, default numpy
+        passed to dpl.readers() and dpl.writers() for every file.
+    force : boolean, default False
+        convert files even if their target is up to date.
+
+    Returns
+    -------
+    summary : pandas dataframe
+        one row per file with its source, target, status ('converted',
+        'skipped' or 'failed'), the seconds taken to convert it, and the
+        error message of failed files, followed by what dpl.readers()
+        printed about them, such as the line it couldn't read.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> summary = dpl.convert("../tests/data/rwl", "csv", output_dir="csv", header=True)
+    >>> summary["seconds"].sum()
+    >>> summary[summary["status"] == "failed"]
+
+    """
+    if format not in CONVERT_FORMATS:
+        raise ValueError("unsupported format " + repr(format) + ". Accepted formats are "
+                         + ", ".join(CONVERT_FORMATS))
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer or None")
+
+    filenames = find_files(paths)
+    targets = [target_name(filename, format, output_dir) for filename in filenames]
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    counts = Counter(os.path.abspath(target) for target in targets)
+    results = [None] * len(filenames)
+    jobs = []
+    for i, (filename, target) in enumerate(zip(filenames, targets)):
+        if counts[os.path.abspath(target)] > 1:
+            results[i] = ("failed", 0.0, "ValueError: other files are converted to the same target " + target)
+        elif os.path.abspath(resolve_input(filename)[0]) == os.path.abspath(target):
+            results[i] = ("failed", 0.0, "ValueError: source and target are the same file")
+        elif not force and is_up_to_date(filename, target):
+            results[i] = ("skipped", 0.0, None)
+        else:
+            jobs.append((i, (filename, target, format, skip_lines, header, engine)))
+
+    if n_jobs == 1 or len(jobs) <= 1:
+        converted = [convert_one(job) for _, job in jobs]
+    else:
+        workers = min(n_jobs, len(jobs))
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            converted = list(executor.map(convert_one, [job for _, job in jobs], chunksize=chunksize))
+    for (i, _), result in zip(jobs, converted):
+        results[i] = result
+
+    return pd.DataFrame({"source": filenames,
+                         "target": targets,
+                         "status": [status for status, _, _ in results],
+                         "seconds": [seconds for _, seconds, _ in results],
+                         "error": [error for _, _, error in results]})
+
+# Converts one file quietly, writing it to a temporary file renamed over the target once
+# complete. Returns (status, seconds, error message), so one bad file never brings down
+# the whole batch. What readers() prints about a file it can't read is kept in the message.
+def convert_one(job):
+    filename, target, format, skip_lines, header, engine = job
+    directory, name = os.path.split(target)
+    temporary = os.path.join(directory, "." + name + "." + str(os.getpid()) + ".tmp")
+    start = time.perf_counter()
+    output = io.StringIO()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with contextlib.redirect_stdout(output):
+                data = readers(filename, skip_lines=skip_lines, header=header, engine=engine)
+            output = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                writers(data, temporary, format, engine=engine)
+        os.replace(temporary + "." + format, target)
+    except Exception as err:
+        with contextlib.suppress(OSError):
+            os.remove(temporary + "." + format)
+        message = type(err).__name__ + ": " + str(err).strip() if output is None else read_error(err, output)
+        return "failed", time.perf_counter() - start, message
+    return "converted", time.perf_counter() - start, None
+
+# Path of the converted file: named after the source, in output_dir or next to the source
+def target_name(filename, format, output_dir=None):
+    name = site_name(resolve_input(filename)[3]) + "." + format
+    directory = os.path.dirname(resolve_input(filename)[0]) if output_dir is None else output_dir
+    return os.path.join(directory, name)
+
+# Whether the target exists and was modified after its source
+def is_up_to_date(filename, target):
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(resolve_input(filename)[0]).st_mtime_ns
+    except OSError:
+        return False
+
+# Prints a summary returned by convert(), one line per file then the totals. The total time
+# is the sum of the time taken by each file unless the wall time of the batch is given.
+def print_summary(summary, elapsed=None):
+    for row in summary.itertuples():
+        print("{:<9} {:>8.2f} s  {} -> {}".format(row.status, row.seconds, row.source, row.target))
+        if row.error is not None:
+            for line in row.error.splitlines():
+                print("          " + line)
+    counts = summary["status"].value_counts()
+    print("\n{} converted, {} skipped (up to date), {} failed in {:.2f} s".format(
+        counts.get("converted", 0), counts.get("skipped", 0), counts.get("failed", 0),
+        summary["seconds"].sum() if elapsed is None else elapsed))
@@ -26,7 +26,11 @@ __license__ = "GNU GPLv3"
 # Title: curvefit.py
 # Description: This file contains helper functions which fit data
 #              from a series to curves. The curves included are hugershoff,
-#              modified negative exponential, linear and horizontal.
+#              modified negative exponential, linear and horizontal. Linear and
+#              horizontal lines can be fitted to all columns of a 2D array at once,
+#              and hugershoff and modified negative exponential curves to many
+#              series at once, by a vectorized Levenberg-Marquardt (negex_many and
+#              hugershoff_many).
 
 import numpy as np
 from scipy.optimize import curve_fit
@@ -58,21 +62,376 @@ def negex(x, y):
     yi = negex_function(xi, a, b, k)
     return yi
 
-# Fit a horizontal line to the series
+# Fit a horizontal line to the series. Given a 2D array of series (one per column), fits
+# the line of every column at once, leaving NaNs out.
 def horizontal(x, y):
-    yi = np.asarray([np.mean(y)] * len(x))
+    if np.ndim(y) == 2:
+        _, y_mean, _ = column_moments(x, y)
+        return np.broadcast_to(y_mean, np.shape(y)).copy()
+    yi = np.full(len(x), np.mean(y))
     return yi
     
 # Equation of a straight line
 def line_function(x, m, c):
     return (m * x) + c
 
-# Fit a line to the series
+# Fit a line to the series. Given a 2D array of series (one per column), fits the lines of
+# all columns at once by closed form least squares, leaving NaNs out. With bounds, slopes are
+# held at or below zero: a positive least squares slope becomes a horizontal line.
 def linear(x, y, bounds=False):
+    if np.ndim(y) == 2:
+        x_mean, y_mean, (dx, dy) = column_moments(x, y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = np.sum(dx * dy, axis=0) / np.sum(dx * dx, axis=0)
+        if bounds is not False:
+            m = np.minimum(m, 0)
+        return line_function(np.asarray(x, dtype=float)[:, None], m, y_mean - m * x_mean)
     if bounds is False:
         pars, unk = curve_fit(line_function, x, y)
     else:
         pars, unk = curve_fit(line_function, x, y, bounds=([-np.inf, -np.inf], [0, np.inf]))
     m, c = pars
     yi = line_function(x, m, c)
-    return yi
\ No newline at end of file
+    return yi
+
+# NaN-aware means of x and of every column of y, and the deviations from them (zero where
+# y is NaN). Columns without values have NaN means.
+def column_moments(x, y):
+    y = np.asarray(y, dtype=float)
+    measured = ~np.isnan(y)
+    x = np.broadcast_to(np.asarray(x, dtype=float)[:, None], y.shape)
+    count = measured.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = np.where(measured, x, 0).sum(axis=0) / count
+        y_mean = np.where(measured, y, 0).sum(axis=0) / count
+    dx = np.where(measured, x - x_mean, 0)
+    dy = np.where(measured, y - y_mean, 0)
+    return x_mean, y_mean, (dx, dy)
+
+# Number of series fitted together by negex_many and hugershoff_many, bounding their memory use
+BATCH_SIZE = 256
+# Cost of fitting one more batch, in padded values: the overhead of its iterations
+BATCH_COST = 32000
+
+
+def negex_many(ys, p0=None):
+    """Fits modified negative exponential curves to many series at once
+
+    Extended Summary
+    ----------------
+    Fits a*exp(b*x) + k, with a >= 0, b <= 0 and k >= 0, to every series,
+    as negex() does one series at a time. The bounded least squares
+    problems of all series are solved together by a vectorized
+    Levenberg-Marquardt with analytic Jacobians, started from the best of
+    a grid of data-driven initial guesses, the starting point of negex(),
+    and `p0` if given. Where the fits have a unique minimum the curves
+    match negex(), elsewhere they may end at another local minimum,
+    usually one closer to the data.
+
+    Parameters
+    ----------
+    ys : list of array-like
+        values of each series, without missing values. Like negex(), the
+        curves are fitted against the ring numbers 1, 2, ..., len(y).
+    p0 : array-like, optional
+        warm start, such as the `params` of an earlier fit of the same
+        series: one row of (a, b, k) per series. Rows of NaN are ignored.
+
+    Returns
+    -------
+    curves : list of numpy arrays
+        the curve of each series.
+    params : numpy array
+        (a, b, k) of each series, one row per series.
+    converged : numpy array of booleans
+        whether the fit of each series converged. The curves and params of
+        the others are the best found and may be refitted with negex().
+
+    """
+    def starts(x, Y, M):
+        sums = value_sums(Y, M)
+        n = sums[0]
+        grid, costs = [], []
+        for rate in [0, 0.3, 1, 2, 4, 8, 16, 40, -0.03, -0.1, -0.3, -1, -3]:
+            b = -rate / n if rate >= 0 else np.full_like(n, rate)
+            a, k, cost = linear_part(np.exp(b[:, None] * x), Y, M, sums)
+            grid.append(np.stack([a, b, k], axis=1))
+            costs.append(cost)
+        return [np.stack([np.ones_like(n), -np.ones_like(n), np.ones_like(n)], axis=1), best_candidate(grid, costs)]
+
+    return fit_many(ys, lambda x: [x], starts, lambda ys: ([0, -np.inf, 0], [np.inf, 0, np.inf]), p0, shift=True)
+
+
+def hugershoff_many(ys, p0=None):
+    """Fits modified hugershoff curves to many series at once
+
+    Extended Summary
+    ----------------
+    Fits a*(x**b)*exp(c*x) + d, with a >= 0, -2 <= b <= 2, c <= 0 and d
+    between the smallest and largest value of the series, to every series,
+    as hugershoff() does one series at a time. See negex_many() for how the
+    problems are solved.
+
+    Parameters
+    ----------
+    ys : list of array-like
+        values of each series, without missing values. Like hugershoff(),
+        the curves are fitted against the ring numbers 1, 2, ..., len(y).
+    p0 : array-like, optional
+        warm start, such as the `params` of an earlier fit of the same
+        series: one row of (a, b, c, d) per series. Rows of NaN are ignored.
+
+    Returns
+    -------
+    curves : list of numpy arrays
+        the curve of each series.
+    params : numpy array
+        (a, b, c, d) of each series, one row per series.
+    converged : numpy array of booleans
+        whether the fit of each series converged. The curves and params of
+        the others are the best found and may be refitted with hugershoff().
+
+    """
+    def starts(x, Y, M):
+        sums = value_sums(Y, M)
+        n = sums[0]
+        y_min = np.where(M > 0, Y, np.inf).min(axis=1)
+        y_max = np.where(M > 0, Y, -np.inf).max(axis=1)
+        zeros = np.zeros_like(n)
+        grid, costs = [], []
+        for b in [-1, 0, 0.5, 1, 2]:
+            power = x ** b
+            for rate in [0, 1, 3, 10, -0.03, -0.3, -1, -3]:
+                c = -rate / n if rate >= 0 else np.full_like(n, rate)
+                a, d, cost = linear_part(power * np.exp(c[:, None] * x), Y, M, sums, offset_bounds=(y_min, y_max))
+                grid.append(np.stack([a, np.full_like(n, b), c, d], axis=1))
+                costs.append(cost)
+        return [np.stack([y_max - y_min, zeros, zeros, Y[:, 0]], axis=1), best_candidate(grid, costs)]
+
+    def bounds(ys):
+        y_min = np.array([np.min(y) for y in ys])
+        y_max = np.array([np.max(y) for y in ys])
+        lower = np.column_stack([np.zeros_like(y_min), np.full_like(y_min, -2), np.full_like(y_min, -np.inf), y_min])
+        upper = np.column_stack([np.full_like(y_max, np.inf), np.full_like(y_max, 2), np.zeros_like(y_max), y_max])
+        return lower, upper
+
+    # x**b * exp(c*x) is exp(b*log(x) + c*x)
+    return fit_many(ys, lambda x: [np.log(x), x], starts, bounds, p0)
+
+# Fits curves a*exp(rates @ basis(x)) + offset (see exp_curves) to each of the series ys,
+# against the ring numbers x = 1, 2, ..., len(y), with parameters (a, rates..., offset).
+# Series are sorted by length and fitted in batches of series of similar length, padded to the
+# longest of their batch with values and weights of zero. starts(x, Y, M) returns candidate
+# starting points of the padded values Y (weights M), and bounds(ys) the lower and upper bounds
+# of the parameters, for all series or one row per series. With `shift`, curves are fitted
+# against x - 1, so the first parameter is scaled by exp(second parameter), which keeps curves
+# decaying fast over the first rings well conditioned. Returns the curves, parameters and
+# convergence of each series.
+def fit_many(ys, basis, starts, bounds, p0=None, shift=False):
+    ys = [np.asarray(y, dtype=float) for y in ys]
+    lower, upper = (np.asarray(bound, dtype=float) for bound in bounds(ys))
+    n_params = lower.shape[-1]
+    lower = np.broadcast_to(lower, (len(ys), n_params))
+    upper = np.broadcast_to(upper, (len(ys), n_params))
+    if any(len(y) < n_params for y in ys):
+        raise ValueError("every series needs at least " + str(n_params) + " values to fit " + str(n_params) + " parameters")
+
+    curves = [None] * len(ys)
+    params = np.full((len(ys), n_params), np.nan)
+    converged = np.zeros(len(ys), dtype=bool)
+    # curves overflowing or rows without values on the way are rejected, not warned about
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        for members in batches([len(y) for y in ys]):
+            x = np.arange(1, len(ys[members[-1]]) + 1, dtype=float)
+            Y = np.zeros((len(members), len(x)))
+            M = np.zeros((len(members), len(x)))
+            for row, i in enumerate(members):
+                Y[row, :len(ys[i])] = ys[i]
+                M[row, :len(ys[i])] = 1
+
+            candidates = starts(x, Y, M)
+            if p0 is not None:
+                warm = np.asarray(p0, dtype=float)[members]
+                candidates.append(np.where(np.isnan(warm).any(axis=1, keepdims=True), candidates[0], warm))
+            if shift:
+                x = x - 1
+                candidates = [np.column_stack([P[:, 0] * np.exp(P[:, 1]), P[:, 1:]]) for P in candidates]
+
+            lo, up = lower[members], upper[members]
+            B = np.array(basis(x), dtype=float)
+            P = best_start(B, Y, M, candidates, lo, up)
+            P, ok = levenberg_marquardt(B, Y, M, P, lo, up)
+            fitted, _ = exp_curves(B, P)
+            if shift:
+                P[:, 0] = P[:, 0] * np.exp(-P[:, 1])
+
+            for row, i in enumerate(members):
+                curves[i] = fitted[row, :len(ys[i])]
+            params[members] = P
+            converged[members] = ok
+    return curves, params, converged
+
+# Splits series of the given lengths into batches of indices, sorted by length, of at most
+# BATCH_SIZE series. The batches minimize the number of values fitted, padding included,
+# plus BATCH_COST per batch: cost[stop] is the least cost of the stop shortest series, whose
+# last batch starts at first[stop].
+def batches(lengths):
+    order = np.argsort(lengths, kind="stable")
+    sorted_lengths = np.asarray(lengths, dtype=float)[order]
+    cost = np.zeros(len(order) + 1)
+    first = np.zeros(len(order) + 1, dtype=int)
+    for stop in range(1, len(order) + 1):
+        starts = np.arange(max(0, stop - BATCH_SIZE), stop)
+        costs = cost[starts] + (stop - starts) * sorted_lengths[stop - 1]
+        best = np.argmin(costs)
+        cost[stop] = costs[best] + BATCH_COST
+        first[stop] = starts[best]
+
+    bounds = [len(order)]
+    while bounds[-1] > 0:
+        bounds.append(first[bounds[-1]])
+    bounds.reverse()
+    return [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+# Number of values, sum and sum of squares of every row of Y (weights M, Y zero where M is)
+def value_sums(Y, M):
+    return M.sum(axis=1), Y.sum(axis=1), np.einsum("ij,ij->i", Y, Y)
+
+# Least squares fit of y = a*e + k for every row of Y (weights M, Y zero where M is, and
+# value_sums of Y), with a >= 0 and k within offset_bounds, used to find good starting points:
+# for fixed rates the curves are linear in their scale and offset. Returns a, k and the sum
+# of squares of the fit.
+def linear_part(e, Y, M, sums, offset_bounds=(0, np.inf)):
+    n, sy, syy = sums
+    em = M * e
+    se = em.sum(axis=1)
+    see = np.einsum("ij,ij->i", em, e)
+    sey = np.einsum("ij,ij->i", em, Y)
+    det = n * see - se * se
+    a = np.where(det > 1e-12 * n * see, (n * sey - se * sy) / det, 0)
+    k = np.clip((sy - np.maximum(a, 0) * se) / n, *offset_bounds)
+    a = np.where(see > 0, np.maximum((sey - k * se) / see, 0), 0)
+    cost = a * a * see + 2 * a * k * se + n * k * k - 2 * a * sey - 2 * k * sy + syy
+    return a, k, cost
+
+# Of the candidate starting points of every row and their sums of squares, the best
+def best_candidate(candidates, costs):
+    costs = np.where(np.isfinite(costs), costs, np.inf)
+    return np.stack(candidates)[np.argmin(costs, axis=0), np.arange(len(candidates[0]))]
+
+# Curves a*exp(rates @ basis) + offset of every row of parameters P = (a, rates..., offset),
+# and their exponential terms exp(rates @ basis)
+def exp_curves(basis, P):
+    g = np.exp(P[:, 1:-1] @ basis)
+    curves = P[:, :1] * g
+    curves += P[:, -1:]
+    return curves, g
+
+# Gradient and Gauss-Newton Hessian of the sums of squares of the curves with parameters P,
+# from their exponential terms g and weighted residuals. The Jacobian of a curve is
+# (g, a*g*basis, 1), so every sum over the rings is a product of g, or g squared, with the
+# basis or the products of its rows (ones_basis and products, with a row of ones for a).
+def normal_equations(P, g, residuals, M, count, ones_basis, products):
+    n_rows, n_params = P.shape
+    w = M * g
+    scale = np.ones((n_rows, n_params - 1))
+    scale[:, 1:] = P[:, :1]
+    gradient = np.empty((n_rows, n_params))
+    gradient[:, :-1] = ((w * residuals) @ ones_basis) * scale
+    gradient[:, -1] = residuals.sum(axis=1)
+    hessian = np.empty((n_rows, n_params, n_params))
+    hessian[:, :-1, :-1] = ((w * w) @ products).reshape(n_rows, n_params - 1, n_params - 1)
+    hessian[:, :-1, :-1] *= scale[:, :, None] * scale[:, None, :]
+    hessian[:, :-1, -1] = (w @ ones_basis) * scale
+    hessian[:, -1, :-1] = hessian[:, :-1, -1]
+    hessian[:, -1, -1] = count
+    return gradient, hessian
+
+# Starting point of every row of Y: the candidate with the smallest sum of squares once
+# clipped to the bounds
+def best_start(basis, Y, M, candidates, lower, upper):
+    best, best_cost = None, None
+    for P in candidates:
+        P = np.clip(np.nan_to_num(P, nan=0.0), lower, upper)
+        cost = np.sum((M * (exp_curves(basis, P)[0] - Y)) ** 2, axis=1)
+        cost = np.where(np.isfinite(cost), cost, np.inf)
+        if best is None:
+            best, best_cost = P, cost
+        else:
+            better = cost < best_cost
+            best[better] = P[better]
+            best_cost = np.where(better, cost, best_cost)
+    return best
+
+# Bounded Levenberg-Marquardt, solving the least squares problems of the curves
+# a*exp(rates @ basis) + offset of all rows of Y at once. Each iteration solves the damped
+# normal equations of the rows still running, with the parameters held at a bound they are
+# pushed against left out, and clips the step to the bounds. Steps that don't lower the sum
+# of squares are rejected and the damping raised. Rows stop once a step lowers their sum of
+# squares, or moves their parameters, by less than ftol or xtol (relative), as curve_fit
+# does; rows whose damping blows up or that reach max_iter are reported as not converged.
+# Everything about the rows still running is kept together, dropping rows once they stop.
+def levenberg_marquardt(basis, Y, M, P, lower, upper, max_iter=200, ftol=1e-8, xtol=1e-8):
+    n_rows, n_params = P.shape
+    P = P.copy()
+    p, lo, up = P.copy(), lower, upper
+    ones_basis = np.vstack([np.ones(basis.shape[1]), basis])
+    products = (ones_basis[:, None, :] * ones_basis[None, :, :]).reshape(-1, basis.shape[1]).T
+    ones_basis = ones_basis.T
+    identity = np.eye(n_params)
+    damping = np.full(n_rows, 1e-3)
+    growth = np.full(n_rows, 2.0)
+    converged = np.zeros(n_rows, dtype=bool)
+    fitted, g = exp_curves(basis, p)
+    residuals = M * (fitted - Y)
+    cost = np.einsum("ij,ij->i", residuals, residuals)
+    count = M.sum(axis=1)
+    running = np.arange(n_rows)
+
+    for _ in range(max_iter):
+        if not len(running):
+            break
+        gradient, hessian = normal_equations(p, g, residuals, M, count, ones_basis, products)
+
+        free = ~(((p <= lo) & (gradient > 0)) | ((p >= up) & (gradient < 0)))
+        scale = np.diagonal(hessian, axis1=1, axis2=2)
+        scale = np.maximum(scale, 1e-12 * scale.max(axis=1, keepdims=True) + 1e-300)
+        system = hessian * (free[:, :, None] & free[:, None, :])
+        system = system + identity * np.where(free, damping[:, None] * scale, 1)[:, None, :]
+        step = np.linalg.solve(system, -(gradient * free)[:, :, None])[:, :, 0]
+
+        new_p = np.minimum(np.maximum(p + step, lo), up)
+        step = new_p - p
+        new_residuals, new_g = exp_curves(basis, new_p)
+        new_residuals -= Y
+        new_residuals *= M
+        new_cost = np.einsum("ij,ij->i", new_residuals, new_residuals)
+        accepted = np.isfinite(new_cost) & (new_cost <= cost)
+
+        # damping update of Nielsen, from the ratio of the actual to the predicted reduction
+        predicted = -2 * np.sum(gradient * step, axis=1) - np.einsum("rk,rkl,rl->r", step, hessian, step)
+        ratio = np.where(predicted > 0, (cost - new_cost) / predicted, 0)
+        damping = np.maximum(np.where(accepted, damping * np.maximum(1 / 3, 1 - (2 * ratio - 1) ** 3),
+                                      damping * growth), 1e-15)
+        growth = np.where(accepted, 2, growth * 2)
+
+        step_norm, p_norm = np.sqrt(np.einsum("ij,ij->i", step, step)), np.sqrt(np.einsum("ij,ij->i", p, p))
+        small = ((cost - new_cost <= ftol * cost) & (predicted <= ftol * cost)
+                 | (step_norm <= xtol * (xtol + p_norm)))
+        done = (accepted & small) | (cost == 0)
+
+        if accepted.all():
+            p, g, residuals, cost = new_p, new_g, new_residuals, new_cost
+        else:
+            p[accepted] = new_p[accepted]
+            g[accepted] = new_g[accepted]
+            residuals[accepted] = new_residuals[accepted]
+            cost = np.where(accepted, new_cost, cost)
+        P[running] = p
+        converged[running[done]] = True
+        keep = ~done & (damping < 1e16)
+        if not keep.all():
+            running = running[keep]
+            p, lo, up, damping, growth, cost = p[keep], lo[keep], up[keep], damping[keep], growth[keep], cost[keep]
+            g, residuals, Y, M, count = g[keep], residuals[keep], Y[keep], M[keep], count[keep]
+    return P, converged
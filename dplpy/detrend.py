@@ -28,12 +28,17 @@ __license__ = "GNU GPLv3"
 #              with spline(s) as the default, and then by calculating residuals or differences 
 #              compared to the original data (residuals by default).
 
+from collections.abc import Iterable
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from smoothingspline import spline
+from smoothingspline import spline, spline_rows, spline_banded, get_period
+from collection import RingWidthCollection
+from parallel import check_n_jobs, is_numeric_frame, map_columns
+from detrend_cache import get_cache
 import curvefit
 
-def detrend(data: pd.DataFrame | pd.Series, fit="spline", method="residual", plot=True, period=None):
+def detrend(data: pd.DataFrame | pd.Series | RingWidthCollection | Iterable, fit="spline", method="residual", plot=True, period=None, engine="python", n_jobs=1, executor=None, cache=None):
     """Detrends a given series or dataframe
     
     Extended Summary
@@ -46,18 +51,63 @@ def detrend(data: pd.DataFrame | pd.Series, fit="spline", method="residual", plo
                   
     Parameters
     ----------
-    data: pandas dataframe or series
-        a data frame loaded using dpl.readers(), or a series extracted from such a datafame.
+    data: pandas dataframe, series, RingWidthCollection or iterable
+        a data frame loaded using dpl.readers(), a series extracted from such a datafame,
+        a RingWidthCollection, or an iterable of (name, start year, values) such as
+        dpl.iter_series().
     fit: str, default spline 
         fitting method of curve. can be 'horizontal', 'Hugershoff', 'linear', 'ModNegex' (modified negative exponential), and 'spline'.
     method : str, default residual
         detrending method, can be 'difference' or 'residual'.
     plot : boolean, default True
         flag indicating whether or not to plot the results.
+    period : float, dict or pandas series, optional
+        period of the spline: a number of years, a fraction of the length of each series
+        (between 0 and 1), or a percentage of it (negative). Defaults to 0.67 of the length
+        of each series. A dict or series gives the period of each series by name; series
+        left out use the default.
+    engine : str, default python
+        how dataframes and RingWidthCollections are detrended. 'python' fits one series at
+        a time, 'numpy' fits splines to all series sharing the same years spacing and period
+        (e.g. series of the same length without gaps) in a single solve, which is much
+        faster when many series share a length. Both give the same results. 'banded' fits
+        the splines of all series, whatever their length, in one banded solve of dplpy's
+        own, without csaps. Its results match the other engines to about 1e-8 (relative).
+        With both, 'ModNegEx' and 'Hugershoff' curves of all series are fitted together
+        (see curvefit.negex_many), falling back to one series at a time for fits that
+        don't converge, 10 to 30 times faster than with 'python'. These fits may end at
+        a different local minimum than with 'python': on the test networks about 3 curves
+        in 10 differ, nearly always with a smaller sum of squares (6 Hugershoff curves in
+        597 have one up to 1.2% larger). With any engine, 'linear' and 'horizontal' fits
+        of a dataframe are computed for all columns at once, in closed form.
+    n_jobs : int, default 1
+        number of worker processes the columns of a dataframe are detrended in. None uses
+        all available cores. The values are shared with the workers through shared memory
+        and split into chunks of columns, a few per worker. Results are written back in
+        column order, so they don't depend on how fast each worker is. They are the same as
+        with n_jobs=1 with the 'python' engine. The 'numpy' and 'banded' engines fit the
+        series of each chunk together, which may move curve fits within their tolerance
+        (about 1e-8). Plots are drawn once all columns are detrended.
+        'linear' and 'horizontal' fits, and other inputs than dataframes, are always
+        detrended in the current process.
+    executor : concurrent.futures.Executor, optional
+        executor to run the chunks of columns on instead of a new pool of n_jobs worker
+        processes, e.g. one reused across calls. n_jobs then sets how many workers the
+        columns are split for.
+    cache : boolean, str or DetrendCache, optional
+        memoize the fitted curves, keyed by a hash of the years and values of each series,
+        the fit, the period and the engine, so series detrended again, with any method, are
+        not fitted again. True uses a cache shared by the whole process, a string names a
+        directory the curves are also saved in, and a DetrendCache sets the size limits
+        too. None uses the cache set with dpl.set_detrend_cache(), if any, and False
+        never caches. 'linear' and 'horizontal' fits of dataframes, computed for all
+        columns at once, are not cached.
     
     Returns
     -------
-    data: pandas dataframe or series of detrended data.
+    data: pandas dataframe, series or RingWidthCollection of detrended data, matching the input.
+        For an iterable, a generator yielding (name, start year, detrended values), which
+        detrends each series only when it is requested.
     
     Examples
     --------
@@ -66,22 +116,42 @@ def detrend(data: pd.DataFrame | pd.Series, fit="spline", method="residual", plo
     >>> dpl.detrend(data) # Detrends all series in a dataframe
     >>> dpl.detrend(data["SeriesA"]) # Detrends only SeriesA
     >>> dpl.detrend(data["SeriesA"], fit="ModNegex", method="residual", plot=True)    
+    >>> dpl.detrend(data, period={"SeriesA": 50}, plot=False) # 50 year spline for SeriesA only
+    >>> dpl.detrend(data, engine="numpy", plot=False) # Fits splines in batches
+    >>> dpl.detrend(data, engine="banded", plot=False) # Fits all splines in one banded solve
+    >>> dpl.detrend(data, engine="banded", plot=False, n_jobs=8) # Detrends columns in 8 processes
+    >>> dpl.detrend(data, plot=False, cache=True) # Fits only the series not detrended before
+    >>> for name, start_year, rwi in dpl.detrend(dpl.iter_series("../tests/data/rwl/file.rwl"), plot=False):
+    ...     print(name, start_year, rwi.mean())
     
     References
     ----------
     .. [1] https:/opendendro.org/dplpy-man/#detrend
          
     """
+    if engine not in ("python", "numpy", "banded"):
+        raise ValueError("unsupported detrend engine " + repr(engine) + ". Accepted engines are 'python', 'numpy' and 'banded'")
+    n_jobs = check_n_jobs(n_jobs)
+    cache = get_cache(cache)
+
     if isinstance(data, pd.DataFrame):
+        if fit in ("linear", "horizontal") and is_numeric_frame(data) and (fit == "horizontal" or data.count().min() >= 2):
+            return detrend_lines(data, fit, method, plot)
+        if is_numeric_frame(data):
+            return detrend_frame(data, fit, method, plot, period, engine, n_jobs, executor, cache)
         res = pd.DataFrame(index=pd.Index(data.index))
         to_add = [res]
         for column in data.columns:
-            to_add.append(detrend_series(data[column], fit, method, plot, period))
+            to_add.append(detrend_series(data[column], fit, method, plot, series_period(period, column), cache))
         output_df = pd.concat(to_add, axis=1)
         return output_df.rename_axis(data.index.name)
     
     elif isinstance(data, pd.Series):
-        return detrend_series(data, fit, method, plot, period)
+        return detrend_series(data, fit, method, plot, series_period(period, data.name), cache)
+    elif isinstance(data, RingWidthCollection):
+        return detrend_collection(data, fit, method, plot, period, engine, cache)
+    elif isinstance(data, Iterable) and not isinstance(data, str):
+        return detrend_stream(data, fit, method, plot, period, cache)
     else:
         raise TypeError("argument should be either pandas dataframe or pandas series.")
 
@@ -90,12 +160,145 @@ def detrend(data: pd.DataFrame | pd.Series, fit="spline", method="residual", plo
 # Can specify what type of alternate curve-fits, or if the user
 # would like to detrend by using differences
 # Need to add series names to the top of the plots, and display the plots side by side
-def detrend_series(data: pd.Series, fit, method, plot, period=None):
+# The detrended values are put back in place of the measured ones, leaving the others NaN.
+def detrend_series(data: pd.Series, fit, method, plot, period=None, cache=None):
     series_name = data.name
-    nullremoved_data = data.dropna()
-    x = nullremoved_data.index.to_numpy()
-    y = nullremoved_data.to_numpy()
+    measured = data.notna().to_numpy()
+    x = data.index.to_numpy()[measured]
+    y = data.to_numpy()[measured]
+
+    [(yi, detrended_data)] = detrend_cached([x], [y], fit, method, [period], "python", cache)
+
+    if plot:
+        plot_detrended(series_name, x, y, yi, detrended_data, fit, method)
+
+    output = np.full(len(data), np.nan)
+    output[measured] = detrended_data
+    result = pd.Series(output, index=data.index.copy(), name=series_name)
+    return result if data.index.is_monotonic_increasing else result.sort_index()
+
+# Detrends every column of a dataframe. The measured values of the columns are fitted
+# with detrend_cached, or in worker processes by detrend_parallel with several jobs, and
+# written into one preallocated array, which becomes the output dataframe at once. Plots
+# are drawn once all columns are fitted.
+def detrend_frame(data: pd.DataFrame, fit, method, plot, period=None, engine="numpy", n_jobs=1, executor=None, cache=None):
+    values = data.to_numpy(dtype=float)
+    years = data.index.to_numpy()
+    measured = ~np.isnan(values)
+    xs = [years[measured[:, j]] for j in range(values.shape[1])]
+    ys = [values[measured[:, j], j] for j in range(values.shape[1])]
+
+    periods = [series_period(period, column) for column in data.columns]
+    if n_jobs > 1 or executor is not None:
+        results = detrend_parallel(values, years, xs, ys, fit, method, periods, engine, n_jobs, executor, cache)
+    else:
+        results = detrend_cached(xs, ys, fit, method, periods, engine, cache)
+
+    output = np.full(values.shape, np.nan)
+    for j, (x, y, (yi, detrended_data)) in enumerate(zip(xs, ys, results)):
+        if plot:
+            plot_detrended(data.columns[j], x, y, yi, detrended_data, fit, method)
+        output[measured[:, j], j] = detrended_data
+    return pd.DataFrame(output, index=data.index.copy(), columns=data.columns.copy())
+
+# Fits and detrends the series of the columns of a dataframe in worker processes, and
+# returns a (curve, detrended values) tuple per series, as detrend_cached does. Only the
+# columns whose curve isn't cached are sent to the workers, through shared memory, and
+# their curves come back with the detrended values.
+def detrend_parallel(values, years, xs, ys, fit, method, periods, engine, n_jobs, executor=None, cache=None):
+    keys, curves = cached_curves(xs, ys, fit, periods, engine, cache)
+    results = [None if curve is None else (curve, detrend_by(y, curve, method)) for y, curve in zip(ys, curves)]
+    missing = [j for j, curve in enumerate(curves) if curve is None]
+    if not missing:
+        return results
+
+    shape = (len(years), len(missing))
+    jobs = lambda start, stop: (years, fit, method, [periods[j] for j in missing[start:stop]], engine)
+    (detrended, fitted), _ = map_columns(detrend_columns, values[:, missing], jobs, [shape, shape], n_jobs, executor)
+    for k, j in enumerate(missing):
+        rows = ~np.isnan(values[:, j])
+        results[j] = (fitted[rows, k], detrended[rows, k])
+        if cache is not None:
+            cache.put(keys[j], fitted[rows, k])
+    return results
+
+# Detrends columns start:stop of the values of a dataframe in a worker process, writing the
+# detrended values and the curves into the two outputs in shared memory. Nothing is
+# plotted here.
+def detrend_columns(columns, job, values, outputs):
+    years, fit, method, periods, engine = job
+    start, stop = columns
+    measured = ~np.isnan(values[:, start:stop])
+    xs = [years[measured[:, j]] for j in range(stop - start)]
+    ys = [values[measured[:, j], start + j] for j in range(stop - start)]
+
+    for j, (yi, detrended_data) in enumerate(detrend_each(xs, ys, fit, method, periods, engine)):
+        outputs[0][measured[:, j], start + j] = detrended_data
+        outputs[1][measured[:, j], start + j] = yi
+
+# Detrends every column of a dataframe by a linear or horizontal fit, whatever the engine.
+# The lines of all columns are fitted at once in closed form on the 2D array of values,
+# leaving NaNs out, and the detrended values become the output dataframe at once. Linear
+# fits of frames with columns of fewer than two values are done one series at a time
+# instead, to fail as they would on their own.
+def detrend_lines(data: pd.DataFrame, fit, method, plot):
+    values = data.to_numpy(dtype=float)
+    years = data.index.to_numpy()
+    if fit == "linear":
+        curves = curvefit.linear(years, values)
+    else:
+        curves = curvefit.horizontal(years, values)
+
+    measured = ~np.isnan(values)
+    output = np.where(measured, detrend_by(values, curves, method), np.nan)
+    if plot:
+        for j, column in enumerate(data.columns):
+            rows = measured[:, j]
+            plot_detrended(column, years[rows], values[rows, j], curves[rows, j], output[rows, j], fit, method)
+    return pd.DataFrame(output, index=data.index.copy(), columns=data.columns.copy())
+
+# Detrends every series of a RingWidthCollection. Values are written straight into
+# a new collection with the same layout, so no dense frame is ever built.
+def detrend_collection(data: RingWidthCollection, fit, method, plot, period=None, engine="python", cache=None):
+    output = np.full(len(data.values), np.nan)
+    xs, ys, masks = [], [], []
+    for series_name in data.names:
+        values = data[series_name]
+        measured = ~np.isnan(values)
+        xs.append(data.years(series_name)[measured])
+        ys.append(values[measured])
+        masks.append(measured)
+
+    periods = [series_period(period, series_name) for series_name in data.names]
+    results = detrend_cached(xs, ys, fit, method, periods, engine, cache)
+
+    for i, (series_name, (yi, detrended_data)) in enumerate(zip(data.names, results)):
+        if plot:
+            plot_detrended(series_name, xs[i], ys[i], yi, detrended_data, fit, method)
+
+        output[data.offsets[i]:data.offsets[i + 1]][masks[i]] = detrended_data
+    return data.with_values(output)
+
+# Detrends (name, start year, values) tuples one at a time as they are requested,
+# so only one series is held in memory when reading from dpl.iter_series().
+def detrend_stream(data, fit, method, plot, period=None, cache=None):
+    for series_name, start_year, values in data:
+        values = np.asarray(values, dtype=float)
+        measured = ~np.isnan(values)
+        x = np.arange(start_year, start_year + len(values))[measured]
+        y = values[measured]
 
+        [(yi, detrended_data)] = detrend_cached([x], [y], fit, method, [series_period(period, series_name)], "python", cache)
+
+        if plot:
+            plot_detrended(series_name, x, y, yi, detrended_data, fit, method)
+
+        output = np.full(len(values), np.nan)
+        output[measured] = detrended_data
+        yield series_name, start_year, output
+
+# Fits the curve to the values of a series and detrends them, returns the curve and the detrended values
+def detrend_values(x, y, fit, method, period=None):
     if fit == "spline":
         yi = spline(x, y, period)
     elif fit == "ModNegEx":
@@ -109,36 +312,130 @@ def detrend_series(data: pd.Series, fit, method, plot, period=None):
     else:
         # give error message for unsupported curve fit
         raise ValueError("unsupported keyword for curve-fit type. See documentation for more info.")
-    
+
+    return yi, detrend_by(y, yi, method)
+
+# Fits the curves of many series and detrends them with the given engine: one series at a
+# time, lazily, with 'python', or with detrend_many with the others. Yields or returns a
+# (curve, detrended values) tuple per series, in order.
+def detrend_each(xs, ys, fit, method, periods, engine="python"):
+    if engine != "python":
+        return detrend_many(xs, ys, fit, method, periods, engine)
+    return (detrend_values(x, y, fit, method, period) for x, y, period in zip(xs, ys, periods))
+
+# Fits and detrends many series like detrend_each, but only fits the series whose curve
+# isn't in the cache, and stores their curves in it. Without a cache, this is detrend_each.
+def detrend_cached(xs, ys, fit, method, periods, engine="python", cache=None):
+    if cache is None:
+        return detrend_each(xs, ys, fit, method, periods, engine)
+
+    keys, curves = cached_curves(xs, ys, fit, periods, engine, cache)
+    results = [None if curve is None else (curve, detrend_by(y, curve, method)) for y, curve in zip(ys, curves)]
+    missing = [i for i, curve in enumerate(curves) if curve is None]
+    fitted = detrend_each([xs[i] for i in missing], [ys[i] for i in missing], fit, method,
+                          [periods[i] for i in missing], engine)
+    for i, (yi, detrended_data) in zip(missing, fitted):
+        cache.put(keys[i], yi)
+        results[i] = (yi, detrended_data)
+    return results
+
+# Looks the curves of many series up in the cache, returns their keys and the curves found,
+# None for the others (and for every series without a cache)
+def cached_curves(xs, ys, fit, periods, engine, cache=None):
+    if cache is None:
+        return [None] * len(xs), [None] * len(xs)
+    keys = [cache.key(x, y, fit, period, engine) for x, y, period in zip(xs, ys, periods)]
+    return keys, [cache.get(key) for key in keys]
+
+# Fits the curves of many series and detrends them, returns a (curve, detrended values)
+# tuple per series. With the 'numpy' engine, splines of series measured at the same
+# spacing of years, with the same period, are fitted together in a single csaps solve:
+# only the spacing (not the years themselves) and the period define them. The 'banded'
+# engine fits all splines at once with spline_banded. Both engines fit ModNegEx and
+# Hugershoff curves with detrend_curves. Other fits are done one series at a time.
+def detrend_many(xs, ys, fit, method, periods, engine="numpy"):
+    if fit in ("ModNegEx", "Hugershoff"):
+        return detrend_curves(xs, ys, fit, method, periods)
+    if fit != "spline":
+        return [detrend_values(x, y, fit, method, period) for x, y, period in zip(xs, ys, periods)]
+
+    if engine == "banded":
+        # Series too short for a spline are fitted alone, to fail as they would on their own
+        fitted = [i for i, x in enumerate(xs) if len(x) >= 2]
+        yis = spline_banded([xs[i] for i in fitted], [ys[i] for i in fitted], [periods[i] for i in fitted])
+        results = [None] * len(xs)
+        for i, yi in zip(fitted, yis):
+            results[i] = (yi, detrend_by(ys[i], yi, method))
+        return [result if result is not None else detrend_values(x, y, fit, method, period)
+                for result, x, y, period in zip(results, xs, ys, periods)]
+
+    groups = {}
+    for i, (x, period) in enumerate(zip(xs, periods)):
+        # Series too short for a spline are fitted alone, to fail as they would on their own
+        key = (len(x), np.diff(x).tobytes(), get_period(period, len(x))) if len(x) >= 2 else i
+        groups.setdefault(key, []).append(i)
+
+    results = [None] * len(xs)
+    for members in groups.values():
+        first = members[0]
+        if len(members) == 1:
+            results[first] = detrend_values(xs[first], ys[first], fit, method, periods[first])
+            continue
+        yis = spline_rows(xs[first], np.vstack([ys[i] for i in members]), periods[first])
+        for i, yi in zip(members, yis):
+            results[i] = (yi, detrend_by(ys[i], yi, method))
+    return results
+
+# Fits the ModNegEx or Hugershoff curves of all series together. Series curve_fit can't fit
+# on their own (fewer values than parameters, or constant values for Hugershoff, whose
+# bounds would be empty), and those whose batched fit didn't converge, are fitted alone.
+def detrend_curves(xs, ys, fit, method, periods):
+    fit_many, n_params = (curvefit.negex_many, 3) if fit == "ModNegEx" else (curvefit.hugershoff_many, 4)
+    fitted = [i for i, y in enumerate(ys) if len(y) >= n_params and (fit == "ModNegEx" or np.ptp(y) > 0)]
+    yis, _, converged = fit_many([ys[i] for i in fitted])
+
+    results = [None] * len(xs)
+    for i, yi, ok in zip(fitted, yis, converged):
+        if ok:
+            results[i] = (yi, detrend_by(ys[i], yi, method))
+    return [result if result is not None else detrend_values(x, y, fit, method, period)
+            for result, x, y, period in zip(results, xs, ys, periods)]
+
+# Period of the spline of one series: `period` itself, or the entry of the series when
+# periods are given per series (a dict or pandas series; series left out use the default)
+def series_period(period, series_name):
+    if isinstance(period, (dict, pd.Series)):
+        period = period.get(series_name)
+        return None if period is None or pd.isna(period) else period
+    return period
+
+# Detrends values by their curve fit, with the given method
+def detrend_by(y, yi, method):
     if method == "residual":
-        detrended_data = residual(y, yi)
+        return residual(y, yi)
     elif method == "difference":
-        detrended_data = difference(y, yi)
+        return difference(y, yi)
     else:
         # give error message for unsupported detrending method
         raise ValueError("unsupported keyword for detrending method. See documentation for more info.")
-    
-    if plot:
-        fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(7,3))
-    
-        axes[0].plot(x, y, "k-", x, yi, "r-", linewidth=2)
-        axes[0].set_xlabel('Year')
-        axes[0].set_ylabel('Ring Width')
-        axes[0].set_title(series_name + " curve fit to " + fit)
 
-        axes[1].plot(x, detrended_data, 'k-')
-        axes[1].set_xlabel('Year')
-        axes[1].set_ylabel('Index')
-        axes[1].set_title(series_name + " detrended by " + method)
-
-        fig.tight_layout()
+# Plots the curve fit and the detrended values of a series side by side
+def plot_detrended(series_name, x, y, yi, detrended_data, fit, method):
+    fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(7,3))
     
-        plt.show()
+    axes[0].plot(x, y, "k-", x, yi, "r-", linewidth=2)
+    axes[0].set_xlabel('Year')
+    axes[0].set_ylabel('Ring Width')
+    axes[0].set_title(series_name + " curve fit to " + fit)
 
-    return pd.Series(detrended_data, index=pd.Index(data=x, name="Year"), name=series_name).combine(data, pick_first)
+    axes[1].plot(x, detrended_data, 'k-')
+    axes[1].set_xlabel('Year')
+    axes[1].set_ylabel('Index')
+    axes[1].set_title(series_name + " detrended by " + method)
 
-def pick_first(a, b):
-    return a
+    fig.tight_layout()
+    
+    plt.show()
 
 # Detrends by finding ratio of original series data to curve data
 def residual(y, yi):
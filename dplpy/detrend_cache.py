@@ -0,0 +1,299 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: detrend_cache.py
+# Project: OpenDendro dplPy
+# Description: Memoizes the curves fitted by dpl.detrend(cache=...). Each curve is stored
+#              under a hash of the years and values of its series, the fit, the period of
+#              the spline and the engine, so a series is only fitted again once its values
+#              or the fit change. Curves are kept in memory, least recently used first out
+#              once they take more than the byte budget, and optionally saved as .npy files
+#              in a directory, so they outlive the process. Hits and misses are counted.
+#              A process-wide default cache set with set_detrend_cache() is also used by
+#              functions that detrend on their own, such as writers() or chron_stabilized().
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl")
+# >>> cache = dpl.DetrendCache(max_bytes=256 * 1024 ** 2, directory="/scratch/dplpy-fits")
+# >>> rwi = dpl.detrend(data, plot=False, cache=cache)
+# >>> rwi = dpl.detrend(data, method="difference", plot=False, cache=cache)
+# >>> cache.hits, cache.misses
+# >>> dpl.set_detrend_cache(cache)
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+DEFAULT_MAX_DISK_BYTES = 1024 ** 3
+CACHE_VERSION = 1
+
+# Cache used by detrend() when none is given, see set_detrend_cache()
+default_cache = None
+# Cache used by detrend(cache=True), created when first needed
+shared_cache = None
+
+
+class DetrendCache:
+    """Cache of the curves fitted by dpl.detrend()
+
+    Parameters
+    ----------
+    max_bytes : int, default 256 MiB
+        size limit of the curves kept in memory. Least recently used curves
+        are dropped when it is exceeded.
+    directory : str, default None
+        where curves are also saved, as .npy files, so they can be reused by
+        other processes and later sessions. Curves are only kept in memory
+        by default.
+    max_disk_bytes : int, default 1 GiB
+        size limit of the saved curves. Least recently used files are
+        removed when it is exceeded, down to 90% of it.
+
+    Attributes
+    ----------
+    hits : int
+        number of curves found in the cache, in memory or on disk.
+    misses : int
+        number of curves that had to be fitted.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> cache = dpl.DetrendCache(directory="/scratch/dplpy-fits")
+    >>> rwi = dpl.detrend(data, plot=False, cache=cache)
+    >>> cache.hits, cache.misses
+    >>> cache.clear()
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        if not isinstance(max_bytes, int) or max_bytes < 0:
+            raise ValueError("max_bytes should be a non-negative integer")
+        self.max_bytes = max_bytes
+        self.directory = None if directory is None else os.fspath(directory)
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.disk_bytes = None
+        self.lock = threading.Lock()
+
+    def key(self, x, y, fit, period=None, engine="python"):
+        """Key of the curve of the series with years x and values y."""
+        digest = hashlib.blake2b(digest_size=16)
+        options = (CACHE_VERSION, fit, engine, repr(period) if fit == "spline" else None, len(y))
+        digest.update(repr(options).encode("utf-8") + b"\0")
+        digest.update(np.ascontiguousarray(x, dtype=float).tobytes())
+        digest.update(np.ascontiguousarray(y, dtype=float).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the curve stored under `key`, or None, counting a hit or a miss."""
+        with self.lock:
+            curve = self.entries.get(key)
+            if curve is not None:
+                self.entries.move_to_end(key)
+        if curve is None and self.directory is not None:
+            curve = self.load(key)
+            if curve is not None:
+                self.remember(key, curve)
+        with self.lock:
+            if curve is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return curve
+
+    def put(self, key, curve):
+        """Stores a curve under `key`, in memory and in the directory if there is one."""
+        curve = np.array(curve, dtype=float)
+        curve.setflags(write=False)
+        self.remember(key, curve)
+        if self.directory is not None:
+            self.save(key, curve)
+
+    def remember(self, key, curve):
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+            if curve.nbytes > self.max_bytes:
+                return
+            self.entries[key] = curve
+            self.nbytes += curve.nbytes
+            while self.nbytes > self.max_bytes:
+                _, dropped = self.entries.popitem(last=False)
+                self.nbytes -= dropped.nbytes
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def load(self, key):
+        entry = self.entry_path(key)
+        try:
+            curve = np.load(entry, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+
+        # Mark the file as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        curve.setflags(write=False)
+        return curve
+
+    def save(self, key, curve):
+        # Written to a temporary file renamed over the entry, so concurrent readers never
+        # see half a file
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                np.save(temp_file, curve, allow_pickle=False)
+            os.replace(temp_path, self.entry_path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        # The directory is only listed again once the saved curves may exceed the limit
+        with self.lock:
+            if self.disk_bytes is not None:
+                self.disk_bytes += curve.nbytes + 128
+            over = self.disk_bytes is None or self.disk_bytes > self.max_disk_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Removes least recently used files until the directory fits in 90% of
+        max_disk_bytes, so it isn't listed again at every new curve once full."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_disk_bytes:
+            self.disk_bytes = total
+            return
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes * 9 // 10:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+        self.disk_bytes = total
+
+    def clear(self):
+        """Removes every cached curve, in memory and on disk, and resets the counters."""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+        if self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+            self.disk_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def size(self):
+        """Total size in bytes of the curves kept in memory."""
+        return self.nbytes
+
+
+def set_detrend_cache(cache):
+    """Sets the cache used by dpl.detrend() when none is given
+
+    Extended Summary
+    ----------------
+    Curves fitted by every later call to dpl.detrend() without a `cache`
+    argument are memoized in this cache, including the calls made by other
+    functions such as writers() and chron_stabilized(), so unchanged series
+    are never fitted twice.
+
+    Parameters
+    ----------
+    cache : boolean, str, DetrendCache or None
+        the cache to use: True for a shared in-memory cache, a directory for
+        a DetrendCache saving its curves there, a DetrendCache, or None or
+        False to stop caching.
+
+    Returns
+    -------
+    previous : DetrendCache or None
+        the cache used until now.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> cache = dpl.DetrendCache()
+    >>> dpl.set_detrend_cache(cache)
+    >>> dpl.writers(data, "ca533", "crn")
+    >>> cache.hits, cache.misses
+    >>> dpl.set_detrend_cache(None)
+
+    """
+    global default_cache
+    previous = default_cache
+    default_cache = None if cache is None or cache is False else get_cache(cache)
+    return previous
+
+# Returns the cache to use for the `cache` argument of dpl.detrend(), None for no caching
+def get_cache(cache):
+    global shared_cache
+    if cache is None:
+        return default_cache
+    elif cache is False:
+        return None
+    elif isinstance(cache, DetrendCache):
+        return cache
+    elif cache is True:
+        if shared_cache is None:
+            shared_cache = DetrendCache()
+        return shared_cache
+    elif isinstance(cache, (str, os.PathLike)):
+        return DetrendCache(directory=cache)
+    raise TypeError("cache should be True, False, a directory or a DetrendCache, not " + str(type(cache)))
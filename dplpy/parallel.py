@@ -0,0 +1,137 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: parallel.py
+# Project: OpenDendro dplPy
+# Description: Runs a function over the columns of a dataframe in worker processes, as
+#              detrend() and ar_func() do with n_jobs. The values of the dataframe are
+#              copied once into shared memory instead of being pickled to every worker,
+#              and the columns are split into contiguous chunks, a few per worker. Each
+#              chunk writes its results into output arrays in shared memory, at the
+#              columns it was given, so the output never depends on which worker finished
+#              first.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl", header=True)
+# >>> rwi = dpl.detrend(data, plot=False, n_jobs=8)
+# >>> ar = dpl.ar_func(rwi, n_jobs=8)
+
+import contextlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Chunks of columns handed out per worker, so workers given the slowest columns don't hold
+# up the others
+CHUNKS_PER_WORKER = 4
+
+
+# Number of worker processes to use: all available cores for None
+def check_n_jobs(n_jobs):
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer or None")
+    return n_jobs
+
+# Whether a dataframe can be handled as one array: numeric columns with unique names,
+# indexed by unique, increasing years. Others are handled one series at a time.
+def is_numeric_frame(data):
+    return (data.columns.is_unique and data.index.is_unique and data.index.is_monotonic_increasing
+            and all(dtype.kind in "iuf" for dtype in data.dtypes) and data.index.dtype.kind in "iuf")
+
+# Splits n_columns columns into contiguous (start, stop) ranges, a few per worker
+def column_chunks(n_columns, n_jobs):
+    n_chunks = max(1, min(n_columns, n_jobs * CHUNKS_PER_WORKER))
+    bounds = np.linspace(0, n_columns, n_chunks + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+# Calls function(columns, job, values, outputs) on chunks of the columns of a 2D float
+# array, in n_jobs worker processes or on the given executor. columns is the (start, stop)
+# range of the chunk and job what jobs(start, stop) returned for it. values is the array
+# and outputs arrays of the shapes in output_shapes, all in shared memory, and the function
+# writes its results into the columns of its chunk. Returns copies of the outputs, NaN
+# wherever nothing was written, and the list of what each chunk returned, in order.
+def map_columns(function, values, jobs, output_shapes, n_jobs=1, executor=None):
+    chunks = column_chunks(values.shape[1], n_jobs)
+    shapes = [values.shape] + list(output_shapes)
+    with contextlib.ExitStack() as stack:
+        blocks = [stack.enter_context(shared_block(shape)) for shape in shapes]
+        layout = [(block.name, shape) for block, shape in zip(blocks, shapes)]
+        with attached(layout, blocks) as arrays:
+            arrays[0][...] = values
+            for output in arrays[1:]:
+                output.fill(np.nan)
+        tasks = [(function, layout, (start, stop), jobs(start, stop)) for start, stop in chunks]
+
+        if not tasks:
+            returned = []
+        elif executor is not None:
+            returned = list(executor.map(run_chunk, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+                returned = list(pool.map(run_chunk, tasks))
+
+        with attached(layout, blocks) as arrays:
+            outputs = [output.copy() for output in arrays[1:]]
+        return outputs, returned
+
+# Creates a block of shared memory large enough for a float array of the given shape, and
+# frees it afterwards
+@contextlib.contextmanager
+def shared_block(shape):
+    block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+    try:
+        yield block
+    finally:
+        block.close()
+        block.unlink()
+
+# Yields float arrays viewing the shared memory blocks of a layout, attaching to them by
+# name unless the blocks are given. Views must be gone before a block can be closed.
+@contextlib.contextmanager
+def attached(layout, blocks=None):
+    owned = blocks is None
+    if owned:
+        blocks = [shared_memory.SharedMemory(name=name) for name, _ in layout]
+    arrays = [np.ndarray(shape, dtype=float, buffer=block.buf) for block, (_, shape) in zip(blocks, layout)]
+    try:
+        yield arrays
+    finally:
+        arrays.clear()
+        if owned:
+            for block in blocks:
+                # a traceback may still hold views of the block, which is then closed on exit
+                with contextlib.suppress(BufferError):
+                    block.close()
+
+# Runs one chunk in a worker: attaches the shared arrays and calls the function on them
+def run_chunk(task):
+    function, layout, columns, job = task
+    with attached(layout) as arrays:
+        return function(columns, job, arrays[0], arrays[1:])
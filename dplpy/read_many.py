@@ -0,0 +1,179 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: read_many.py
+# Project: OpenDendro dplPy
+# Description: Reads many ring width files (a directory, a glob pattern or a list of
+#              paths) in parallel worker processes, collecting per-file errors instead
+#              of stopping at the first bad file.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> sites, errors = dpl.read_many("../tests/data/rwl/*.rwl", header=True)
+# >>> network, errors = dpl.read_many("/itrdb/northamerica/usa", combine=True, n_jobs=8)
+
+import contextlib
+import glob
+import io
+import os
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from readers import readers, COMPRESSIONS
+
+SUPPORTED_EXTENSIONS = (".CSV", ".RWL", ".RAW")
+# Data files, compressed or not
+SUPPORTED_FILES = SUPPORTED_EXTENSIONS + tuple(extension + compression for extension in SUPPORTED_EXTENSIONS
+                                               for compression in COMPRESSIONS)
+
+def read_many(paths, n_jobs=None, skip_lines=0, header=False, engine="numpy", combine=False, cache=False):
+    """Imports many ring width data files in parallel
+
+    Extended Summary
+    ----------------
+    Reads every file matched by `paths` with dpl.readers(), spreading the
+    files over a pool of worker processes. Nothing is printed. Files that
+    can't be read don't stop the others; their error messages are returned
+    alongside the data.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        a directory (searched recursively for .csv, .rwl and .raw files,
+        including compressed ones such as .rwl.gz), a glob pattern, or a list
+        of file paths.
+    n_jobs : int, default None
+        number of worker processes. None uses all available cores, 1 reads
+        the files one after the other in the current process.
+    skip_lines : int, default 0
+        passed to dpl.readers() for every file.
+    header : boolean, default False
+        passed to dpl.readers() for every file.
+    engine : str, default numpy
+        passed to dpl.readers() for every file.
+    combine : boolean, default False
+        when True, returns a single dataframe whose columns are a
+        (site, series) MultiIndex instead of one dataframe per site.
+    cache : boolean, str or ReadersCache, default False
+        passed to dpl.readers() for every file.
+
+    Returns
+    -------
+    data : dict of pandas dataframes keyed by site, or a pandas dataframe
+        sites are named after their file, without the extension (and
+        compression extension).
+    errors : dict
+        error message for each site that couldn't be read.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> sites, errors = dpl.read_many("../tests/data/rwl", header=True)
+    >>> sites["ca533"]
+    >>> network, errors = dpl.read_many(["a.rwl", "b.rwl"], combine=True, n_jobs=2)
+
+    """
+    filenames = find_files(paths)
+    sites = get_site_names(filenames)
+    jobs = [(filename, skip_lines, header, engine, cache) for filename in filenames]
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer or None")
+
+    if n_jobs == 1 or len(jobs) <= 1:
+        results = [read_one(job) for job in jobs]
+    else:
+        workers = min(n_jobs, len(jobs))
+        # Hand files out in small batches to keep per-task overhead low while
+        # still balancing files of very different sizes across workers.
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read_one, jobs, chunksize=chunksize))
+
+    data = {}
+    errors = {}
+    for site, (series_data, error) in zip(sites, results):
+        if error is None:
+            data[site] = series_data
+        else:
+            errors[site] = error
+
+    if combine:
+        if len(data) == 0:
+            data = pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=["Site", "Series"]))
+        else:
+            data = pd.concat(data, axis=1, names=["Site", "Series"]).sort_index()
+    return data, errors
+
+# Reads one file quietly. Returns (dataframe, None) on success and (None, error message)
+# otherwise, so one bad file never brings down the whole batch.
+def read_one(job):
+    filename, skip_lines, header, engine, cache = job
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return readers(filename, skip_lines=skip_lines, header=header, engine=engine, cache=cache), None
+    except Exception as err:
+        return None, read_error(err, output)
+
+# Error message of a file readers() failed on: the exception followed by what readers()
+# printed about it, such as the line it couldn't read
+def read_error(err, output):
+    details = "\n".join(line for line in output.getvalue().splitlines()
+                        if line.strip() and not line.startswith("Attempting to read input file"))
+    message = type(err).__name__ + ": " + str(err).strip()
+    if details:
+        message += "\n" + details
+    return message
+
+# Expands a directory, glob pattern or list of paths into a sorted list of files
+def find_files(paths):
+    if isinstance(paths, (str, os.PathLike)):
+        paths = os.fspath(paths)
+        if os.path.isdir(paths):
+            pattern = os.path.join(glob.escape(paths), "**", "*")
+            return sorted(name for name in glob.glob(pattern, recursive=True)
+                          if os.path.isfile(name) and name.upper().endswith(SUPPORTED_FILES))
+        matches = sorted(glob.glob(paths, recursive=True))
+        return matches if matches else [paths]
+    return [os.fspath(path) for path in paths]
+
+# Names each file after its base name. Files that share a base name keep their full path.
+def get_site_names(filenames):
+    stems = [site_name(filename) for filename in filenames]
+    counts = Counter(stems)
+    return [stem if counts[stem] == 1 else filename for stem, filename in zip(stems, filenames)]
+
+# Base name of a file without its extension, nor its compression extension
+def site_name(filename):
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    if extension.upper() in COMPRESSIONS:
+        stem = os.path.splitext(stem)[0]
+    return stem
@@ -30,12 +30,34 @@ __license__ = "GNU GPLv3"
 #              and stores them in a dataframe
 
 import os
+import re
 import sys
+import io
+import gzip
+import bz2
+import lzma
+import zipfile
+import itertools
 import pandas as pd
 import numpy as np
 import warnings
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from readers_cache import get_cache
 
-def readers(filename: str, skip_lines=0, header=False):
+# Number of lines decoded at a time by the numpy engine, and bytes scanned at a time when
+# looking for line breaks.
+BLOCK_LINES = 65536
+SCAN_BYTES = 64 * 1024 * 1024
+# Smallest byte range handed to a worker process when a single file is read with n_jobs
+MIN_CHUNK_BYTES = 4 * 1024 * 1024
+# Decompressed bytes handed to the numpy engine at a time when reading compressed files
+STREAM_BYTES = 16 * 1024 * 1024
+
+# Compression of input files, from their last extension
+COMPRESSIONS = {".GZ": "gzip", ".BZ2": "bz2", ".XZ": "xz", ".ZIP": "zip"}
+
+def readers(filename: str, skip_lines=0, header=False, engine="python", cache=False, memory_map=False, n_jobs=1):
     """Imports a common ring width data file
     
     Extended Summary
@@ -46,12 +68,36 @@ def readers(filename: str, skip_lines=0, header=False):
     Parameters
     ----------
     filename : str
-        a data file (.CSV, .RWL or .RAW)
+        a data file (.CSV, .RWL or .RAW), possibly compressed with gzip, bzip2,
+        xz or zip (.rwl.gz, .csv.xz, .rwl.zip...). Compressed files are
+        decompressed on the fly while they are read. A file inside a zip
+        archive holding several files is named like "archive.zip/file.rwl".
+        Parquet and Arrow files (.PARQUET, .ARROW or .FEATHER) written by
+        dpl.writers() are read back exactly as they were written.
     header : boolean, default False
         a flag indicating whether a 3-line header is at the top of the file.
     skip_lines : int, default 0
         indicates how many of the first few lines of the file to skip
         when reading it.
+    engine : str, default python
+        parser used for .RWL/.RAW files. 'python' reads the file line by line,
+        'numpy' decodes all decade lines at once with array operations and is
+        much faster on large files. Both produce the same dataframe.
+    cache : boolean, str or ReadersCache, default False
+        keep the parsed data in an on-disk cache and reuse it as long as the
+        file doesn't change. True uses the default cache directory, a string
+        names the cache directory, and a ReadersCache sets the size limit too.
+    memory_map : boolean, default False
+        map the file into memory instead of reading it into a buffer first,
+        which keeps memory use close to the size of the parsed data on very
+        large files. Applies to .csv files and to the 'numpy' engine (the
+        'python' engine already reads files one line at a time).
+    n_jobs : int, default 1
+        number of worker processes the 'numpy' engine splits a .RWL/.RAW file
+        between. None uses all available cores. Files are split into ranges
+        of whole lines of at least a few megabytes, so small files are still
+        read in the current process, as are compressed files. The result is
+        the same as with n_jobs=1.
     
     Returns
     -------
@@ -62,22 +108,47 @@ def readers(filename: str, skip_lines=0, header=False):
     >>> import dplpy as dpl
     >>> data = dpl.readers("../tests/data/csv/file.csv")
     >>> data = dpl.readers("../tests/data/csv/file.rwl", header=True)
+    >>> data = dpl.readers("../tests/data/rwl/file.rwl", engine="numpy")
+    >>> data = dpl.readers("../tests/data/rwl/file.rwl", cache=True)
+    >>> data = dpl.readers("../tests/data/rwl/file.rwl", engine="numpy", memory_map=True)
+    >>> data = dpl.readers("../tests/data/rwl/network.rwl", engine="numpy", n_jobs=8)
+    >>> data = dpl.readers("../tests/data/rwl/file.rwl.gz", engine="numpy")
+    >>> data = dpl.readers("../tests/data/archive.zip/file.rwl")
+    >>> data = dpl.readers("ca533.parquet")
     
     References
     ----------
     .. [1] https:/opendendro.org/dplpy-man/#readers
 
     """
-    FORMAT = "." + filename.split(".")[-1]
+    path, compression, member, name = resolve_input(filename)
+    FORMAT = "." + name.split(".")[-1]
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer or None")
+    if engine == "python":
+        process_rwl = lambda filename, skip_lines, header: process_rwl_pandas(filename, skip_lines, header)
+    elif engine == "numpy":
+        process_rwl = lambda filename, skip_lines, header: process_rwl_numpy(filename, skip_lines, header, memory_map, n_jobs)
+    else:
+        raise ValueError("unsupported parser engine " + repr(engine) + ". Accepted engines are 'python' and 'numpy'")
     print("\nAttempting to read input file: " + os.path.basename(filename) + " as " + FORMAT + " format\n")
     
     # open the input file and read its data into a pandas dataframe
-    if filename.upper().endswith(".CSV"):
-        series_data = pd.read_csv(filename, skiprows=skip_lines)
-    elif filename.upper().endswith(".RWL"):
-        series_data = process_rwl_pandas(filename, skip_lines, header)
-    elif filename.upper().endswith(".RAW"):
-        series_data = process_rwl_pandas(filename, skip_lines, header)
+    if name.upper().endswith(".CSV"):
+        if compression is not None:
+            parse = lambda: process_csv_compressed(filename, skip_lines)
+        elif memory_map:
+            parse = lambda: pd.read_csv(filename, skiprows=skip_lines, memory_map=True)
+        else:
+            parse = lambda: pd.read_csv(filename, skiprows=skip_lines)
+    elif name.upper().endswith(".RWL"):
+        parse = lambda: process_rwl(filename, skip_lines, header)
+    elif name.upper().endswith(".RAW"):
+        parse = lambda: process_rwl(filename, skip_lines, header)
+    elif name.upper().endswith((".PARQUET", ".ARROW", ".FEATHER")):
+        parse = lambda: process_columnar(path, compression, member, name)
     else:
         errorMsg = """
 
@@ -92,6 +163,12 @@ Example usages:
         
         raise ValueError(errorMsg)
 
+    if cache is False or cache is None:
+        series_data = parse()
+    else:
+        options = (FORMAT.upper(), skip_lines, header) if member is None else (FORMAT.upper(), skip_lines, header, member)
+        series_data = get_cache(cache).read(path, options, parse)
+
     # If no data is returned, then an error was encountered when reading the file.
     if series_data is None:
         errorMsg = """
@@ -114,10 +191,9 @@ def process_rwl_pandas(filename, skip_lines, header):
     if header is True:
         skip_lines += 3 # working with the assumption that headers are 3 lines long
 
-    with open(filename, "r") as rwl_file:
-        file_lines = rwl_file.readlines()[skip_lines:]
-    
-    rwl_data, first_date, last_date = read_rwl(file_lines, skip_lines)
+    with open_text(filename) as rwl_file:
+        file_lines = itertools.islice(rwl_file, skip_lines, None)
+        rwl_data, first_date, last_date = read_rwl(file_lines, skip_lines)
     if rwl_data is None:
         return None
 
@@ -157,23 +233,12 @@ def read_rwl(lines, skip_lines):
                 warn_msg = "Empty line found at line " + str(line_ct) + "\n"
                 warnings.warn(warn_msg)
                 continue
-            if line[7] != '-' and line[6] != '-':
-                series_id = line[:8].strip()
-                iyr = int(line[8:12])
-            elif line[7] == '-':
-                series_id = line[:7].strip()
-                iyr = int(line[7:12]) 
-            elif line[6] == '-':
-                series_id = line[:6].strip()
-                iyr = int(line[6:12])
+            series_id, line_start, dataline = split_rwl_line(line)
 
             if series_id not in rwl_data:
                 rwl_data[series_id] = {}
 
-            dataline = [line[i:i+6] for i in range(12, len(line), 6) if line[i:i+6].strip()]
-            
             # keep track of the first and last date in the dataset
-            line_start = int(iyr)
             first_date = min(first_date, line_start)
             last_date = max(last_date, (line_start+len(dataline)-1))
 
@@ -194,4 +259,506 @@ def read_rwl(lines, skip_lines):
             print("Error reading line", line_ct + 1, ":\n", line, "\n")
             print(err)
             return None, None, None
-    return rwl_data, first_date, last_date
\ No newline at end of file
+    return rwl_data, first_date, last_date
+
+# Splits a line of a .rwl file into its series name, the year of its first value and its
+# non-blank 6-character value fields. Raises ValueError or IndexError on malformed lines.
+def split_rwl_line(line):
+    if line[7] != '-' and line[6] != '-':
+        series_id = line[:8].strip()
+        iyr = int(line[8:12])
+    elif line[7] == '-':
+        series_id = line[:7].strip()
+        iyr = int(line[7:12]) 
+    elif line[6] == '-':
+        series_id = line[:6].strip()
+        iyr = int(line[6:12])
+
+    dataline = [line[i:i+6] for i in range(12, len(line), 6) if line[i:i+6].strip()]
+    return series_id, int(iyr), dataline
+
+def iter_series(filename: str, skip_lines=0, header=False):
+    """Reads the series of a ring width file one at a time
+    
+    Extended Summary
+    ----------------
+    Reads a .RWL or .RAW file line by line, and yields each series as soon as
+    its stop marker (999 or -9999) is read. Only the series that haven't
+    reached their stop marker yet are held in memory, so files of any size
+    can be processed series by series. Lines are read exactly as dpl.readers()
+    reads them.
+    
+    Parameters
+    ----------
+    filename : str
+        a data file (.RWL or .RAW)
+    skip_lines : int, default 0
+        indicates how many of the first few lines of the file to skip
+        when reading it.
+    header : boolean, default False
+        a flag indicating whether a 3-line header is at the top of the file.
+    
+    Yields
+    ------
+    series_id : str
+        name of the series.
+    start_year : int
+        year of the first value of the series.
+    values : numpy array
+        ring widths of every year from `start_year` to the last measured
+        year, with NaN for missing years.
+    
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> for series_id, start_year, values in dpl.iter_series("../tests/data/rwl/ca533.rwl"):
+    ...     print(series_id, start_year, len(values))
+    >>> dpl.stats(dpl.iter_series("../tests/data/rwl/ca533.rwl"))
+    >>> rwi = dpl.detrend(dpl.iter_series("../tests/data/rwl/ca533.rwl"), plot=False)
+    
+    References
+    ----------
+    .. [1] https:/opendendro.org/dplpy-man/#readers
+
+    """
+    if not resolve_input(filename)[3].upper().endswith((".RWL", ".RAW")):
+        raise ValueError("iter_series reads .rwl and .raw files, got " + os.path.basename(filename))
+    if header is True:
+        skip_lines += 3 # working with the assumption that headers are 3 lines long
+
+    # values read so far for each series whose stop marker hasn't been seen yet
+    pending = {}
+    with open_text(filename) as rwl_file:
+        for line_ct, line in enumerate(rwl_file, start=1):
+            if line_ct <= skip_lines:
+                continue
+            line = line.rstrip("\n")
+            if len(line.strip()) < 7:
+                warnings.warn("Empty line found at line " + str(line_ct) + "\n")
+                continue
+            try:
+                series_id, line_start, dataline = split_rwl_line(line)
+                series = pending.setdefault(series_id, {"first": line_start, "values": {}})
+                div = None
+                for i in range(0, len(dataline)):
+                    if dataline[i].strip() == "999":
+                        div = 100
+                        continue
+                    elif dataline[i].strip() == "-9999":
+                        div = 1000
+                        continue
+                    series["values"][line_start+i] = float(int(dataline[i]))
+            except (ValueError, IndexError) as err:
+                raise ValueError("Error reading line " + str(line_ct) + ": " + line.strip() + "\n" + str(err))
+
+            if div is not None:
+                del pending[series_id]
+                start_year, values = series_array(series, div)
+                yield series_id, start_year, values
+
+    if pending:
+        raise ValueError("no stop marker found for series: " + ", ".join(pending))
+
+# Lays the values of a series read by iter_series out year by year, divided by its precision
+def series_array(series, div):
+    if not series["values"]:
+        return series["first"], np.empty(0)
+    years = np.fromiter(series["values"].keys(), dtype=np.int64, count=len(series["values"]))
+    start_year = int(years.min())
+    values = np.full(int(years.max()) - start_year + 1, np.nan)
+    values[years - start_year] = np.fromiter(series["values"].values(), dtype=float, count=len(years))
+    return start_year, values / div
+
+# Reads a compressed .csv file, decompressing it on the fly
+def process_csv_compressed(filename, skip_lines):
+    path, compression, member, _ = resolve_input(filename)
+    with open_input(path, compression, member) as stream:
+        return pd.read_csv(stream, skiprows=skip_lines)
+
+# Reads a Parquet or Arrow file written by dpl.writers(), with the years in a 'Year' column
+def process_columnar(path, compression, member, name):
+    from columnar import read_columnar
+    format = name.split(".")[-1].lower()
+    if compression is None:
+        data = read_columnar(path, format=format)
+    else:
+        with open_input(path, compression, member) as stream:
+            data = read_columnar(io.BytesIO(stream.read()), format=format)
+    return data.rename_axis("Year").reset_index()
+
+# Works out how to open an input file. Returns the path of the file on disk, its compression
+# (None, 'gzip', 'bz2', 'xz' or 'zip'), the file to read inside a zip archive, and the name
+# of the data file, whose extension gives its format. Files inside zip archives are named
+# like "archive.zip/file.rwl"; an archive holding a single file can be given on its own.
+def resolve_input(filename):
+    for match in re.finditer(r"\.zip[/\\]", filename, re.IGNORECASE):
+        if os.path.isfile(filename[:match.start() + 4]):
+            member = filename[match.end():].replace("\\", "/")
+            return filename[:match.start() + 4], "zip", member, member
+
+    extension = os.path.splitext(filename)[1].upper()
+    compression = COMPRESSIONS.get(extension)
+    if compression is None:
+        return filename, None, None, filename
+    elif compression == "zip":
+        with zipfile.ZipFile(filename) as archive:
+            members = [info.filename for info in archive.infolist() if not info.is_dir()]
+        if len(members) != 1:
+            raise ValueError(os.path.basename(filename) + " holds " + str(len(members)) + " files. "
+                             "Name the one to read like " + os.path.basename(filename) + "/file.rwl")
+        return filename, "zip", members[0], members[0]
+    return filename, compression, None, filename[:-len(extension)]
+
+# Opens an input file as a binary stream, decompressing it on the fly
+def open_input(path, compression, member=None):
+    if compression is None:
+        return open(path, "rb")
+    elif compression == "gzip":
+        return gzip.open(path, "rb")
+    elif compression == "bz2":
+        return bz2.open(path, "rb")
+    elif compression == "xz":
+        return lzma.open(path, "rb")
+    # The archive file stays open until the member stream is closed
+    with zipfile.ZipFile(path) as archive:
+        return archive.open(member)
+
+# Opens an input file as text, like open(filename, "r") but decompressing it on the fly
+def open_text(filename):
+    path, compression, member, _ = resolve_input(filename)
+    if compression is None:
+        return open(filename, "r")
+    return io.TextIOWrapper(open_input(path, compression, member))
+
+# Process data from .rwl file with the vectorized parser and store data in a pandas dataframe.
+# Files that the vectorized parser can't guarantee to read exactly like read_rwl (non-ascii
+# text, unusual number formats, series without stop markers, malformed lines...) are handed
+# over to process_rwl_pandas, so both engines always agree, errors included.
+# With memory_map, the file is mapped into memory instead of being read into a bytes object,
+# and decoded straight from the mapping. With n_jobs > 1, large files are decoded by several
+# worker processes, each reading its own part of the file. Compressed files are decompressed
+# and decoded a chunk at a time.
+def process_rwl_numpy(filename, skip_lines, header, memory_map=False, n_jobs=1):
+    total_skip = skip_lines + 3 if header is True else skip_lines
+    path, compression, member, _ = resolve_input(filename)
+    n_chunks = min(n_jobs, os.path.getsize(path) // MIN_CHUNK_BYTES)
+
+    if compression is not None:
+        with open_input(path, compression, member) as stream:
+            parsed = read_rwl_stream(stream, total_skip)
+    elif n_chunks > 1:
+        parsed = read_rwl_parallel(filename, total_skip, n_chunks)
+    elif memory_map and os.path.getsize(filename) > 0:
+        with open(filename, "rb") as rwl_file:
+            with mmap.mmap(rwl_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                parsed = read_rwl_numpy(buffer, total_skip)
+    else:
+        with open(filename, "rb") as rwl_file:
+            buffer = rwl_file.read()
+        parsed = read_rwl_numpy(buffer, total_skip)
+
+    if parsed is None:
+        return process_rwl_pandas(filename, skip_lines, header)
+    return numpy_dataframe(parsed)
+
+# Builds the dataframe of a file decoded by read_rwl_numpy, warning about its empty lines
+def numpy_dataframe(parsed):
+    values, series_ids, first_date, last_date, empty_lines = parsed
+    for line_no in empty_lines:
+        warnings.warn("Empty line found at line " + str(line_no) + "\n")
+
+    df = pd.DataFrame(values, columns=pd.Index(series_ids, dtype=object), copy=False)
+    df.insert(0, "Year", np.arange(first_date, last_date, dtype=np.int64))
+    return df
+
+# Parses integers out of a block of fixed-width ascii fields (shape: ... x width), one
+# character column at a time. Returns the values, a mask of non-blank fields, a mask of
+# fields that int() would accept in the simple '  -123 ' form, the number of digits and
+# the sign character of each field.
+def parse_int_fields(block):
+    shape = block.shape[:-1]
+    values = np.zeros(shape, dtype=np.int64)
+    n_digits = np.zeros(shape, dtype=np.int64)
+    sign = np.full(shape, ord(" "), dtype=np.uint8)
+    started = np.zeros(shape, dtype=bool)
+    ended = np.zeros(shape, dtype=bool)
+    valid = np.ones(shape, dtype=bool)
+
+    columns = np.moveaxis(block, -1, 0).copy()
+    for char in columns:
+        is_space = char == ord(" ")
+        is_digit = (char >= ord("0")) & (char <= ord("9"))
+        is_sign = (char == ord("-")) | (char == ord("+"))
+
+        valid &= is_space | (is_digit & ~ended) | (is_sign & ~started)
+        sign = np.where(is_sign & ~started, char, sign)
+        values = np.where(is_digit, values * 10 + (char - ord("0")), values)
+        n_digits += is_digit
+        ended |= is_space & started
+        started |= ~is_space
+
+    valid &= n_digits > 0
+    values = np.where(sign == ord("-"), -values, values)
+    return values, started, valid, n_digits, sign
+
+# Extract raw data from the bytes of a .rwl file (any buffer: bytes, mmap...) using array
+# operations. Mirrors read_rwl line for line: returns the year x series array of ring widths
+# (already divided by each series' precision), the series names in order of appearance, the
+# first and last date exactly as read_rwl reports them, and the line numbers of empty lines.
+# Returns None when the file has to be read by read_rwl instead.
+def read_rwl_numpy(buffer, skip_lines, block_lines=BLOCK_LINES):
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    lines = find_lines(raw)
+    if lines is None:
+        return None
+    fragment = read_rwl_fragment(raw, lines[0][skip_lines:], lines[1][skip_lines:], block_lines)
+    del raw
+    return merge_rwl_fragments([fragment], skip_lines)
+
+# Splits a .rwl file into byte ranges that start and end on line boundaries, decodes each
+# range in a worker process, and merges the results. Same output as read_rwl_numpy.
+def read_rwl_parallel(filename, skip_lines, n_jobs, block_lines=BLOCK_LINES):
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as rwl_file:
+        if not skip_rwl_lines(rwl_file, skip_lines):
+            return None
+        offset = rwl_file.tell()
+
+        # Move every split point forward to the start of the next line
+        bounds = [offset]
+        for k in range(1, n_jobs):
+            rwl_file.seek(max(offset + (size - offset) * k // n_jobs - 1, bounds[-1]))
+            rwl_file.readline()
+            bounds.append(max(rwl_file.tell(), bounds[-1]))
+        bounds.append(size)
+
+    ranges = [(filename, start, end, block_lines) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    if len(ranges) == 0:
+        return None
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        fragments = list(executor.map(read_rwl_range, ranges))
+    return merge_rwl_fragments(fragments, skip_lines)
+
+# Decodes a .rwl file from a binary stream (such as a decompressing file object), a chunk of
+# whole lines at a time, so the decompressed file is never held in memory at once. Same
+# output as read_rwl_numpy.
+def read_rwl_stream(stream, skip_lines, chunk_bytes=STREAM_BYTES, block_lines=BLOCK_LINES):
+    if not skip_rwl_lines(stream, skip_lines):
+        return None
+
+    fragments = []
+    rest = b""
+    while True:
+        data = stream.read(chunk_bytes)
+        chunk = rest + data
+        # Keep any incomplete last line for the next chunk
+        end = len(chunk) if not data else chunk.rfind(b"\n") + 1
+        rest = chunk[end:]
+        if end > 0:
+            raw = np.frombuffer(chunk[:end], dtype=np.uint8)
+            lines = find_lines(raw)
+            if lines is None:
+                return None
+            fragment = read_rwl_fragment(raw, lines[0], lines[1], block_lines)
+            if fragment is None:
+                return None
+            fragments.append(fragment)
+        if not data:
+            break
+    return merge_rwl_fragments(fragments, skip_lines)
+
+# Moves a binary stream past the first lines of a file. Returns False if they contain a
+# lone '\r', which read_rwl would count as a line break of its own.
+def skip_rwl_lines(stream, skip_lines):
+    skipped = b"".join(stream.readline() for _ in range(skip_lines))
+    return b"\r" not in skipped.replace(b"\r\n", b"")
+
+# Decodes the lines between two byte offsets of a .rwl file, in a worker process
+def read_rwl_range(job):
+    filename, start, end, block_lines = job
+    with open(filename, "rb") as rwl_file:
+        rwl_file.seek(start)
+        raw = np.frombuffer(rwl_file.read(end - start), dtype=np.uint8)
+    lines = find_lines(raw)
+    if lines is None:
+        return None
+    return read_rwl_fragment(raw, lines[0], lines[1], block_lines)
+
+# Decodes consecutive lines block by block, so temporary arrays stay small whatever the size
+# of the file; only the ring widths themselves are kept (as compact integers). Series are
+# numbered locally, in order of appearance. Returns None if read_rwl has to read the file.
+def read_rwl_fragment(raw, starts, ends, block_lines):
+    series_index = {}
+    blocks = []
+    for first in range(0, len(starts), block_lines):
+        block = read_rwl_block(raw, starts[first:first + block_lines], ends[first:first + block_lines], series_index)
+        if block is None:
+            return None
+        block["empty_lines"] += first
+        blocks.append(block)
+    return {"names": list(series_index), "blocks": blocks, "n_lines": len(starts)}
+
+# Combines the decoded fragments of a file, in file order, into the output of read_rwl_numpy.
+# Fragments number their series locally, so series are renumbered in order of first appearance
+# in the file; a series may have lines (and its stop marker) in several fragments.
+def merge_rwl_fragments(fragments, skip_lines):
+    if any(fragment is None for fragment in fragments):
+        return None
+
+    series_index = {}
+    blocks = []
+    line_offset = skip_lines + 1
+    for fragment in fragments:
+        to_global = np.array([series_index.setdefault(name, len(series_index)) for name in fragment["names"]], dtype=np.int32)
+        for block in fragment["blocks"]:
+            for key in ("line_series", "marker_series", "value_series"):
+                block[key] = to_global[block[key]]
+            block["empty_lines"] += line_offset
+            blocks.append(block)
+        line_offset += fragment["n_lines"]
+    if len(blocks) == 0:
+        return None
+
+    def gather(key):
+        return np.concatenate([block[key] for block in blocks])
+
+    empty_lines = gather("empty_lines")
+    line_series, line_start, line_count = gather("line_series"), gather("line_start"), gather("line_count")
+    if len(line_series) == 0:
+        return None
+    series_ids = list(series_index)
+
+    first_date = int(line_start.min())
+    last_date = int((line_start + line_count - 1).max())
+    if last_date <= first_date:
+        return None
+
+    # Stop markers set the precision of their series; the last one in the file wins.
+    marker_series, marker_is_100 = gather("marker_series"), gather("marker_is_100")
+    last_marker = len(marker_series) - 1 - np.unique(marker_series[::-1], return_index=True)[1]
+    if len(last_marker) != len(series_ids):
+        return None
+    divisors = np.where(marker_is_100[last_marker], 100.0, 1000.0)
+
+    # Scatter ring widths into the year x series array. When lines of a series overlap, later
+    # lines overwrite earlier ones, so only the last value written to each cell is kept.
+    n_series = len(series_ids)
+    out = np.full((last_date - first_date) * n_series, np.nan)
+    overlapping = lines_overlap(line_series, line_start, line_count)
+    for block in blocks:
+        keep = block["value_year"] < last_date
+        target = (block["value_year"][keep] - first_date).astype(np.int64) * n_series + block["value_series"][keep]
+        data = block["value_data"][keep] / divisors[block["value_series"][keep]]
+        if overlapping:
+            last_write = len(target) - 1 - np.unique(target[::-1], return_index=True)[1]
+            target, data = target[last_write], data[last_write]
+        out[target] = data
+        block.clear()
+
+    return out.reshape(last_date - first_date, n_series), series_ids, first_date, last_date, empty_lines
+
+# Finds where each line of the buffer starts and ends (without its line break), scanning
+# it in chunks to avoid full-size temporary arrays. Returns None if the buffer contains a
+# lone '\r', which read_rwl would treat as a line break of its own.
+def find_lines(raw, chunk_bytes=SCAN_BYTES):
+    if len(raw) == 0:
+        return None
+    newlines = []
+    for first in range(0, len(raw), chunk_bytes):
+        chunk = raw[first:first + chunk_bytes]
+        carriage_returns = np.flatnonzero(chunk == ord("\r")) + first
+        if carriage_returns.size and (carriage_returns[-1] + 1 >= len(raw) or (raw[carriage_returns + 1] != ord("\n")).any()):
+            return None
+        newlines.append(np.flatnonzero(chunk == ord("\n")) + first)
+    newlines = np.concatenate(newlines)
+
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(raw)]))
+    if starts[-1] == len(raw):
+        starts, ends = starts[:-1], ends[:-1]
+    ends = ends - (raw[np.maximum(ends - 1, 0)] == ord("\r")) * (ends > starts)
+    return starts, ends
+
+# True if two lines of the same series cover some of the same years
+def lines_overlap(line_series, line_start, line_count):
+    order = np.lexsort((line_start, line_series))
+    same_series = line_series[order][1:] == line_series[order][:-1]
+    line_end = (line_start + np.maximum(line_count, 1) - 1)[order]
+    return bool((same_series & (line_start[order][1:] <= line_end[:-1])).any())
+
+# Decodes a block of lines. New series names are added to series_index in order of
+# appearance. Returns the per-line and per-value arrays of the block, or None if the
+# block has something read_rwl has to deal with.
+def read_rwl_block(raw, starts, ends, series_index):
+    # Only plain printable ascii is decoded here; anything else goes through read_rwl.
+    region = raw[starts[0]:ends[-1]]
+    if ((region < ord(" ")) & (region != ord("\n")) & (region != ord("\r"))).any() or (region > ord("~")).any():
+        return None
+    del region
+
+    # Lay the lines out in a space padded matrix, one row per line.
+    lengths = ends - starts
+    n_fields = max(0, -(-(int(lengths.max()) - 12) // 6))
+    width = 12 + 6 * n_fields
+    columns = np.arange(width)
+    lines = raw[np.minimum(starts[:, None] + columns, len(raw) - 1)]
+    lines[columns >= lengths[:, None]] = ord(" ")
+
+    # Lines with fewer than 7 non-space characters are skipped with a warning.
+    nonspace = lines != ord(" ")
+    first_char = np.argmax(nonspace, axis=1)
+    last_char = width - 1 - np.argmax(nonspace[:, ::-1], axis=1)
+    stripped_lengths = np.where(nonspace.any(axis=1), last_char - first_char + 1, 0)
+    del nonspace
+    empty = stripped_lengths < 7
+    empty_lines = np.flatnonzero(empty)
+
+    lines = lines[~empty]
+    lengths = lengths[~empty]
+    if (lengths < 8).any():
+        return None
+
+    # Series names are 8 characters wide, or 7/6 when a negative year eats into them.
+    dash_7 = lines[:, 7] == ord("-")
+    dash_6 = ~dash_7 & (lines[:, 6] == ord("-"))
+    id_width = np.where(dash_7, 7, np.where(dash_6, 6, 8))
+    year_field = lines[:, 6:12].copy()
+    year_field[np.arange(6) < (id_width - 6)[:, None]] = ord(" ")
+    line_start, _, year_valid, _, _ = parse_int_fields(year_field[:, None, :])
+    line_start = line_start[:, 0]
+    if not year_valid.all():
+        return None
+
+    id_field = lines[:, :8].copy()
+    id_field[np.arange(8) >= id_width[:, None]] = ord(" ")
+    raw_ids, raw_first, raw_inverse = np.unique(
+        np.ascontiguousarray(id_field).view("S8").ravel(), return_index=True, return_inverse=True
+    )
+    names = [name.decode("ascii").strip() for name in raw_ids]
+    for i in np.argsort(raw_first, kind="stable"):
+        series_index.setdefault(names[i], len(series_index))
+    line_series = np.array([series_index[name] for name in names], dtype=np.int32)[raw_inverse.ravel()]
+
+    # Decode every 6-character value column at once.
+    fields = lines[:, 12:].reshape(len(lines), n_fields, 6)
+    values, present, valid, n_digits, sign = parse_int_fields(fields)
+    if (present & ~valid).any():
+        return None
+
+    years = line_start[:, None] + np.cumsum(present, axis=1) - 1
+    is_100 = present & (sign != ord("-")) & (sign != ord("+")) & (n_digits == 3) & (values == 999)
+    is_1000 = present & (sign == ord("-")) & (n_digits == 4) & (values == -9999)
+    marker_flat = np.flatnonzero((is_100 | is_1000).ravel())
+    is_data = (present & ~is_100 & ~is_1000).ravel()
+
+    return {
+        "empty_lines": empty_lines,
+        "line_series": line_series,
+        "line_start": line_start,
+        "line_count": present.sum(axis=1),
+        "marker_series": line_series[marker_flat // max(n_fields, 1)],
+        "marker_is_100": is_100.ravel()[marker_flat],
+        "value_year": years.ravel()[is_data].astype(np.int32),
+        "value_series": np.repeat(line_series, n_fields)[is_data],
+        "value_data": values.ravel()[is_data].astype(np.int32),
+    }
@@ -0,0 +1,243 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: readers_cache.py
+# Project: OpenDendro dplPy
+# Description: On-disk cache of parsed ring width files used by dpl.readers(cache=...).
+#              Parsed year x series arrays are stored as .npz files named after a hash
+#              of the file contents and the reader options. A small record per file
+#              path remembers the size and modification time the file had when it was
+#              hashed, so unchanged files are found without reading them again.
+#              Least recently used entries are removed once the cache grows past its
+#              size limit.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl", cache=True)
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl", cache="/scratch/dplpy-cache")
+# >>> cache = dpl.ReadersCache("/scratch/dplpy-cache", max_bytes=2 * 1024 ** 3)
+# >>> data = dpl.readers("../tests/data/rwl/ca533.rwl", cache=cache)
+
+import hashlib
+import json
+import os
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+CACHE_VERSION = 1
+
+
+class ReadersCache:
+    """On-disk cache for dpl.readers()
+
+    Parameters
+    ----------
+    directory : str, default None
+        where cached files are kept. Defaults to the DPLPY_CACHE_DIR
+        environment variable, or ~/.cache/dplpy.
+    max_bytes : int, default 1 GiB
+        size limit of the cached arrays. Least recently used entries are
+        removed when it is exceeded.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> cache = dpl.ReadersCache("/scratch/dplpy-cache", max_bytes=500 * 1024 ** 2)
+    >>> data = dpl.readers("../tests/data/rwl/ca533.rwl", cache=cache)
+    >>> cache.clear()
+
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if directory is None:
+            directory = default_directory()
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.data_dir = os.path.join(self.directory, "data")
+        self.paths_dir = os.path.join(self.directory, "paths")
+
+    def read(self, filename, options, parse):
+        """Returns the parsed dataframe of `filename` for the given reader
+        options, calling `parse()` and storing its result on a cache miss.
+        Warnings raised while parsing are replayed on every read.
+        """
+        stat = os.stat(filename)
+        path_record = os.path.join(self.paths_dir, hash_text(os.path.abspath(filename) + "\0" + repr(options)) + ".json")
+
+        key = None
+        record = load_json(path_record)
+        if record is not None and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+            key = record["key"]
+        if key is None or not os.path.exists(self.entry_path(key)):
+            key = hash_file(filename, repr(options))
+            save_json(path_record, {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "key": key})
+
+        cached = self.load(key)
+        if cached is not None:
+            series_data, messages = cached
+        else:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                series_data = parse()
+            messages = [(str(warning.message), warning.category) for warning in caught]
+            if series_data is not None:
+                self.store(key, series_data, [message for message, category in messages if category is UserWarning])
+
+        for message, category in messages:
+            warnings.warn(message, category)
+        return series_data
+
+    def entry_path(self, key):
+        return os.path.join(self.data_dir, key + ".npz")
+
+    def load(self, key):
+        entry = self.entry_path(key)
+        try:
+            with np.load(entry, allow_pickle=False) as cached:
+                if int(cached["version"]) != CACHE_VERSION:
+                    return None
+                series_data = pd.DataFrame(cached["values"], columns=pd.Index(cached["names"].tolist(), dtype=object))
+                series_data.insert(0, "Year", cached["years"])
+                messages = [(message, UserWarning) for message in cached["messages"].tolist()]
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return series_data, messages
+
+    def store(self, key, series_data, messages):
+        # Only the plain layout produced by the rwl readers (and most csv files) is
+        # cached: integer years and float series. Anything else is simply re-read.
+        if "Year" not in series_data.columns:
+            return
+        years = series_data["Year"]
+        values = series_data.drop(columns="Year")
+        names = list(values.columns)
+        if years.dtype != np.int64 or not all(dtype == np.float64 for dtype in values.dtypes):
+            return
+        if not all(isinstance(name, str) for name in names) or len(set(names)) != len(names):
+            return
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.data_dir, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                np.savez(temp_file, version=CACHE_VERSION, years=years.to_numpy(), values=values.to_numpy(),
+                         names=np.array(names, dtype=str), messages=np.array(messages, dtype=str))
+            os.replace(temp_path, self.entry_path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.data_dir):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.data_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.data_dir, name))
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Removes every cached entry."""
+        for folder in (self.data_dir, self.paths_dir):
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    os.remove(os.path.join(folder, name))
+
+    @property
+    def size(self):
+        """Total size in bytes of the cached arrays."""
+        if not os.path.isdir(self.data_dir):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.data_dir, name))
+                   for name in os.listdir(self.data_dir) if name.endswith(".npz"))
+
+# Cache directory used when none is given: $DPLPY_CACHE_DIR, or ~/.cache/dplpy
+def default_directory():
+    return os.environ.get("DPLPY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "dplpy"))
+
+# Returns the cache to use for the `cache` argument of dpl.readers()
+def get_cache(cache):
+    if isinstance(cache, ReadersCache):
+        return cache
+    elif cache is True:
+        return ReadersCache()
+    elif isinstance(cache, (str, os.PathLike)):
+        return ReadersCache(cache)
+    raise TypeError("cache should be True, a directory or a ReadersCache, not " + str(type(cache)))
+
+def hash_text(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+# Hashes the contents of a file together with the reader options
+def hash_file(filename, options):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(options.encode("utf-8") + b"\0")
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_json(path):
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+# Writes a small json record atomically, so concurrent readers never see half a file
+def save_json(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as file:
+            json.dump(content, file)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,250 @@
+from __future__ import print_function
+
+__copyright__ = """
+   dplPy for tree ring width time series analyses
+   Copyright (C) 2024  OpenDendro
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+__license__ = "GNU GPLv3"
+
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title: readers_incremental.py
+# Project: OpenDendro dplPy
+# Description: Incremental reader for .rwl files that grow while they are being
+#              measured. The reader remembers how far into the file it has read,
+#              and each refresh only parses the lines appended since, writing them
+#              into year x series arrays that grow in place. Values of finished series
+#              are kept divided by their precision, so the dataframe returned is a view
+#              of them rather than a copy rebuilt on every refresh.
+#
+# example usage from Python Console:
+# >>> import dplpy as dpl
+# >>> reader = dpl.IncrementalReader("station/today.rwl")
+# >>> data = reader.read()
+# >>> # ... more decades are measured and appended to the file ...
+# >>> data = reader.read() # only parses the new lines
+
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from readers import split_rwl_line
+
+# Bytes before the read offset compared on each refresh to notice rewritten files
+CHECK_BYTES = 64
+
+
+class IncrementalReader:
+    """Reads a growing .rwl file, parsing only what was appended
+
+    Extended Summary
+    ----------------
+    Each call to read() parses the complete lines appended to the file since
+    the previous call, exactly as dpl.readers() parses lines, and returns the
+    updated dataframe. Values are kept in a year x series array that grows in
+    place, so a refresh costs time proportional to the new lines, not to the
+    whole file. The dataframe returned is a read-only view of that array:
+    copy it to modify it. A line is read once it ends with a line break, or
+    with the stop marker of its series, as the last line of many files has
+    no line break. Series whose stop marker (999 or -9999) hasn't been read
+    yet, such as the one being measured, are left out of the dataframe until
+    it is, since their precision isn't known. If the file is truncated or
+    rewritten, it is read again from the start.
+
+    Parameters
+    ----------
+    filename : str
+        a .rwl or .raw file.
+    skip_lines : int, default 0
+        indicates how many of the first few lines of the file to skip.
+    header : boolean, default False
+        a flag indicating whether a 3-line header is at the top of the file.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> reader = dpl.IncrementalReader("station/today.rwl", header=True)
+    >>> data = reader.read()
+    >>> data = reader.read() # later, after more lines were measured
+    >>> reader.pending # series still waiting for their stop marker
+
+    """
+
+    def __init__(self, filename, skip_lines=0, header=False):
+        self.filename = os.fspath(filename)
+        self.skip_lines = skip_lines + 3 if header is True else skip_lines
+        self.reset()
+
+    def reset(self):
+        """Forgets everything read so far."""
+        self.offset = 0
+        self.line_ct = 0
+        self.checked_bytes = b""
+        self.open_line = False
+        self.columns = {}
+        self.divisors = []
+        self.values = None
+        self.scaled = None
+        self.row0 = 0
+        self.first_date = None
+        self.last_date = None
+
+    @property
+    def pending(self):
+        """Series that were read without their stop marker yet."""
+        return [name for name, column in self.columns.items() if self.divisors[column] is None]
+
+    def read(self) -> pd.DataFrame:
+        """Parses the lines appended since the last call and returns the data
+        read so far, laid out as in dpl.readers().
+        """
+        with open(self.filename, "rb") as rwl_file:
+            size = os.fstat(rwl_file.fileno()).st_size
+            start = self.offset - len(self.checked_bytes)
+            rwl_file.seek(start)
+            if size < self.offset or rwl_file.read(len(self.checked_bytes)) != self.checked_bytes:
+                self.reset()
+            rwl_file.seek(self.offset)
+            tail = rwl_file.read()
+
+        # The line break of a last line read without one may have been written since
+        if self.open_line and tail:
+            if not tail.startswith((b"\n", b"\r\n")):
+                self.reset()
+                return self.read()
+            line_break = tail[:tail.index(b"\n") + 1]
+            tail = tail[len(line_break):]
+            self.advance(line_break)
+            self.open_line = False
+
+        # Leave a line that is still being written for the next call, unless it already
+        # ends with a stop marker
+        end = tail.rfind(b"\n") + 1
+        lines = tail[:end].splitlines(keepends=True)
+        if end < len(tail) and self.line_ct + len(lines) >= self.skip_lines and ends_series(tail[end:]):
+            lines.append(tail[end:])
+            self.open_line = True
+        for line in lines:
+            if self.line_ct >= self.skip_lines:
+                self.read_line(line.decode().rstrip("\r\n"), self.line_ct + 1)
+            self.line_ct += 1
+            self.advance(line)
+
+        return self.dataframe()
+
+    # Moves the read offset past bytes that were read
+    def advance(self, read):
+        self.offset += len(read)
+        self.checked_bytes = (self.checked_bytes + read)[-CHECK_BYTES:]
+
+    # Parses one line the way read_rwl does
+    def read_line(self, line, line_no):
+        if len(line.strip()) < 7:
+            warnings.warn("Empty line found at line " + str(line_no) + "\n")
+            return
+        try:
+            series_id, line_start, dataline = split_rwl_line(line)
+            years = [line_start + i for i in range(len(dataline))]
+            fields = [field.strip() for field in dataline]
+            values = [None if field in ("999", "-9999") else float(int(field)) for field in fields]
+        except (ValueError, IndexError) as err:
+            raise ValueError("Error reading line " + str(line_no) + ": " + line.strip() + "\n" + str(err))
+
+        column = self.column(series_id)
+        self.first_date = line_start if self.first_date is None else min(self.first_date, line_start)
+        line_end = line_start + len(dataline) - 1
+        self.last_date = line_end if self.last_date is None else max(self.last_date, line_end)
+
+        self.fit_years(line_start, max(line_start, line_end))
+        for year, field, value in zip(years, fields, values):
+            if value is None:
+                self.finish(column, 100 if field == "999" else 1000)
+            else:
+                self.values[year - self.row0, column] = value
+                if self.divisors[column] is not None:
+                    self.scaled[year - self.row0, column] = value / self.divisors[column]
+
+    # Sets the precision of a series once its stop marker is read, and divides its values
+    def finish(self, column, divisor):
+        if self.divisors[column] != divisor:
+            self.divisors[column] = divisor
+            self.scaled[:, column] = self.values[:, column] / divisor
+
+    # Returns the column of a series, adding one (and growing the array) if it's new
+    def column(self, series_id):
+        if series_id not in self.columns:
+            self.columns[series_id] = len(self.columns)
+            self.divisors.append(None)
+            if self.values is not None and len(self.columns) > self.values.shape[1]:
+                self.values, self.scaled = [grow(array, (array.shape[0], 2 * array.shape[1]), 0, 0)
+                                            for array in (self.values, self.scaled)]
+        return self.columns[series_id]
+
+    # Grows the array, doubling its number of rows, until it holds every year from first to last
+    def fit_years(self, first, last):
+        if self.values is None:
+            shape = (max(64, 2 * (last - first + 1)), max(8, len(self.columns)))
+            self.values, self.scaled = np.full(shape, np.nan), np.full(shape, np.nan)
+            self.row0 = first
+            return
+        n_rows, n_columns = self.values.shape
+        if first >= self.row0 and last < self.row0 + n_rows:
+            return
+
+        low, high = min(first, self.row0), max(last, self.row0 + n_rows - 1)
+        rows = max(2 * n_rows, high - low + 1)
+        # Leave the free rows on the side the years are growing towards
+        row0 = high - rows + 1 if first < self.row0 else low
+        self.values, self.scaled = [grow(array, (rows, n_columns), self.row0 - row0, 0)
+                                    for array in (self.values, self.scaled)]
+        self.row0 = row0
+
+    # Lays the finished series out as dpl.readers() does: one row per year from the first
+    # year read up to (but not including) the last year read, values divided by precision.
+    # Series are usually finished in the order they were first read, so their values are
+    # then a view of the first columns of the array, and nothing is copied.
+    def dataframe(self):
+        finished = [(name, column) for name, column in self.columns.items() if self.divisors[column] is not None]
+        names = pd.Index([name for name, _ in finished], dtype=object)
+        if self.values is None or self.last_date <= self.first_date:
+            return pd.DataFrame(columns=names, index=pd.Index([], dtype=np.int64, name="Year"), dtype=float)
+
+        columns = [column for _, column in finished]
+        rows = slice(self.first_date - self.row0, self.last_date - self.row0)
+        if columns == list(range(len(columns))):
+            values = self.scaled[rows, :len(columns)].view()
+        else:
+            values = self.scaled[rows][:, columns]
+        values.flags.writeable = False
+        return pd.DataFrame(values, columns=names, copy=False,
+                            index=pd.Index(np.arange(self.first_date, self.last_date, dtype=np.int64), name="Year"))
+
+# Copies an array into a larger one filled with NaN, at the given row and column
+def grow(array, shape, row, column):
+    grown = np.full(shape, np.nan)
+    grown[row:row + array.shape[0], column:column + array.shape[1]] = array
+    return grown
+
+# Whether the bytes of an unfinished line already hold a whole line ending with a stop marker
+def ends_series(line):
+    try:
+        _, _, dataline = split_rwl_line(line.decode().rstrip("\r\n"))
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return False
+    return len(dataline) > 0 and dataline[-1].strip() in ("999", "-9999")
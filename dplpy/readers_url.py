@@ -1,11 +1,135 @@
 import urllib.request
+import urllib.parse
+import http.client
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from readers import read_rwl, readers
+from readers import read_rwl, readers, read_rwl_numpy, numpy_dataframe
+from readers_cache import default_directory, hash_text, load_json, save_json
+
+# Responses worth retrying, and the number of redirects followed before giving up
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_REDIRECTS = 5
 
 def readers_url(url, header=False, skip_lines=0):
-    FORMAT = "." + url.split(".")[-1]
     file_read = urllib.request.urlopen(url).read().decode('utf-8').split('\n')
+    df = url_dataframe(file_read, url, header, skip_lines)
+
+    # Display message to show that reading was successful
+    print("\nSUCCESS!\nFile read as:", "." + url.split(".")[-1], "file\n")
+
+    # Display names of all the series found
+    print("Series names:")
+    print(list(df.columns), "\n")
+    return df
+
+def readers_url_many(urls, header=False, skip_lines=0, n_jobs=8, engine="numpy", cache=False, retries=3, backoff=0.5, timeout=30):
+    """Imports many ring width data files from online sources
+
+    Extended Summary
+    ----------------
+    Downloads every url concurrently, reusing one open connection per server
+    and download thread, and reads each file as dpl.readers_url() would.
+    Failed requests are retried with exponential backoff. Nothing is printed,
+    and urls that can't be read don't stop the others; their error messages
+    are returned alongside the data.
+
+    Parameters
+    ----------
+    urls : list of str
+        urls of .rwl files.
+    header : boolean, default False
+        a flag indicating whether a 3-line header is at the top of the files.
+    skip_lines : int, default 0
+        indicates how many of the first few lines of each file to skip.
+    n_jobs : int, default 8
+        number of concurrent downloads.
+    engine : str, default numpy
+        parser used for the files, as in dpl.readers(). 'python' reads them
+        line by line exactly like dpl.readers_url(); 'numpy' decodes them with
+        array operations, falling back to 'python' for files it can't read
+        the same way.
+    cache : boolean or str, default False
+        keep downloaded files on disk, and only download them again if the
+        server reports they changed (using their ETag or Last-Modified
+        headers). True uses the default cache directory, a string names the
+        cache directory.
+    retries : int, default 3
+        number of times a request is retried after a connection error or a
+        429/5xx response.
+    backoff : float, default 0.5
+        seconds to wait before the first retry, doubled after every retry.
+    timeout : float, default 30
+        seconds to wait for a server before giving up on a request.
+
+    Returns
+    -------
+    data : dict of pandas dataframes keyed by url
+    errors : dict
+        error message for each url that couldn't be read.
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> base = "https://www.ncei.noaa.gov/pub/data/paleo/treering/measurements/northamerica/usa/"
+    >>> sites, errors = dpl.readers_url_many([base + "ca533.rwl", base + "ca534.rwl"], header=True, cache=True)
+    >>> sites[base + "ca533.rwl"]
+
+    """
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs should be a positive integer")
+    if engine not in ("python", "numpy"):
+        raise ValueError("unsupported parser engine " + repr(engine) + ". Accepted engines are 'python' and 'numpy'")
+    if cache is True:
+        cache = os.path.join(default_directory(), "urls")
+    elif cache is False or cache is None:
+        cache = None
+    elif not isinstance(cache, (str, os.PathLike)):
+        raise TypeError("cache should be True or a directory, not " + str(type(cache)))
+
+    urls = list(urls)
+    fetcher = UrlFetcher(cache, retries, backoff, timeout)
+    data = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(n_jobs, len(urls)))) as executor:
+        # Files are read here, one at a time, while the next ones are still downloading
+        for url, (body, error) in zip(urls, executor.map(fetcher.try_fetch, urls)):
+            if error is None:
+                output = io.StringIO()
+                try:
+                    with contextlib.redirect_stdout(output), warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        data[url] = body_dataframe(body, url, header, skip_lines, engine)
+                    continue
+                except Exception as err:
+                    error = type(err).__name__ + ": " + str(err).strip()
+                    details = "\n".join(line for line in output.getvalue().splitlines() if line.strip())
+                    if details:
+                        error += "\n" + details
+            errors[url] = error
+    fetcher.close()
+    return data, errors
+
+# Builds the dataframe of a downloaded .rwl file with the chosen parser engine
+def body_dataframe(body, url, header, skip_lines, engine):
+    if engine == "numpy":
+        parsed = read_rwl_numpy(body, skip_lines + 3 if header is True else skip_lines)
+        if parsed is not None:
+            df = numpy_dataframe(parsed)
+            df.set_index('Year', inplace = True, drop = True)
+            return df
+    return url_dataframe(body.decode('utf-8').split('\n'), url, header, skip_lines)
+
+# Builds the dataframe of an .rwl file downloaded from `url`, given its lines
+def url_dataframe(file_read, url, header, skip_lines):
+    FORMAT = "." + url.split(".")[-1]
 
     if header is True:
         skip_lines += 3 # working with the assumption that headers are 3 lines long
@@ -23,7 +147,7 @@ def readers_url(url, header=False, skip_lines=0):
     indexes = []
     for i in range(first_date, last_date):
         indexes.append(i)
-    
+
     df = pd.DataFrame(data={"Year":indexes})
 
     # store raw data in pandas dataframe. Build each series' column in a list first and
@@ -39,13 +163,148 @@ def readers_url(url, header=False, skip_lines=0):
                 series_data.append(np.nan)
         series_columns.append(pd.Series(data=series_data, name=series))
     df = pd.concat([df] + series_columns, axis=1)
-    
+
     df.set_index('Year', inplace = True, drop = True)
+    return df
 
-    # Display message to show that reading was successful
-    print("\nSUCCESS!\nFile read as:", FORMAT, "file\n")
 
-    # Display names of all the series found
-    print("Series names:")
-    print(list(df.columns), "\n")
-    return df
\ No newline at end of file
+class UrlFetcher:
+    """Downloads urls over persistent HTTP connections, one pool of connections
+    per thread, with retries and an optional on-disk cache validated with
+    the ETag and Last-Modified headers of the responses.
+    """
+
+    def __init__(self, cache=None, retries=3, backoff=0.5, timeout=30):
+        self.cache = None if cache is None else os.fspath(cache)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def try_fetch(self, url):
+        """Returns (body, None), or (None, error message) if the url can't be downloaded."""
+        try:
+            return self.fetch(url), None
+        except Exception as err:
+            return None, type(err).__name__ + ": " + str(err).strip()
+
+    def fetch(self, url):
+        """Returns the body of `url`, from the cache if the server says it hasn't changed."""
+        cached = self.load(url)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.retries + 1):
+            try:
+                status, response_headers, body = self.request(url, headers)
+                if status == 304 and cached is not None:
+                    return cached["body"]
+                if status == 200:
+                    self.store(url, response_headers, body)
+                    return body
+                error = ValueError("HTTP error " + str(status) + " fetching " + url)
+                if status not in RETRY_STATUSES:
+                    raise error
+            except (OSError, http.client.HTTPException) as err:
+                error = err
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise error
+
+    def request(self, url, headers):
+        """Sends a GET request, following redirects. Returns the status, headers and body."""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ("http", "https"):
+                raise ValueError("unsupported url scheme: " + url)
+            path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+            # A kept-alive connection may have been closed by the server since it was
+            # last used; in that case, reconnect once straight away.
+            for retry_stale in (True, False):
+                reused, connection = self.connection(parts.scheme, parts.netloc)
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    body = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    self.drop(parts.scheme, parts.netloc)
+                    if reused and retry_stale:
+                        continue
+                    raise
+                except (OSError, http.client.HTTPException):
+                    self.drop(parts.scheme, parts.netloc)
+                    raise
+                break
+            if response.will_close:
+                self.drop(parts.scheme, parts.netloc)
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                url = urllib.parse.urljoin(url, response.getheader("Location"))
+                continue
+            return response.status, response.headers, body
+        raise ValueError("too many redirects fetching " + url)
+
+    # Returns (reused, connection) for a server, opening a connection if this thread has none
+    def connection(self, scheme, netloc):
+        pool = self.local.__dict__.setdefault("pool", {})
+        if (scheme, netloc) in pool:
+            return True, pool[(scheme, netloc)]
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        pool[(scheme, netloc)] = connection
+        with self.lock:
+            self.connections.append(connection)
+        return False, connection
+
+    def drop(self, scheme, netloc):
+        connection = self.local.__dict__.get("pool", {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        """Closes every connection opened by any thread."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections = []
+
+    def load(self, url):
+        if self.cache is None:
+            return None
+        key = hash_text(url)
+        record = load_json(os.path.join(self.cache, key + ".json"))
+        if record is None or record.get("url") != url:
+            return None
+        try:
+            with open(os.path.join(self.cache, key + ".body"), "rb") as body_file:
+                record["body"] = body_file.read()
+        except OSError:
+            return None
+        return record
+
+    # Only responses that can be validated later (with an ETag or Last-Modified header) are kept
+    def store(self, url, headers, body):
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if self.cache is None or (etag is None and last_modified is None):
+            return
+        key = hash_text(url)
+        os.makedirs(self.cache, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.cache, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(body)
+            os.replace(temp_path, os.path.join(self.cache, key + ".body"))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        save_json(os.path.join(self.cache, key + ".json"), {"url": url, "etag": etag, "last_modified": last_modified})
@@ -29,7 +29,9 @@ __license__ = "GNU GPLv3"
 
 from math import cos
 from math import pi
+import numpy as np
 from csaps import csaps
+from scipy.linalg import solveh_banded
 
 # Returns the spline parameter, given amplitude of the series and the period
 def get_param(amp, period):
@@ -51,4 +53,60 @@ def get_period(period, n):
 def spline(x, y, period=None):
     p = get_param(0.5, get_period(period, len(x)))
     yi = csaps(x, y, x, smooth=p)
-    return yi
\ No newline at end of file
+    return yi
+
+# Fits a curve to each row of ys, all measured at the same years x, in a single
+# solve, and returns the y-values of the curves (one row per series)
+def spline_rows(x, ys, period=None):
+    p = get_param(0.5, get_period(period, len(x)))
+    yi = csaps(x, ys, x, smooth=p)
+    return yi
+
+# Fits a curve to each series of xs and ys, which can have their own lengths, years and
+# periods, and returns the y-values of the curves. This is the cubic smoothing spline of
+# csaps, computed with Reinsch's algorithm without csaps: the second derivatives of the
+# curves at the inner years of every series solve one symmetric pentadiagonal system,
+# with a block per series, factorized by a banded Cholesky solver in time linear in the
+# number of years.
+def spline_banded(xs, ys, periods=None):
+    if periods is None:
+        periods = [None] * len(xs)
+    lengths = np.array([len(x) for x in xs], dtype=np.int64)
+    if len(xs) == 0:
+        return []
+    if lengths.min() < 2:
+        raise ValueError("'xdata' must contain at least 2 data points.")
+
+    x = np.concatenate(xs).astype(float)
+    y = np.concatenate(ys).astype(float)
+    p = np.array([get_param(0.5, get_period(period, n)) for period, n in zip(periods, lengths)])
+    starts = np.cumsum(lengths) - lengths
+    dx = np.diff(x)
+
+    # Unknowns: the second derivatives at the inner years of every series, where pos is
+    # the year before each of them
+    inner = lengths - 2
+    series = np.repeat(np.arange(len(xs)), inner)
+    pos = np.repeat(starts - (np.cumsum(inner) - inner), inner) + np.arange(inner.sum())
+    h0, h1 = dx[pos], dx[pos + 1]
+    r0, r1 = 1 / h0, 1 / h1
+    pp, pr = 6 * (1 - p[series]), p[series]
+
+    # 6(1 - p) Q'Q + pR, in the upper form of solveh_banded, without links between series
+    ab = np.zeros((3, len(pos)))
+    ab[2] = pp * (r0 ** 2 + (r0 + r1) ** 2 + r1 ** 2) + pr * 2 * (h0 + h1)
+    ab[1, 1:] = np.where(series[1:] == series[:-1], pp[:-1] * (-(r0[:-1] + r1[:-1]) * r0[1:]
+                         - r1[:-1] * (r0[1:] + r1[1:])) + pr[:-1] * h1[:-1], 0.0)
+    ab[0, 2:] = np.where(series[2:] == series[:-2], pp[:-2] * r1[:-2] * r0[2:], 0.0)
+    b = (y[pos + 2] - y[pos + 1]) * r1 - (y[pos + 1] - y[pos]) * r0
+    u = solveh_banded(ab, b) if len(pos) else b
+
+    # Curves from the second derivatives, which are 0 at both ends of every series
+    padded = np.zeros(len(x))
+    padded[pos + 1] = u
+    slopes = np.zeros(len(x) + 1)
+    within = np.ones(len(dx), dtype=bool)
+    within[starts[1:] - 1] = False
+    slopes[1:-1][within] = np.diff(padded)[within] / dx[within]
+    yi = y - 6 * (1 - np.repeat(p, lengths)) * np.diff(slopes)
+    return np.split(yi, np.cumsum(lengths)[:-1])
\ No newline at end of file
@@ -45,12 +45,14 @@ __license__ = "GNU GPLv3"
 # Get autocorrelation coefficient at lag = 1
 #autocorr_coeff = autocorr[1]
 
+from collections.abc import Iterable
 import pandas as pd
 import numpy as np
 from readers import readers
+from collection import RingWidthCollection
 from statsmodels.tsa.ar_model import AutoReg
 
-def stats(inp: pd.DataFrame | str):
+def stats(inp: pd.DataFrame | RingWidthCollection | str | Iterable):
     """Generates summary statistics
     
     Extended Summary
@@ -62,7 +64,9 @@ def stats(inp: pd.DataFrame | str):
     Parameters
     ----------
     data : str
-        a data file (.CSV or .RWL) or a pandas dataframe imported from dpl.readers().
+        a data file (.CSV or .RWL), a pandas dataframe imported from dpl.readers(),
+        a RingWidthCollection, or an iterable of (name, start year, values) such as
+        dpl.iter_series(), which is summarised one series at a time.
     
     Returns
     -------
@@ -71,6 +75,7 @@ def stats(inp: pd.DataFrame | str):
     Examples
     --------
     >>> dpl.stats(<data>)
+    >>> dpl.stats(dpl.iter_series("../tests/data/rwl/file.rwl"))
     
     References
     ----------
@@ -78,15 +83,17 @@ def stats(inp: pd.DataFrame | str):
     
     
     """
-    if isinstance(inp, pd.DataFrame):
-        series_data = inp
+    if isinstance(inp, (pd.DataFrame, RingWidthCollection)):
+        series_items = inp.items()
     elif isinstance(inp, str):
-        series_data = readers(inp)
+        series_items = readers(inp).items()
+    elif isinstance(inp, Iterable):
+        series_items = stream_items(inp)
 
         
     stats = {"series":[], "first":[], "last":[], "year": [], "mean": [], "median":[], "stdev":[], "skew":[], "gini":[], "ar1":[]}
 
-    for series_name, data in series_data.items():
+    for series_name, data in series_items:
         stats["series"].append(series_name)
         stats["first"].append(data.first_valid_index())
         stats["last"].append(data.last_valid_index())
@@ -103,6 +110,11 @@ def stats(inp: pd.DataFrame | str):
     statistics.index += 1
     return statistics
 
+# Turns (name, start year, values) tuples into (name, series indexed by year) pairs, one at a time
+def stream_items(series):
+    for series_name, start_year, values in series:
+        yield series_name, pd.Series(values, index=np.arange(start_year, start_year + len(values)), dtype=float)
+
 def get_gini(data_array):
     # Sort-based O(n log n) formula, equivalent to the mean-absolute-difference
     # definition but avoids materializing an O(n^2) pairwise difference matrix.
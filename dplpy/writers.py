@@ -45,9 +45,29 @@ __license__ = "GNU GPLv3"
 import pandas as pd
 import numpy as np
 from chron import chron
+from columnar import write_columnar
 from detrend import detrend
 
-def writers(data: pd.DataFrame, label: str, format: str):
+# Number of values converted to text at a time by the numpy csv writer
+CSV_CHUNK_VALUES = 2 ** 20
+
+# Byte tables of the numbers 0 to 999 used by the numpy csv writer, where spaces become zero
+# bytes (dropped once a block is written). For a group of 3 integer digits of the units, or of
+# the thousands and above: rows 0-999 when higher digits are shown and 1000-1999 when they aren't,
+# so without leading zeros (and nothing for thousands of 0). For the point and first 3 decimals:
+# rows 0-999 when later decimals are shown and 1000-1999 when they aren't, so without trailing
+# zeros but the first decimal. And for the last 3 decimals, without trailing zeros. Row 2000 of
+# the units and first decimals is for missing values, written NA.
+def digit_table(strings):
+    return np.array([list(text.encode().replace(b" ", b"\0")) for text in strings], dtype=np.uint8)
+
+CSV_UNITS = digit_table(["%03d" % n for n in range(1000)] + ["%3d" % n for n in range(1000)] + ["   "])
+CSV_THOUSANDS = digit_table(["%03d" % n for n in range(1000)] + [("%d" % n if n else "").rjust(3) for n in range(1000)])
+CSV_DECIMALS = digit_table([".%03d" % n for n in range(1000)]
+                           + [(".%03d" % n).rstrip("0").ljust(2, "0").ljust(4) for n in range(1000)] + ["NA  "])
+CSV_LAST_DECIMALS = digit_table([("%03d" % n).rstrip("0").ljust(3) for n in range(1000)])
+
+def writers(data: pd.DataFrame, label: str, format: str, engine="python", rwi_data=None, chron_data=None):
     """ Output dplpy datasets to .csv, .rwl and .crn files.
 
     Extended Summary
@@ -55,7 +75,9 @@ def writers(data: pd.DataFrame, label: str, format: str):
     Given a pandas dataframe representing tree-ring widths, this function writes
     its contents to a .csv, .rwl or .crn file as indicated by the `format`
     parameter. The file will be created in the same directory unless a different
-    path is included in `label`.
+    path is included in `label`. Parquet and Arrow files store any dplpy
+    dataframe (ring widths, indices or chronologies) in binary, so
+    dpl.readers() reads them back exactly as they were.
 
     Parameters
     ----------
@@ -65,11 +87,41 @@ def writers(data: pd.DataFrame, label: str, format: str):
         name (can include file path) to give the file.
         should not include file extension.
     format : str
-        type of file to be created. can be 'csv', 'rwl' or 'crn'.
+        type of file to be created. can be 'csv', 'rwl', 'crn', 'txt',
+        'parquet' or 'arrow'. Parquet and Arrow files need pyarrow.
+    engine : str, default python
+        writer used for .csv and .rwl files. 'python' writes the file one
+        value at a time, 'numpy' formats blocks of values at once with array
+        operations and is much faster on large datasets. Both write the same
+        file.
+    rwi_data : pandas dataframe, optional
+        ring width indices already computed from `data`, e.g. with
+        dpl.detrend(). Used by .crn and .txt files instead of detrending
+        `data` with a spline. Without `chron_data`, the chronology is
+        computed from them.
+    chron_data : pandas dataframe, optional
+        chronology already computed from the ring width indices with
+        dpl.chron(). Written to .crn files (its Mean RWI and Sample depth
+        columns) and used by .txt files (which also need the Mean Res column
+        of dpl.chron(..., prewhiten=True)) instead of being computed again.
+        Takes precedence over `rwi_data` for .crn files, which then don't
+        use `rwi_data` at all.
                    
     Returns
     -------
     None
+
+    Examples
+    --------
+    >>> import dplpy as dpl
+    >>> data = dpl.readers("../tests/data/csv/file.csv")
+    >>> dpl.writers(data, "file", "crn") # detrends data with a spline first
+    >>> rwi_data = dpl.detrend(data, fit="ModNegex", plot=False)
+    >>> chron_data = dpl.chron(rwi_data, prewhiten=True, plot=False)
+    >>> dpl.writers(data, "file", "crn", rwi_data=rwi_data) # chronology of rwi_data
+    >>> dpl.writers(data, "file", "crn", chron_data=chron_data)
+    >>> dpl.writers(data, "file", "txt", rwi_data=rwi_data, chron_data=chron_data)
+    >>> dpl.writers(chron_data, "file_crn", "parquet")
     
     """
     if not isinstance(data, pd.DataFrame):
@@ -80,21 +132,41 @@ def writers(data: pd.DataFrame, label: str, format: str):
     
     if not isinstance(format, str):
         raise TypeError("Expected format to be of type str, not " + str(type(format)))
+
+    if engine not in ("python", "numpy"):
+        raise ValueError("unsupported writer engine " + repr(engine) + ". Accepted engines are 'python' and 'numpy'")
+
+    if rwi_data is not None and not isinstance(rwi_data, pd.DataFrame):
+        raise TypeError("Expected rwi_data to be pandas dataframe, not " + str(type(rwi_data)))
+
+    if chron_data is not None and not isinstance(chron_data, pd.DataFrame):
+        raise TypeError("Expected chron_data to be pandas dataframe, not " + str(type(chron_data)))
     
     filename = label + "." + format
     print("Writing to " + filename)
+    if format in ("parquet", "arrow"):
+        write_columnar(data, filename, format)
+        print("Done.")
+        return
+
     output = open(filename, "w")
     if format == "csv":
-        write_csv(data, output)
+        if engine == "numpy":
+            write_csv_numpy(data, output)
+        else:
+            write_csv(data, output)
     elif format == "rwl":
-        write_rwl(data, output)
+        if engine == "numpy":
+            write_rwl_numpy(data, output)
+        else:
+            write_rwl(data, output)
     elif format == "crn":
-        write_crn(data, label, output)
+        write_crn(data, label, output, chron_data=chron_data, rwi_data=rwi_data)
     elif format == "txt":
-        write_txt(data, output)
+        write_txt(data, output, rwi_data=rwi_data, chron_data=chron_data)
     else:
         output.close()
-        raise ValueError("Invalid file format given as parameter. Accepted file formats are csv, rwl, crn and txt")
+        raise ValueError("Invalid file format given as parameter. Accepted file formats are csv, rwl, crn, txt, parquet and arrow")
 
     output.close()
     print("Done.")
@@ -107,11 +179,15 @@ def conv_data(data):
         return str(data)
 
 
-def write_csv(data, file):
+def write_csv_header(data, file):
     file.write('"Year","')
     file.write('","'.join(data.columns.tolist()))
     file.write('"\n')
 
+
+def write_csv(data, file):
+    write_csv_header(data, file)
+
     for year, row in data.iterrows():
         file.write(str(year))
         file.write(",")
@@ -119,6 +195,93 @@ def write_csv(data, file):
         file.write('\n')
 
 
+# Writes the same file as write_csv, converting blocks of rows of the dataframe to text at once
+# instead of one row (and value) at a time. Dataframes with values other than floats, ints or
+# bools (text, nullable dtypes...) go to write_csv.
+def write_csv_numpy(data, file):
+    values = data.to_numpy()
+    if values.dtype.kind not in "biuf" or values.shape[1] == 0:
+        write_csv(data, file)
+        return
+    if values.dtype.kind == "f":
+        values = values.astype(np.float64)
+
+    write_csv_header(data, file)
+    years = [str(year) + "," for year in data.index]
+    rows_per_chunk = max(1, CSV_CHUNK_VALUES // values.shape[1])
+    for start in range(0, len(years), rows_per_chunk):
+        chunk = values[start:start + rows_per_chunk]
+        chunk_years = years[start:start + rows_per_chunk]
+        text = csv_float_block(chunk, chunk_years) if chunk.dtype.kind == "f" else None
+        if text is None:
+            text = csv_text_block(chunk, chunk_years)
+        file.write(text)
+
+
+# Rows of csv text for a block of values. iterrows boxes them into python floats, ints or bools
+# written with str(), which is what numpy's conversion to str gives for float64, int and bool arrays.
+def csv_text_block(values, years):
+    text = values.astype(str)
+    if values.dtype.kind == "f":
+        text = np.where(np.isnan(values), "NA", text)
+    return "".join([year + ",".join(row) + "\n" for year, row in zip(years, text.tolist())])
+
+
+# Rows of csv text for a block of floats, built from the digits of the values. Python writes a
+# float from 1e-4 up to 1e16 in fixed notation, with the fewest decimals that read back as the
+# same float. Below 1e9, a value has at most one such string with 6 decimals (or 3), so when that
+# one reads back as the value, dropping its trailing zeros (but the first decimal) gives the str()
+# of the value. Digits are looked up 3 at a time in the CSV_* tables and laid out in fields of
+# the same width, padded with zero bytes that are dropped at the end. Returns None if the block
+# holds values that need more decimals, exponents or infinities.
+def csv_float_block(values, years):
+    missing = np.isnan(values)
+    magnitude = np.fmax(np.abs(values), 0)
+    # Ring widths have 3 decimals at most, which saves looking up the last 3
+    for places in (3, 6):
+        scale = 10 ** places
+        scaled = np.rint(magnitude * scale)
+        if (scaled / scale == magnitude).all():
+            break
+    else:
+        return None
+    if scaled.max(initial=0) >= 1e9 * scale or ((scaled > 0) & (scaled < 1e-4 * scale)).any():
+        return None
+    scaled = scaled.astype(np.int32 if scaled.max(initial=0) < 2 ** 31 else np.int64)
+    integer, decimals = scaled // scale, scaled % scale
+    if places == 6:
+        high, low = decimals // 1000, decimals % 1000
+        # Rows of the tables for values shown without some of their digits
+        high = np.where(low == 0, high + 1000, high)
+    else:
+        high, low = decimals + 1000, None
+    high[missing] = 2000
+    n_groups = len(str(integer.max(initial=0))) // 3 + 1
+
+    fields = np.zeros(values.shape + (3 * n_groups + places // 3 * 3 + 3,), dtype=np.uint8)
+    fields[..., 0] = np.signbit(values) & ~missing
+    fields[..., 0] *= ord("-")
+    for group in range(n_groups):
+        digits = integer // 1000 ** group if group else integer
+        if group < n_groups - 1:
+            digits = np.where(digits < 1000, digits + 1000, digits % 1000)
+        else:
+            digits = digits + 1000
+        if group == 0:
+            digits[missing] = 2000
+        table = CSV_UNITS if group == 0 else CSV_THOUSANDS
+        fields[..., 3 * (n_groups - group) - 2:3 * (n_groups - group) + 1] = np.take(table, digits, axis=0)
+    fields[..., 3 * n_groups + 1:3 * n_groups + 5] = np.take(CSV_DECIMALS, high, axis=0)
+    if low is not None:
+        fields[..., -4:-1] = np.take(CSV_LAST_DECIMALS, low, axis=0)
+    fields[..., -1] = ord(",")
+    fields[:, -1, -1] = ord("\n")
+
+    year_bytes = np.array(years, dtype="S").view(np.uint8).reshape(len(years), -1)
+    text = np.hstack((year_bytes, fields.reshape(len(years), -1))).ravel()
+    return text[text != 0].tobytes().decode("ascii")
+
+
 # Incomplete. Doesn't account yet for varying precision standards for RWL files (lines ending in 999 vs -9999)
 def write_rwl(data, file):
     for series in data.columns:
@@ -162,10 +325,101 @@ def write_rwl(data, file):
         file.write("\n")
 
 
-def write_crn(data, site_id, file, site_name="Unnamed object", species_code="UNKN", location="Unknown", species="Plantae", elevation="", lat_long="", investigator="", comp_date=""):
-    rwi_data = chron(detrend(data, fit="spline", method="residual", plot=False), prewhiten=True)
-    first = rwi_data.first_valid_index()
-    last = rwi_data.last_valid_index()
+# Writes the same file as write_rwl, but formats and lays out all the values of the dataframe
+# at once. Dataframes that write_rwl can't read as consecutive years of numeric series with
+# text names are handed over to write_rwl, so both writers fail the same way too.
+def write_rwl_numpy(data, file):
+    years = data.index.to_numpy()
+    names = data.columns.to_numpy()
+    if (data.empty or not data.columns.is_unique or years.dtype.kind not in "iu"
+            or not all(isinstance(name, str) for name in names)
+            or not all(dtype.kind in "iuf" for dtype in data.dtypes)):
+        write_rwl(data, file)
+        return
+    years = years.astype(np.int64)
+    values = data.to_numpy(dtype=float).T
+    valid = ~np.isnan(values)
+    if not np.array_equal(years, np.arange(years[0], years[0] + len(years))) or not valid.any(axis=1).all():
+        write_rwl(data, file)
+        return
+
+    # Values of each series in turn, from its first to its last year. Lines start at the first
+    # year, after a gap and at every decade; gaps and the end of a series are marked with
+    # -9999, on a line of its own when it falls at the start of a decade.
+    gap = np.ones((len(names), 1), dtype=bool)
+    after_gap = np.hstack((gap, ~valid[:, :-1]))[valid]
+    before_gap = np.hstack((~valid[:, 1:], gap))[valid]
+    series, rows = np.nonzero(valid)
+    rings = years[rows]
+    starts_line = after_gap | (rings % 10 == 0)
+    ends_line = (rings + 1) % 10 == 0
+    marked_line = ends_line & before_gap
+    parts = rwl_header_parts(names, years)
+
+    prefix = place(rwl_headers(parts, series[starts_line], rows[starts_line]), starts_line, np.full(len(rings), ""))
+    suffix = np.where(before_gap, str(-9999).rjust(6) + "\n", np.where(ends_line, "\n", ""))
+    marked = np.char.add(np.char.add("\n", rwl_headers(parts, series[marked_line], rows[marked_line] + 1)), suffix[marked_line])
+    suffix = place(marked, marked_line, suffix)
+    lines = np.char.add(np.char.add(prefix, rwl_values(values[valid])), suffix)
+    file.write("".join(lines.tolist()))
+
+
+# Copy of `others` with the positions where `mask` is set replaced by `strings`
+def place(strings, mask, others):
+    placed = others.astype(np.result_type(strings, others))
+    placed[mask] = strings
+    return placed
+
+
+# Parts of the line headers written by write_rwl, for the series and years (plus the year after
+# the last) of a dataframe: each name padded to 8 characters, or to 7 for negative years, and
+# each year right-aligned in 4 characters, or in 5 if negative
+def rwl_header_parts(names, years):
+    years = np.append(years, years[-1] + 1)
+    padded_names = np.array([[name.ljust(8), name.ljust(7)] for name in names])
+    padded_years = np.array([str(year).rjust(5 if year < 0 else 4) for year in years.tolist()])
+    return padded_names, padded_years, (years < 0).astype(int)
+
+
+# Line headers of the given series (column numbers) and years (row numbers)
+def rwl_headers(parts, series, rows):
+    padded_names, padded_years, negative = parts
+    return np.char.add(padded_names[series, negative[rows]], padded_years[rows])
+
+
+# Formats values as f"{value:.3f}".lstrip('0').replace('.', '').rjust(4, '0').rjust(6) does:
+# the value in thousandths, zero-padded to 4 digits, with the sign of the value in front.
+def rwl_values(values):
+    thousandths = np.abs(values) * 1000
+    # Values rounding up or down depending on the last bits of the product above, and values
+    # too large (or infinite) to go through int64, are formatted one at a time instead
+    with np.errstate(invalid="ignore"):
+        fraction = np.abs(thousandths - np.floor(thousandths) - 0.5)
+    exact = np.isfinite(thousandths) & (thousandths < 1e9) & (fraction > 1e-6)
+    digits = np.where(exact, np.rint(thousandths), 0).astype(np.int64).astype(str)
+    signs = np.where(np.signbit(values), "-", "")
+    formatted = np.char.rjust(np.char.add(signs, np.char.zfill(digits, 4)), 6)
+    if not exact.all():
+        others = [f"{value:.3f}".lstrip('0').replace('.', '').rjust(4, '0').rjust(6) for value in values[~exact]]
+        formatted = place(np.array(others), ~exact, formatted)
+    return formatted
+
+
+# Writes the chronology of the data, computing it from the spline detrended data unless one is given
+# Writes the crn chronology of the data: chron_data if given, otherwise the chronology of rwi_data,
+# or of the data detrended with a spline
+def write_crn(data, site_id, file, site_name="Unnamed object", species_code="UNKN", location="Unknown", species="Plantae", elevation="", lat_long="", investigator="", comp_date="", chron_data=None, rwi_data=None):
+    if chron_data is None:
+        if rwi_data is None:
+            rwi_data = detrend(data, fit="spline", method="residual", plot=False)
+        chron_data = chron(rwi_data, plot=False)
+    write_crn_chron(chron_data, site_id, file, site_name, species_code, location, species, elevation, lat_long, investigator, comp_date)
+
+
+def write_crn_chron(chron_data, site_id, file, site_name="Unnamed object", species_code="UNKN", location="Unknown", species="Plantae", elevation="", lat_long="", investigator="", comp_date=""):
+    check_chron_columns(chron_data, ["Mean RWI", "Sample depth"])
+    first = chron_data.first_valid_index()
+    last = chron_data.last_valid_index()
 
     # For header, to be improved upon eventually
     file.write(site_id.ljust(9) + site_name.ljust(61) + species_code.ljust(4) + "\n")
@@ -173,15 +427,15 @@ def write_crn(data, site_id, file, site_name="Unnamed object", species_code="UNK
     file.write(site_id.ljust(9) + investigator.ljust(73) + comp_date.ljust(8) + "\n")
     
     file.write(site_id.rjust(6))
-    file.write(str(rwi_data.first_valid_index()).rjust(4))
+    file.write(str(chron_data.first_valid_index()).rjust(4))
 
-    for year in rwi_data.index.to_numpy():
-        file.write(str(round(rwi_data["Mean RWI"][year], 2)).replace(".", "").replace("0", "").rjust(4))
-        file.write(str(rwi_data["Sample depth"][year]).rjust(3))
+    for year in chron_data.index.to_numpy():
+        file.write(str(round(chron_data["Mean RWI"][year], 2)).replace(".", "").replace("0", "").rjust(4))
+        file.write(str(chron_data["Sample depth"][year]).rjust(3))
         
         if year % 10 == 9:
             # write TRL ID#(optional) which takes columns 82-88 
-            if year + 1 in rwi_data.index.to_numpy():
+            if year + 1 in chron_data.index.to_numpy():
                 file.write("\n")
                 file.write(site_id.rjust(6))
                 file.write(str(year + 1).rjust(4))
@@ -190,50 +444,63 @@ def write_crn(data, site_id, file, site_name="Unnamed object", species_code="UNK
     file.write("9990  0")
 
 
-def write_txt(data, file):
+# Writes the txt summary of the data, detrending it with a spline and computing its prewhitened
+# chronology unless they are given
+def write_txt(data, file, rwi_data=None, chron_data=None):
+    if rwi_data is None:
+        rwi_data = detrend(data, fit="spline", method="residual", plot=False)
+    if chron_data is None:
+        chron_data = chron(rwi_data, prewhiten=True, plot=False)
+    write_txt_chron(data, rwi_data, chron_data, file)
+
+
+def write_txt_chron(data, rwi_data, chron_data, file):
+    # The sample depth, standard chronology of the detrended data (std) and that of
+    # its AR residuals (ars) come from one prewhitened chronology
+    check_chron_columns(chron_data, ["Mean RWI", "Mean Res", "Sample depth"])
     header = ["year", "num".rjust(7), "seg".rjust(7), "age".rjust(7), "raw".rjust(7), "std".rjust(7), "res".rjust(7), "ars".rjust(7)]
     file.write("    ".join(header))
     file.write("\n")
-    rwi_data = detrend(data, fit="spline", method="residual", plot=False)
-    rwi_chron = chron(rwi_data, prewhiten=False)
-    mean_res = chron(rwi_data, biweight=False, prewhiten=False)
-    ar_chron = chron(rwi_data, prewhiten=True)
 
-    first = rwi_chron.first_valid_index()
-    last = rwi_chron.last_valid_index()
+    first = chron_data.first_valid_index()
+    last = chron_data.last_valid_index()
+    years = np.arange(first, last + 1)
+    chron_data = chron_data.loc[years]
+
+    # Arithmetic mean of the detrended data (res), summed in series order as chron(biweight=False) does
+    rwi = rwi_data.reindex(years).to_numpy(dtype=float)
+    res = series_sums(rwi) / (~np.isnan(rwi)).sum(axis=1)
+
+    # Mean segment length, age and ring width of the series measured each year
+    raw = data.loc[years].to_numpy(dtype=float)
+    measured = ~np.isnan(raw)
+    depth = measured.sum(axis=1)
+    seg_lengths = data.notna().sum().to_numpy()
+    first_years = data.index.to_numpy()[data.notna().to_numpy().argmax(axis=0)]
+    seg = (measured * seg_lengths).sum(axis=1) / depth
+    age = (measured * (years[:, None] - first_years + 1)).sum(axis=1) / depth
+    raw = series_sums(raw) / depth
+
+    # double check what res and ars are supposed to be
+    # work on other columns
+    columns = zip(years.tolist(), chron_data["Sample depth"].tolist(), seg.tolist(), age.tolist(), raw.tolist(),
+                  chron_data["Mean RWI"].tolist(), res.tolist(), chron_data["Mean Res"].tolist())
+    for year, samp_dep, seg, age, raw, std, res, ars in columns:
+        line = [str(year).rjust(4), (f"{samp_dep:.3f}").rjust(7), (f"{seg:.3f}").rjust(7), (f"{age:.3f}").rjust(7), (f"{raw:.3f}").rjust(7), (f"{std:.3f}").rjust(7), (f"{res:.3f}").rjust(7), (f"{ars:.3f}").rjust(7),]
+        file.write("    ".join(line))
+        file.write("\n")
 
-    for year in range(first, last+1):
-        samp_dep = rwi_chron["Sample depth"][year]
-        
-        # standard chronology of detrended data
-        std = rwi_chron["Mean RWI"][year]
 
-        # residuals of detrended data?
-        res =  mean_res["Mean RWI"][year]
+# Raises an error if a chronology handed to the writers lacks some of the columns they write
+def check_chron_columns(chron_data, columns):
+    missing = [column for column in columns if column not in chron_data.columns]
+    if missing:
+        raise ValueError("Expected chron_data to have column(s) " + ", ".join(missing) + ", as computed by dpl.chron(rwi_data, prewhiten=True)")
 
-        # residuals of ar modeled data?
-        ars = ar_chron["Mean Res"][year]
-        
-        year_data = data.loc[[year]].dropna(axis=1)
-        column_names = year_data.columns
-        
-        seg = 0
-        age = 0
-        raw = 0
-        
-        for name in column_names:
-            seg += len(data[name].dropna())
-            age += year - data[name].first_valid_index() + 1
-            raw += data[name][year]
-        
-        seg = seg/len(column_names)
-        age = age/len(column_names)
-        raw = raw/len(column_names)
-
-        
 
-        # double check what res and ars are supposed to be
-        # work on other columns
-        line = [str(year).rjust(4), (f"{samp_dep:.3f}").rjust(7), (f"{seg:.3f}").rjust(7), (f"{age:.3f}").rjust(7), (f"{raw:.3f}").rjust(7), (f"{std:.3f}").rjust(7), (f"{res:.3f}").rjust(7), (f"{ars:.3f}").rjust(7),]
-        file.write("    ".join(line))
-        file.write("\n")
+# Sums of the values of each year (row) that aren't NaN, added up one series (column) after the
+# other like python's sum() would, so means come out exactly as in chron(biweight=False)
+def series_sums(values):
+    if values.shape[1] == 0:
+        return np.zeros(len(values))
+    return np.where(np.isnan(values), 0, values).cumsum(axis=1)[:, -1]
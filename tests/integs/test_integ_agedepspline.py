@@ -0,0 +1,23 @@
+import dplpy as dpl
+import dplpy.agedepspline as agedepspline
+import numpy as np
+import pandas as pd
+
+def test_ads_matches_dplR():
+    data = dpl.readers("./tests/data/rwl/ca533.rwl")
+    y = data["CAM041"].dropna().to_numpy()
+
+    expected = pd.read_csv("./tests/data/csv/ca533_adsR_Pos.csv")["x"].to_numpy()
+    np.testing.assert_allclose(agedepspline.ads_R2Py(y, nyrs0=22), expected, rtol=1e-9)
+    expected = pd.read_csv("./tests/data/csv/ca533_adsR_noPos.csv")["x"].to_numpy()
+    np.testing.assert_allclose(agedepspline.ads_R2Py(y, nyrs0=22, pos_slope=False), expected, rtol=1e-9)
+
+def test_ads_many_matches_single_series():
+    data = dpl.readers("./tests/data/rwl/ca533.rwl")
+    ys = [data[name].dropna().to_numpy() for name in data]
+
+    for pos_slope in (True, False):
+        curves = agedepspline.ads_many(ys, nyrs0=22, pos_slope=pos_slope)
+        assert len(curves) == len(ys)
+        for curve, y in zip(curves, ys):
+            np.testing.assert_allclose(curve, agedepspline.ads_R2Py(y, nyrs0=22, pos_slope=pos_slope), rtol=1e-12)
@@ -1,4 +1,5 @@
 import dplpy as dpl
+import pandas as pd
 
 def test_detrend_all_fits_residual():
     data = dpl.readers("./tests/data/csv/ca533.csv")
@@ -33,3 +34,27 @@ def test_detrend_all_fits_difference():
 #     horizontal_data = dpl.detrend(data, fit="horizontal", method="difference", plot=True)
 
 #     # TODO: assert detrended data for correctness
+
+def test_detrend_collection_matches_dataframe():
+    data = dpl.readers("./tests/data/csv/ca533.csv")
+    rwc = dpl.RingWidthCollection.from_dataframe(data)
+
+    rwi = dpl.detrend(rwc, fit="spline", method="residual", plot=False)
+
+    pd.testing.assert_frame_equal(rwi.to_dataframe(), dpl.detrend(data, fit="spline", method="residual", plot=False))
+    pd.testing.assert_frame_equal(dpl.chron(rwi, plot=False), dpl.chron(rwi.to_dataframe(), plot=False))
+
+def test_detrend_stream_matches_dataframe():
+    data = dpl.readers("./tests/data/rwl/ca533.rwl")
+    rwi = dpl.detrend(data, fit="spline", method="residual", plot=False)
+
+    for name, start_year, values in dpl.detrend(dpl.iter_series("./tests/data/rwl/ca533.rwl"), plot=False):
+        expected = rwi[name].loc[start_year:start_year + len(values) - 1]
+        pd.testing.assert_series_equal(pd.Series(values, index=expected.index, name=name), expected)
+
+def test_detrend_engines_match():
+    data = dpl.readers("./tests/data/rwl/co021.rwl")
+    rwi = dpl.detrend(data, fit="spline", method="residual", plot=False)
+
+    pd.testing.assert_frame_equal(dpl.detrend(data, plot=False, engine="numpy"), rwi)
+    pd.testing.assert_frame_equal(dpl.detrend(data, plot=False, engine="banded"), rwi, check_exact=False, rtol=1e-7)
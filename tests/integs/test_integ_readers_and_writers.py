@@ -69,4 +69,27 @@ def test_read_and_write_rwl_with_blanks(tmp_path):
 
     nm580_alt = dpl.readers(write_path + ".rwl")
 
-    pd.testing.assert_frame_equal(nm580, nm580_alt)
\ No newline at end of file
+    pd.testing.assert_frame_equal(nm580, nm580_alt)
+
+def test_read_rwl_numpy_engine():
+    for filename, header in [("ca533.rwl", False), ("ca667.rwl", True), ("co021.rwl", False),
+                             ("nm580l.rwl", True), ("th001.rwl", True), ("wwr.rwl", False)]:
+        expected = dpl.readers("./tests/data/rwl/" + filename, header=header)
+        result = dpl.readers("./tests/data/rwl/" + filename, header=header, engine="numpy")
+
+        pd.testing.assert_frame_equal(expected, result, check_exact=True)
+
+
+def test_read_many_directory():
+    sites, errors = dpl.read_many("./tests/data/rwl", header=True, n_jobs=2)
+
+    assert "ca667" in sites and errors == {}
+    pd.testing.assert_frame_equal(sites["ca667"], dpl.readers("./tests/data/rwl/ca667.rwl", header=True))
+
+
+def test_incremental_reader_last_line_without_break():
+    # the last line of these files has no line break
+    for filename, header in (("./tests/data/rwl/viet001.rwl", False), ("./tests/data/rwl/ca667.rwl", True)):
+        reader = dpl.IncrementalReader(filename, header=header)
+        pd.testing.assert_frame_equal(reader.read(), dpl.readers(filename, header=header), check_exact=True)
+        assert reader.pending == []
@@ -1,8 +1,21 @@
 import dplpy as dpl
+import pandas as pd
 
 def test_summary_methods():
     data = dpl.readers("./tests/data/csv/ca533.csv")
 
     dpl.summary(data)
     dpl.report(data)
-    dpl.stats(data)
\ No newline at end of file
+    dpl.stats(data)
+
+
+def test_stats_collection():
+    data = dpl.readers("./tests/data/csv/ca533.csv")
+
+    pd.testing.assert_frame_equal(dpl.stats(dpl.RingWidthCollection.from_dataframe(data)), dpl.stats(data))
+
+
+def test_stats_stream():
+    data = dpl.readers("./tests/data/rwl/ca533.rwl")
+
+    pd.testing.assert_frame_equal(dpl.stats(dpl.iter_series("./tests/data/rwl/ca533.rwl")), dpl.stats(data))
@@ -0,0 +1,33 @@
+import dplpy.agedepspline as agedepspline
+import numpy as np
+import pytest
+
+def test_ads_straight_line():
+    # the spline penalizes second differences, so it leaves a straight line as it is
+    y = np.linspace(2.0, 1.0, 20)
+    np.testing.assert_allclose(agedepspline.ads_R2Py(y, nyrs0=10), y)
+    np.testing.assert_allclose(agedepspline.ads_R2Py(list(y), nyrs0=10, pos_slope=False), y)
+
+def test_ads_long_series():
+    # longer than the 10000 rings the Fortran code was limited to
+    trend = np.linspace(2.0, 1.0, 20000)
+    y = trend + 0.1 * np.sin(np.arange(20000) * 2)
+    curve = agedepspline.ads_R2Py(y, nyrs0=10)
+    assert curve.shape == y.shape
+    assert np.abs(curve - trend).max() < 0.05
+
+def test_ads_many_lengths():
+    ys = [np.arange(3.0) ** 2, np.ones(5), np.arange(8.0) ** 2]
+    curves = agedepspline.ads_many(ys, nyrs0=5)
+    assert [len(curve) for curve in curves] == [3, 5, 8]
+    np.testing.assert_allclose(curves[1], np.ones(5))
+    np.testing.assert_allclose(curves[2], agedepspline.ads_R2Py(ys[2], nyrs0=5), rtol=1e-12)
+    assert agedepspline.ads_many([]) == []
+
+def test_ads_invalid_input():
+    with pytest.raises(ValueError) as errorMsg:
+        agedepspline.ads_many([np.ones(5), np.ones(2)])
+    assert "at least 3 data points" in str(errorMsg.value)
+    with pytest.raises(ValueError) as errorMsg:
+        agedepspline.ads_R2Py(np.ones(5), nyrs0=1.5)
+    assert "'nyrs0' must be an integer greater than 1" in str(errorMsg.value)
@@ -2,6 +2,7 @@ import dplpy as dpl
 import pandas as pd
 import numpy as np
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, Mock
 
 def mock_ar_sel_order_method(inp_ser, max_lag, ic='aic', old_names=False):
@@ -81,4 +82,17 @@ def test_autoreg_valid_input(mock_ar_sel_order: Mock):
     expected_res = pd.Series(data=[0.5, 0.5], 
                              index=pd.Index(data=['const', 'SeriesA.L1']))
     pd.testing.assert_series_equal(expected_res, actual_res)
-    mock_ar_sel_order.assert_called_once()
\ No newline at end of file
+    mock_ar_sel_order.assert_called_once()
+
+def test_ar_func_n_jobs():
+    rng = np.random.default_rng(3)
+    values = rng.random((40, 4)) + 0.5
+    values[:6, 1] = np.nan
+    values[30:, 2] = np.nan
+    data = pd.DataFrame(values, columns=["SeriesA", "SeriesB", "SeriesC", "SeriesD"],
+                        index=pd.Index(data=np.arange(1951, 1991), name="Year"))
+
+    expected_output = dpl.ar_func(data)
+    pd.testing.assert_frame_equal(expected_output, dpl.ar_func(data, n_jobs=2))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pd.testing.assert_frame_equal(expected_output, dpl.ar_func(data, executor=executor))
@@ -0,0 +1,54 @@
+import dplpy as dpl
+import os
+import pandas as pd
+
+def write_file(path, name, content):
+    file = path / name
+    file.write_text(content)
+    return str(file)
+
+def test_catalog_update_and_query(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_file(data, "siteA.rwl", "SeriesA 1001    10    30    50    70\n"
+                                  "SeriesB 1003   200   400   600   800 -9999\n"
+                                  "SeriesA 1005    90   999\n")
+    write_file(data, "siteB.csv", "Year,SeriesC,SeriesD\n1001,,0.2\n1002,0.3,0.4\n1003,0.5,\n")
+    write_file(data, "siteC.rwl", "SeriesE 10x1    10    30    50    70   999\n")
+
+    catalog = dpl.RingWidthCatalog(str(tmp_path / "catalog.sqlite"))
+    errors = catalog.update(str(data))
+    assert list(errors) == [str(data / "siteC.rwl")]
+    assert len(catalog) == 3
+
+    series = catalog.series()
+    assert series["series"].tolist() == ["SeriesA", "SeriesB", "SeriesC", "SeriesD"]
+    assert series["first_year"].tolist() == [1001, 1003, 1002, 1001]
+    assert series["last_year"].tolist() == [1005, 1006, 1003, 1002]
+    assert series["count"].tolist() == [5, 4, 2, 2]
+    assert series["precision"].tolist()[:2] == [0.01, 0.001]
+
+    files = catalog.files(start=1003, end=1005, min_series=2)
+    assert files["site"].tolist() == ["siteA"] and files["series"].tolist() == [2]
+    assert catalog.files(start=1002, end=1002)["site"].tolist() == ["siteA", "siteB"]
+    assert catalog.series(start=1001, end=1003, site="siteB")["series"].tolist() == []
+
+def test_catalog_refresh(tmp_path):
+    site = write_file(tmp_path, "siteA.rwl", "SeriesA 1001    10    30    50    70   999\n")
+    catalog = dpl.RingWidthCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.update(str(tmp_path / "*.rwl"))
+
+    # unchanged files aren't scanned again, even if their content was swapped in place
+    stat = os.stat(site)
+    write_file(tmp_path, "siteA.rwl", "SeriesZ 1001    10    30    50    70   999\n")
+    os.utime(site, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    catalog.update(str(tmp_path / "*.rwl"))
+    assert catalog.series()["series"].tolist() == ["SeriesA"]
+
+    os.utime(site, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    catalog.update(str(tmp_path / "*.rwl"))
+    assert catalog.series()["series"].tolist() == ["SeriesZ"]
+
+    os.remove(site)
+    catalog.update([])
+    assert len(catalog) == 0 and len(catalog.series()) == 0
@@ -0,0 +1,67 @@
+import dplpy as dpl
+import numpy as np
+import pandas as pd
+import pytest
+
+def make_input_df():
+    return pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7, np.nan, np.nan],
+                              "SeriesB": [np.nan, 0.4, np.nan, 0.8, 1.0, 1.2],
+                              "SeriesC": [np.nan, np.nan, np.nan, np.nan, np.nan, 1.6]},
+                        index=pd.Index(data=[1, 2, 3, 4, 5, 6], name="Year"))
+
+def test_from_dataframe_layout():
+    rwc = dpl.RingWidthCollection.from_dataframe(make_input_df())
+
+    assert rwc.names == ["SeriesA", "SeriesB", "SeriesC"]
+    assert np.array_equal(rwc.offsets, [0, 4, 9, 10])
+    assert np.array_equal(rwc.start_years, [1, 2, 6])
+    assert np.array_equal(rwc.end_years, [4, 6, 6])
+    assert np.array_equal(rwc["SeriesB"], [0.4, np.nan, 0.8, 1.0, 1.2], equal_nan=True)
+    assert np.array_equal(rwc.years("SeriesB"), [2, 3, 4, 5, 6])
+
+def test_series_are_views():
+    rwc = dpl.RingWidthCollection.from_dataframe(make_input_df())
+
+    assert np.shares_memory(rwc["SeriesA"], rwc.values)
+    assert np.shares_memory(rwc.series("SeriesA").to_numpy(), rwc.values)
+
+def test_dataframe_round_trip():
+    input_df = make_input_df()
+    rwc = dpl.RingWidthCollection.from_dataframe(input_df)
+
+    pd.testing.assert_frame_equal(rwc.to_dataframe(), input_df)
+
+def test_from_series():
+    rwc = dpl.RingWidthCollection.from_series([("SeriesA", 1, [0.1, 0.3]), ("SeriesB", 3, [0.5])])
+
+    expected_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, np.nan],
+                                     "SeriesB": [np.nan, np.nan, 0.5]},
+                               index=pd.Index(data=[1, 2, 3], name="Year"))
+    pd.testing.assert_frame_equal(rwc.to_dataframe(), expected_df)
+
+def test_from_dataframe_with_gaps_in_index():
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3]}, index=pd.Index(data=[1, 3], name="Year"))
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.RingWidthCollection.from_dataframe(input_df)
+    assert "dataframe index should be consecutive years" == str(errorMsg.value)
+
+def test_invalid_offsets():
+    with pytest.raises(ValueError):
+        dpl.RingWidthCollection([0.1, 0.2], [0, 1], [1], ["SeriesA"])
+
+def test_detrend_collection():
+    input_df = make_input_df()
+    rwc = dpl.RingWidthCollection.from_dataframe(input_df)
+
+    result = dpl.detrend(rwc, fit="horizontal", plot=False)
+
+    assert isinstance(result, dpl.RingWidthCollection)
+    pd.testing.assert_frame_equal(result.to_dataframe(), dpl.detrend(input_df, fit="horizontal", plot=False))
+
+def test_chron_collection():
+    input_df = make_input_df()
+    rwc = dpl.RingWidthCollection.from_dataframe(input_df)
+
+    pd.testing.assert_frame_equal(dpl.chron(rwc, biweight=False, plot=False),
+                                  dpl.chron(input_df, biweight=False, plot=False))
@@ -0,0 +1,60 @@
+import dplpy as dpl
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+def ring_widths():
+    values = np.array([[0.1, np.nan], [0.3, 0.2], [0.5, 0.4], [np.nan, 0.6]])
+    return pd.DataFrame(values, columns=["SeriesA", "SeriesB"],
+                        index=pd.Index(np.arange(-1, 3, dtype=np.int64), name="Year"))
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_columnar_round_trip(tmp_path, format):
+    data = ring_widths()
+    label = str(tmp_path / "site")
+    dpl.writers(data, label, format)
+    pd.testing.assert_frame_equal(dpl.readers(label + "." + format), data, check_exact=True)
+
+    # chronologies keep their integer sample depth
+    chron_data = pd.DataFrame({"Mean RWI": [0.9, 1.1, 1.0], "Sample depth": [1, 2, 2]},
+                              index=pd.Index([1001, 1002, 1003], name="Year"))
+    dpl.writers(chron_data, label + "_crn", format)
+    results = dpl.readers(label + "_crn." + format)
+    pd.testing.assert_frame_equal(results, chron_data, check_exact=True)
+    assert results["Sample depth"].dtype == np.int64
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_columnar_metadata_and_columns(tmp_path, format):
+    data = ring_widths()
+    file = str(tmp_path / ("site." + format))
+    dpl.write_columnar(data, file, metadata={"SeriesA": {"species": "PILO"}, "SeriesB": {"species": "PCGL"}})
+
+    results = dpl.read_columnar(file)
+    assert results.attrs["series"]["SeriesB"] == {"species": "PCGL"}
+    results = dpl.read_columnar(file, columns=["SeriesB"])
+    pd.testing.assert_frame_equal(results, data[["SeriesB"]], check_exact=True)
+    assert results.attrs["series"] == {"SeriesB": {"species": "PCGL"}}
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_columnar_writer_chunks(tmp_path, format):
+    data = ring_widths()
+    file = str(tmp_path / ("site." + format))
+    dpl.write_columnar(data, file, chunk_years=3)
+    pd.testing.assert_frame_equal(dpl.read_columnar(file), data, check_exact=True)
+
+    with dpl.ColumnarWriter(file) as writer:
+        writer.write(data.iloc[:2])
+        with pytest.raises(ValueError) as errorMsg:
+            writer.write(data.iloc[1:])
+        assert "Expected years after 0" in str(errorMsg.value)
+        with pytest.raises(ValueError):
+            writer.write(data.iloc[2:, :1])
+        writer.write(data.iloc[2:])
+    pd.testing.assert_frame_equal(dpl.read_columnar(file), data, check_exact=True)
+
+def test_columnar_invalid_format(tmp_path):
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.write_columnar(ring_widths(), str(tmp_path / "site.nc"))
+    assert "Accepted formats are parquet and arrow" in str(errorMsg.value)
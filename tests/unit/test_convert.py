@@ -0,0 +1,63 @@
+import dplpy as dpl
+import command
+import os
+import pandas as pd
+
+def write_rwl(path, name, content):
+    file = path / name
+    file.write_text(content)
+    return str(file)
+
+def test_convert(tmp_path, capsys):
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    write_rwl(tmp_path, "siteB.rwl", "SeriesB 1      200   4x0   600   800 -9999\n")
+    output_dir = tmp_path / "csv"
+
+    summary = dpl.convert(str(tmp_path), "csv", output_dir=str(output_dir), n_jobs=1)
+    assert summary["status"].tolist() == ["converted", "failed"]
+    assert summary["target"].tolist() == [str(output_dir / "siteA.csv"), str(output_dir / "siteB.csv")]
+    assert summary["error"][1].startswith("ValueError")
+    assert "Error reading line 1" in summary["error"][1] and "4x0" in summary["error"][1]
+    assert sorted(os.listdir(output_dir)) == ["siteA.csv"]
+    pd.testing.assert_frame_equal(dpl.readers(str(output_dir / "siteA.csv")),
+                                  dpl.readers(str(tmp_path / "siteA.rwl")))
+    capsys.readouterr()
+
+    # up to date targets are skipped, unless forced
+    summary = dpl.convert(str(tmp_path / "siteA.rwl"), "csv", output_dir=str(output_dir))
+    assert summary["status"].tolist() == ["skipped"]
+    summary = dpl.convert(str(tmp_path / "siteA.rwl"), "csv", output_dir=str(output_dir), force=True)
+    assert summary["status"].tolist() == ["converted"]
+    assert capsys.readouterr().out == ""
+
+def test_convert_keeps_target_on_failure(tmp_path):
+    source = write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    dpl.convert(source, "rwl", output_dir=str(tmp_path / "rwl"))
+    target = tmp_path / "rwl" / "siteA.rwl"
+    before = target.read_text()
+
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    3x    50    70   999\n")
+    os.utime(source, ns=(0, os.stat(target).st_mtime_ns + 10 ** 9))
+    summary = dpl.convert(source, "rwl", output_dir=str(tmp_path / "rwl"))
+    assert summary["status"].tolist() == ["failed"]
+    assert target.read_text() == before
+    assert os.listdir(tmp_path / "rwl") == ["siteA.rwl"]
+
+def test_convert_command(tmp_path, capsys):
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    write_rwl(tmp_path, "siteB.rwl", "SeriesB 1      200   400   600   800 -9999\n")
+
+    assert command.main(["convert", str(tmp_path / "*.rwl"), "--to", "csv", "--jobs", "2"]) == 0
+    output = capsys.readouterr().out
+    assert "2 converted, 0 skipped (up to date), 0 failed" in output
+    assert os.path.exists(tmp_path / "siteA.csv") and os.path.exists(tmp_path / "siteB.csv")
+
+    assert command.main(["convert", str(tmp_path / "siteA.rwl"), str(tmp_path / "siteC.rwl"), "--to", "csv"]) == 1
+    output = capsys.readouterr().out
+    assert "0 converted, 1 skipped (up to date), 1 failed" in output
+
+    # the line a file failed on is reported
+    write_rwl(tmp_path, "siteD.rwl", "SeriesD 1      200   4x0   600   800 -9999\n")
+    assert command.main(["convert", str(tmp_path / "siteD.rwl"), "--to", "csv"]) == 1
+    output = capsys.readouterr().out
+    assert "Error reading line 1" in output and "4x0" in output
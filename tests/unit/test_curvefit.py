@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 import dplpy.curvefit as curvefit
 from unittest.mock import patch, Mock
 
@@ -72,3 +73,75 @@ def test_linear_bounds_true(mock_scipy_curve_fit: Mock):
     res = curvefit.linear(input_x, input_y, bounds=True)
     mock_scipy_curve_fit.assert_called()
     assert np.array_equal(res, [2.2, 4.2, 6.2, 8.2, 10.2, 12.2, 14.2, 16.2])
+
+
+def test_negex_many():
+    x = np.arange(1, 201)
+    ys = [curvefit.negex_function(x[:length], a, b, k)
+          for length, a, b, k in [(200, 1.5, -0.02, 0.4), (120, 0.8, -0.05, 0.2), (60, 0.3, -0.1, 1.0)]]
+
+    curves, params, converged = curvefit.negex_many(ys)
+    assert converged.all()
+    for curve, y in zip(curves, ys):
+        np.testing.assert_allclose(curve, y, rtol=1e-6)
+    np.testing.assert_allclose(params[1], [0.8, -0.05, 0.2], rtol=1e-4)
+
+    # warm started from their own fits
+    curves, _, converged = curvefit.negex_many(ys, p0=params)
+    assert converged.all()
+    np.testing.assert_allclose(curves[2], ys[2], rtol=1e-6)
+
+
+def test_hugershoff_many():
+    x = np.arange(1, 151)
+    ys = [curvefit.hugershoff_function(x[:length], a, b, c, d)
+          for length, a, b, c, d in [(150, 0.2, 0.8, -0.03, 0.3), (90, 0.5, 0.3, -0.02, 0.5)]]
+
+    curves, params, converged = curvefit.hugershoff_many(ys)
+    assert converged.all()
+    assert params.shape == (2, 4)
+    for curve, param, y in zip(curves, params, ys):
+        # d is bounded by the values of the series, so the curves can't be recovered exactly
+        assert min(y) <= param[3] <= max(y)
+        np.testing.assert_allclose(curve, curvefit.hugershoff_function(np.arange(1, len(y) + 1), *param))
+        np.testing.assert_allclose(np.sum((curve - y) ** 2), np.sum((curvefit.hugershoff(None, y) - y) ** 2), rtol=1e-6)
+
+
+def test_fit_many_too_few_values():
+    with pytest.raises(ValueError) as errorMsg:
+        curvefit.negex_many([np.array([0.5, 0.4, 0.3]), np.array([0.5, 0.4])])
+    assert "at least 3 values" in str(errorMsg.value)
+    assert curvefit.negex_many([])[0] == []
+
+
+def test_linear_columns():
+    x = np.array([1801, 1802, 1803, 1804, 1805, 1806])
+    y = np.array([[0.1, np.nan, 0.9],
+                  [0.4, 0.8, 0.7],
+                  [0.2, 0.7, 0.8],
+                  [0.6, 0.5, np.nan],
+                  [0.5, 0.4, 0.5],
+                  [0.9, 0.2, 0.6]])
+
+    res = curvefit.linear(x, y)
+    for j in range(3):
+        measured = ~np.isnan(y[:, j])
+        expected = np.polyval(np.polyfit(x[measured] - 1800, y[measured, j], 1), x - 1800)
+        np.testing.assert_allclose(res[:, j], expected)
+
+    # positive slopes are held at zero
+    res = curvefit.linear(x, y, bounds=True)
+    np.testing.assert_allclose(res[:, 0], np.full(6, np.mean(y[:, 0])))
+    np.testing.assert_allclose(res[1:, 1], curvefit.linear(x, y)[1:, 1])
+
+
+def test_horizontal_columns():
+    x = np.array([1, 2, 3, 4])
+    y = np.array([[0.1, np.nan, np.nan],
+                  [0.2, 0.4, np.nan],
+                  [0.3, 0.8, np.nan],
+                  [0.6, np.nan, np.nan]])
+
+    res = curvefit.horizontal(x, y)
+    np.testing.assert_allclose(res[:, :2], [[0.3, 0.6]] * 4)
+    assert np.isnan(res[:, 2]).all()
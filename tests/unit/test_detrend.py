@@ -1,6 +1,8 @@
 import dplpy as dpl
 import pandas as pd
+import numpy as np
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, Mock
 
 def mock_spline_method(x, inp_arr, period):
@@ -224,4 +226,125 @@ def test_detrend_invalid_fit():
 
 
 def test_detrend_invalid_method():
-    pass
\ No newline at end of file
+    pass
+
+
+@patch('detrend.spline')
+def test_detrend_stream(mock_spline: Mock):
+    mock_spline.side_effect = mock_spline_method
+
+    series = iter([("SeriesA", 3, [0.1, np.nan, 0.5]), ("SeriesB", -2, [0.2, 0.4])])
+    results = dpl.detrend(series, method='difference', plot=False)
+
+    name, start_year, values = next(results)
+    assert (name, start_year) == ("SeriesA", 3)
+    np.testing.assert_array_equal(values, [0.0, np.nan, 0.0])
+    assert [(name, start_year) for name, start_year, values in results] == [("SeriesB", -2)]
+
+
+def test_detrend_numpy_engine():
+    rng = np.random.default_rng(0)
+    values = rng.random((40, 5)) + 0.5
+    values[:10, 1] = np.nan # shorter series
+    values[20, 2] = np.nan # gap
+    values[:10, 4] = np.nan # same years as SeriesB, fitted in the same solve
+    input_df = pd.DataFrame(values, columns=["SeriesA", "SeriesB", "SeriesC", "SeriesD", "SeriesE"],
+                            index=pd.Index(np.arange(1801, 1841), name="Year"))
+
+    for method in ("residual", "difference"):
+        expected_df = dpl.detrend(input_df, method=method, plot=False)
+        result_df = dpl.detrend(input_df, method=method, plot=False, engine="numpy")
+        pd.testing.assert_frame_equal(expected_df, result_df, check_exact=False, rtol=1e-12)
+
+    collection = dpl.RingWidthCollection.from_dataframe(input_df)
+    result_df = dpl.detrend(collection, plot=False, engine="numpy").to_dataframe()
+    pd.testing.assert_frame_equal(dpl.detrend(input_df, plot=False), result_df, check_exact=False, rtol=1e-12)
+
+
+@patch('detrend.spline')
+def test_detrend_period_per_series(mock_spline: Mock):
+    periods = {}
+    def record_period(x, inp_arr, period):
+        periods[len(x)] = period
+        return inp_arr
+    mock_spline.side_effect = record_period
+
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7],
+                                  "SeriesB": [np.nan, 0.4, 0.6, 0.8]},
+                            index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+    dpl.detrend(input_df, plot=False, period={"SeriesB": 20})
+    assert periods == {4: None, 3: 20}
+
+
+def test_detrend_invalid_engine():
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.detrend(pd.DataFrame(), plot=False, engine="fortran")
+    assert "Accepted engines are 'python', 'numpy' and 'banded'" in str(errorMsg.value)
+
+
+def test_detrend_numpy_engine_curves():
+    years = np.arange(1, 81)
+    input_df = pd.DataFrame({"SeriesA": 1.2 * np.exp(-0.04 * years) + 0.3,
+                             "SeriesB": 0.9 * np.exp(-0.02 * years) + 0.5,
+                             "SeriesC": 0.6 * np.exp(-0.08 * years) + 0.4},
+                            index=pd.Index(years + 1800, name="Year"))
+    input_df.iloc[:20, 1] = np.nan
+    input_df.iloc[:78, 2] = np.nan # too short to fit together, fitted on its own
+
+    for fit in ("ModNegEx", "Hugershoff"):
+        expected_df = dpl.detrend(input_df, fit=fit, method="difference", plot=False)
+        result_df = dpl.detrend(input_df, fit=fit, method="difference", plot=False, engine="numpy")
+        pd.testing.assert_frame_equal(expected_df, result_df, check_exact=False, atol=1e-5)
+
+
+def test_detrend_lines():
+    rng = np.random.default_rng(1)
+    values = rng.random((30, 3)) + 0.5 + np.linspace(0, 1, 30)[:, None]
+    values[:5, 1] = np.nan
+    values[12, 2] = np.nan
+    input_df = pd.DataFrame(values, columns=["SeriesA", "SeriesB", "SeriesC"],
+                            index=pd.Index(np.arange(1901, 1931), name="Year"))
+
+    for fit in ("linear", "horizontal"):
+        for method in ("residual", "difference"):
+            expected_df = pd.concat([dpl.detrend(input_df[column], fit=fit, method=method, plot=False)
+                                     for column in input_df], axis=1).reindex(input_df.index)
+            result_df = dpl.detrend(input_df, fit=fit, method=method, plot=False)
+            pd.testing.assert_frame_equal(expected_df, result_df, check_exact=False, rtol=1e-6)
+
+
+@patch('detrend.spline')
+def test_detrend_keeps_gaps(mock_spline: Mock):
+    mock_spline.side_effect = lambda x, inp_arr, period: inp_arr / 2
+
+    input_series = pd.Series([np.nan, 0.3, np.nan, 0.5, 0.6], name="SeriesA",
+                             index=pd.Index(data=[1, 2, 3, 4, 5], name="Year"))
+    expected_series = pd.Series([np.nan, 2.0, np.nan, 2.0, 2.0], name="SeriesA",
+                                index=pd.Index(data=[1, 2, 3, 4, 5], name="Year"))
+    pd.testing.assert_series_equal(dpl.detrend(input_series, plot=False), expected_series)
+    pd.testing.assert_frame_equal(dpl.detrend(input_series.to_frame(), plot=False), expected_series.to_frame())
+
+
+def test_detrend_n_jobs():
+    rng = np.random.default_rng(2)
+    years = np.arange(1, 61)
+    values = (0.8 * np.exp(-0.03 * years) + 0.4)[:, None] + 0.05 * rng.random((60, 5))
+    values[:15, 1] = np.nan
+    values[40:, 3] = np.nan
+    input_df = pd.DataFrame(values, columns=["SeriesA", "SeriesB", "SeriesC", "SeriesD", "SeriesE"],
+                            index=pd.Index(years + 1900, name="Year"))
+
+    for fit in ("spline", "ModNegEx"):
+        expected_df = dpl.detrend(input_df, fit=fit, plot=False)
+        pd.testing.assert_frame_equal(expected_df, dpl.detrend(input_df, fit=fit, plot=False, n_jobs=2))
+        for engine in ("numpy", "banded"):
+            result_df = dpl.detrend(input_df, fit=fit, plot=False, engine=engine, n_jobs=2)
+            pd.testing.assert_frame_equal(expected_df, result_df, check_exact=False, atol=1e-5)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result_df = dpl.detrend(input_df, plot=False, executor=executor)
+    pd.testing.assert_frame_equal(dpl.detrend(input_df, plot=False), result_df)
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.detrend(input_df, plot=False, n_jobs=0)
+    assert "n_jobs should be a positive integer or None" == str(errorMsg.value)
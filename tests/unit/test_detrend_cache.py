@@ -0,0 +1,80 @@
+import dplpy as dpl
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+def make_frame():
+    rng = np.random.default_rng(4)
+    years = np.arange(1, 51)
+    values = (0.9 * np.exp(-0.04 * years) + 0.5)[:, None] + 0.05 * rng.random((50, 3))
+    values[:10, 1] = np.nan
+    return pd.DataFrame(values, columns=["SeriesA", "SeriesB", "SeriesC"],
+                        index=pd.Index(years + 1900, name="Year"))
+
+def test_repeated_detrend_uses_cache():
+    data = make_frame()
+    cache = dpl.DetrendCache()
+
+    cold = dpl.detrend(data, plot=False, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 3)
+    with patch('detrend.spline') as mock_spline:
+        warm = dpl.detrend(data, method="difference", plot=False, cache=cache)
+        mock_spline.assert_not_called()
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    pd.testing.assert_frame_equal(cold, dpl.detrend(data, plot=False), check_exact=True)
+    pd.testing.assert_frame_equal(warm, dpl.detrend(data, method="difference", plot=False), check_exact=True)
+
+def test_changed_series_is_fitted_again():
+    data = make_frame()
+    cache = dpl.DetrendCache()
+    dpl.detrend(data, plot=False, cache=cache)
+
+    data.iloc[20, 2] += 0.1
+    dpl.detrend(data, plot=False, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 4)
+    dpl.detrend(data["SeriesC"], plot=False, cache=cache)
+    assert (cache.hits, cache.misses) == (3, 4)
+
+    # the fit and the period are part of the key
+    dpl.detrend(data, fit="ModNegEx", plot=False, cache=cache)
+    dpl.detrend(data, period=20, plot=False, cache=cache)
+    assert (cache.hits, cache.misses) == (3, 10)
+
+def test_disk_cache(tmp_path):
+    data = make_frame()
+    expected = dpl.detrend(data, fit="Hugershoff", plot=False, cache=dpl.DetrendCache(directory=str(tmp_path)))
+
+    cache = dpl.DetrendCache(directory=str(tmp_path))
+    with patch('curvefit.hugershoff') as mock_hugershoff:
+        result = dpl.detrend(data, fit="Hugershoff", plot=False, cache=cache)
+        mock_hugershoff.assert_not_called()
+    assert (cache.hits, cache.misses) == (3, 0)
+    pd.testing.assert_frame_equal(expected, result, check_exact=True)
+
+    cache.clear()
+    assert len(cache) == 0 and not list(tmp_path.glob("*.npy"))
+
+def test_eviction(tmp_path):
+    cache = dpl.DetrendCache(max_bytes=50 * 8, directory=str(tmp_path), max_disk_bytes=0)
+    dpl.detrend(make_frame(), plot=False, cache=cache)
+
+    assert len(cache) == 1 and cache.size == 50 * 8
+    assert not list(tmp_path.glob("*.npy"))
+
+def test_default_cache():
+    data = make_frame()
+    cache = dpl.DetrendCache()
+    previous = dpl.set_detrend_cache(cache)
+    try:
+        dpl.detrend(data, plot=False)
+        dpl.detrend(data, plot=False, n_jobs=2)
+        dpl.detrend(data, plot=False, cache=False)
+    finally:
+        dpl.set_detrend_cache(previous)
+    assert (cache.hits, cache.misses) == (3, 3)
+
+def test_invalid_cache_argument():
+    with pytest.raises(TypeError):
+        dpl.detrend(make_frame(), plot=False, cache=3)
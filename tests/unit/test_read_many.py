@@ -0,0 +1,50 @@
+import dplpy as dpl
+import pandas as pd
+import read_many
+import gzip
+
+def write_rwl(path, name, content):
+    file = path / name
+    file.write_text(content)
+    return str(file)
+
+def test_read_many_collects_errors(tmp_path, capsys):
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    write_rwl(tmp_path, "siteB.rwl", "SeriesB 1      200   4x0   600   800 -9999\n")
+
+    data, errors = dpl.read_many(str(tmp_path), n_jobs=1)
+
+    expected_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7]},
+                               index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+    assert list(data) == ["siteA"]
+    pd.testing.assert_frame_equal(data["siteA"], expected_df)
+    assert list(errors) == ["siteB"]
+    assert errors["siteB"].startswith("ValueError")
+    assert capsys.readouterr().out == ""
+
+def test_read_many_combine(tmp_path):
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    write_rwl(tmp_path, "siteB.rwl", "SeriesA 3      200   400 -9999\n")
+
+    data, errors = dpl.read_many(str(tmp_path / "*.rwl"), n_jobs=2, combine=True)
+
+    expected_df = pd.DataFrame(data=[[0.1, None], [0.3, None], [0.5, 0.2], [0.7, 0.4]],
+                               index=pd.Index(data=[1, 2, 3, 4], name="Year"),
+                               columns=pd.MultiIndex.from_tuples([("siteA", "SeriesA"), ("siteB", "SeriesA")],
+                                                                 names=["Site", "Series"]), dtype=float)
+    pd.testing.assert_frame_equal(data, expected_df)
+    assert errors == {}
+
+def test_site_names():
+    assert read_many.get_site_names(["a/ca533.rwl", "b/co021.rwl"]) == ["ca533", "co021"]
+    assert read_many.get_site_names(["a/ca533.rwl", "b/ca533.rwl"]) == ["a/ca533.rwl", "b/ca533.rwl"]
+    assert read_many.get_site_names(["a/ca533.rwl.gz", "b/co021.csv.xz"]) == ["ca533", "co021"]
+
+def test_read_many_compressed(tmp_path):
+    write_rwl(tmp_path, "siteA.rwl", "SeriesA 1       10    30    50    70   999\n")
+    with gzip.open(tmp_path / "siteB.rwl.gz", "wt") as file:
+        file.write("SeriesB 1      200   400   600   800 -9999\n")
+    write_rwl(tmp_path, "notes.txt.gz", "not a data file\n")
+
+    data, errors = dpl.read_many(str(tmp_path), n_jobs=1)
+    assert sorted(data) == ["siteA", "siteB"] and errors == {}
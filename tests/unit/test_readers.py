@@ -1,7 +1,13 @@
 import dplpy as dpl
 import pandas as pd
+import numpy as np
 import pytest
 import io
+import warnings
+import gzip
+import bz2
+import lzma
+import zipfile
 from unittest.mock import patch, Mock
 
 '''
@@ -164,3 +170,181 @@ def test_rwl_with_blank_lines(mock_open: Mock):
         results = dpl.readers("valid_rwl_with_blanks.rwl")
         mock_open.assert_called_once_with("valid_rwl_with_blanks.rwl", "r")
         pd.testing.assert_frame_equal(results, expected_df)
+
+'''
+    Test that an unknown parser engine raises an error with the expected message.
+'''
+def test_invalid_engine():
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.readers("filename.rwl", engine="fortran")
+    assert "unsupported parser engine 'fortran'" in str(errorMsg.value)
+
+'''
+    Given rwl files with negative years, both precisions, blank lines and
+    CRLF line endings, test that the numpy engine produces the same
+    dataframe as the python engine.
+'''
+@pytest.mark.parametrize("content", [
+    "SeriesA 1       10    30    50    70   999\nSeriesB 1      200   400   600   800 -9999\n",
+    "SeriesA  -12   100   300\nSeriesA  -10   500   700   999\r\nSeriesB   -9   200   400 -9999\r\n",
+    "SeriesA 1       10    30    50    70   999\n                                          \nSeriesB 1      200   400   600   800 -9999",
+])
+def test_numpy_engine_matches_python_engine(tmp_path, content):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(content.encode())
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected_df = dpl.readers(str(file))
+        results = dpl.readers(str(file), engine="numpy")
+    pd.testing.assert_frame_equal(results, expected_df, check_exact=True)
+
+'''
+    Test that the numpy engine falls back to reporting the same error as the
+    python engine for malformed files.
+'''
+def test_numpy_engine_malformed_rwl(tmp_path):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(b"SeriesA 1       10    3x    50    70   999\n")
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.readers(str(file), engine="numpy")
+    assert "Error reading file" in str(errorMsg.value)
+
+'''
+    Test that both engines reject a value field holding only letters, rather
+    than the numpy engine skipping it and shifting the next values a year back.
+'''
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("field", ["  abc ", "  NA  "])
+def test_letters_in_value_field(tmp_path, engine, field):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(("AB      1900   100" + field + "  200   999\n").encode())
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.readers(str(file), engine=engine)
+    assert "Error reading file" in str(errorMsg.value)
+
+'''
+    Test that memory mapping the file, and decoding it a few lines at a time,
+    gives the same dataframe as the python engine, with series split over
+    several blocks.
+'''
+@pytest.mark.parametrize("block_lines", [1, 2, 65536])
+def test_numpy_engine_memory_map(tmp_path, block_lines):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(b"SeriesA 1       10    30    50\r\nSeriesB 1      200   400   600   800 -9999\r\n"
+                     b"SeriesA 4       70   999\r\n")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected_df = dpl.readers(str(file))
+        with patch('readers.read_rwl_numpy.__defaults__', (block_lines,)):
+            results = dpl.readers(str(file), engine="numpy", memory_map=True)
+    pd.testing.assert_frame_equal(results, expected_df, check_exact=True)
+
+'''
+    Test that memory_map is passed on to pd.read_csv for csv files.
+'''
+@patch('pandas.read_csv')
+def test_csv_memory_map(mock_read_csv: Mock):
+    mock_read_csv.return_value = pd.DataFrame(data={"Year": [1, 2], "SeriesA": [0.1, 0.3]})
+
+    dpl.readers("valid_file.csv", memory_map=True)
+    mock_read_csv.assert_called_once_with("valid_file.csv", skiprows=0, memory_map=True)
+
+'''
+    Test that iter_series yields each series once its stop marker is read,
+    divided by its precision, with NaN for missing years.
+'''
+def test_iter_series(tmp_path):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(b"SeriesA  -12   100   300\nSeriesB    1   200         600   800 -9999\n"
+                     b"SeriesA  -10   500   700   999\n")
+
+    results = list(dpl.iter_series(str(file)))
+    assert [(name, start) for name, start, values in results] == [("SeriesB", 1), ("SeriesA", -12)]
+    np.testing.assert_array_equal(results[0][2], [0.2, 0.6, 0.8])
+    np.testing.assert_array_equal(results[1][2], [1.0, 3.0, 5.0, 7.0])
+
+    file.write_bytes(b"SeriesA    1   200   400   600   800 -9999\n\nSeriesB    1   200         600   800 -99x9\n")
+    with pytest.warns(UserWarning, match="Empty line found at line 2"):
+        with pytest.raises(ValueError) as errorMsg:
+            list(dpl.iter_series(str(file)))
+    assert "Error reading line 3" in str(errorMsg.value)
+
+'''
+    Test that a series without a stop marker is reported.
+'''
+def test_iter_series_missing_marker(tmp_path):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(b"SeriesA    1   200   400   600   800 -9999\nSeriesB    1   200   400\n")
+
+    series = dpl.iter_series(str(file))
+    assert next(series)[0] == "SeriesA"
+    with pytest.raises(ValueError) as errorMsg:
+        next(series)
+    assert "no stop marker found for series: SeriesB" == str(errorMsg.value)
+
+'''
+    Test that splitting a file between worker processes gives the same
+    dataframe and warnings as reading it serially, with series, and their
+    stop markers, spread over several parts of the file.
+'''
+@patch('readers.MIN_CHUNK_BYTES', 1)
+def test_numpy_engine_n_jobs(tmp_path):
+    file = tmp_path / "series.rwl"
+    file.write_bytes(b"HEADER LINE 1\nHEADER LINE 2\nHEADER LINE 3\n"
+                     b"SeriesA 1       10    30    50\nSeriesB 1      200   400   600   800 -9999\n\n"
+                     b"SeriesC   -3   200   400\nSeriesA 4       70   999\nSeriesC   -1   100   999\n")
+
+    with pytest.warns(UserWarning, match="Empty line found at line 6"):
+        expected_df = dpl.readers(str(file), header=True, engine="numpy")
+    with pytest.warns(UserWarning, match="Empty line found at line 6"):
+        results = dpl.readers(str(file), header=True, engine="numpy", n_jobs=4)
+    pd.testing.assert_frame_equal(results, expected_df, check_exact=True)
+    assert list(results.columns) == ["SeriesA", "SeriesB", "SeriesC"]
+
+def test_invalid_n_jobs():
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.readers("filename.rwl", engine="numpy", n_jobs=0)
+    assert "n_jobs should be a positive integer or None" == str(errorMsg.value)
+
+'''
+    Test that gzip, bzip2, xz and zip compressed files are read like the
+    uncompressed file, with both engines, and that zip archives holding
+    several files need the file to be named.
+'''
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_compressed_files(tmp_path, engine):
+    content = (b"Header line 1\r\nHeader line 2\r\nHeader line 3\r\n"
+               b"SeriesA 1       10    30    50\r\nSeriesB 1      200   400   600   800 -9999\r\n"
+               b"SeriesA 4       70   999\r\n")
+    (tmp_path / "series.rwl").write_bytes(content)
+    (tmp_path / "series.rwl.gz").write_bytes(gzip.compress(content))
+    (tmp_path / "series.rwl.bz2").write_bytes(bz2.compress(content))
+    (tmp_path / "series.rwl.xz").write_bytes(lzma.compress(content))
+    with zipfile.ZipFile(tmp_path / "series.rwl.zip", "w") as archive:
+        archive.writestr("series.rwl", content)
+    with zipfile.ZipFile(tmp_path / "network.zip", "w") as archive:
+        archive.writestr("sites/series.rwl", content)
+        archive.writestr("sites/other.rwl", content)
+
+    expected_df = dpl.readers(str(tmp_path / "series.rwl"), header=True)
+    for name in ["series.rwl.gz", "series.rwl.bz2", "series.rwl.xz", "series.rwl.zip", "network.zip/sites/series.rwl"]:
+        results = dpl.readers(str(tmp_path / name), header=True, engine=engine)
+        pd.testing.assert_frame_equal(results, expected_df, check_exact=True)
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.readers(str(tmp_path / "network.zip"))
+    assert "network.zip holds 2 files" in str(errorMsg.value)
+
+def test_compressed_csv_and_iter_series(tmp_path):
+    (tmp_path / "series.csv.gz").write_bytes(gzip.compress(b"Year,SeriesA\n1,0.1\n2,0.3\n"))
+    (tmp_path / "series.rwl.xz").write_bytes(lzma.compress(b"SeriesA 1       10    30    50    70   999\n"))
+
+    results = dpl.readers(str(tmp_path / "series.csv.gz"))
+    expected_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3]}, index=pd.Index(data=[1, 2], name="Year"))
+    pd.testing.assert_frame_equal(results, expected_df)
+
+    assert [(name, start) for name, start, values in dpl.iter_series(str(tmp_path / "series.rwl.xz"))] == [("SeriesA", 1)]
@@ -0,0 +1,60 @@
+import dplpy as dpl
+import os
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+RWL_LINES = "SeriesA 1       10    30    50    70   999\nSeriesB 1      200   400   600   800 -9999\n"
+
+def write_rwl(tmp_path, content=RWL_LINES):
+    file = tmp_path / "series.rwl"
+    file.write_text(content)
+    return str(file)
+
+def test_warm_read_uses_cache(tmp_path):
+    filename = write_rwl(tmp_path)
+    cache = dpl.ReadersCache(str(tmp_path / "cache"))
+
+    cold = dpl.readers(filename, cache=cache)
+    with patch('readers.process_rwl_pandas') as mock_process:
+        warm = dpl.readers(filename, cache=cache)
+        mock_process.assert_not_called()
+
+    pd.testing.assert_frame_equal(cold, warm, check_exact=True)
+    pd.testing.assert_frame_equal(dpl.readers(filename), warm, check_exact=True)
+
+def test_changed_file_is_read_again(tmp_path):
+    filename = write_rwl(tmp_path)
+    cache = dpl.ReadersCache(str(tmp_path / "cache"))
+    dpl.readers(filename, cache=cache)
+
+    write_rwl(tmp_path, RWL_LINES.replace("SeriesB 1      200", "SeriesB 1      900"))
+    os.utime(filename, ns=(1, 1))
+    result = dpl.readers(filename, cache=cache)
+
+    assert result["SeriesB"][1] == 0.9
+
+def test_options_are_part_of_the_key(tmp_path):
+    filename = write_rwl(tmp_path)
+    cache = dpl.ReadersCache(str(tmp_path / "cache"))
+
+    assert list(dpl.readers(filename, cache=cache).columns) == ["SeriesA", "SeriesB"]
+    assert list(dpl.readers(filename, skip_lines=1, cache=cache).columns) == ["SeriesB"]
+
+def test_warnings_are_replayed(tmp_path):
+    filename = write_rwl(tmp_path, RWL_LINES.replace("\nSeriesB", "\n\nSeriesB"))
+    cache = dpl.ReadersCache(str(tmp_path / "cache"))
+
+    for _ in range(2):
+        with pytest.warns(UserWarning, match="Empty line found at line 2"):
+            dpl.readers(filename, cache=cache)
+
+def test_eviction(tmp_path):
+    cache = dpl.ReadersCache(str(tmp_path / "cache"), max_bytes=0)
+    dpl.readers(write_rwl(tmp_path), cache=cache)
+
+    assert cache.size == 0
+
+def test_invalid_cache_argument(tmp_path):
+    with pytest.raises(TypeError):
+        dpl.readers(write_rwl(tmp_path), cache=3)
@@ -0,0 +1,85 @@
+import dplpy as dpl
+import numpy as np
+import pandas as pd
+import pytest
+import warnings
+
+LINES = [
+    b"Header line 1\n",
+    b"Header line 2\n",
+    b"Header line 3\n",
+    b"SeriesA -002    10    30    50    70   100   110   120   130   140   150\n",
+    b"SeriesA 1008    90   999\n",
+    b"SeriesB 1005   200   400   600   800\n",
+    b"SeriesB 1009   200   400 -9999\n",
+]
+
+def test_incremental_reader(tmp_path):
+    file = tmp_path / "station.rwl"
+    file.write_bytes(b"".join(LINES[:4]) + LINES[4][:10])
+
+    reader = dpl.IncrementalReader(str(file), header=True)
+    results = reader.read()
+    assert list(results.columns) == [] and reader.pending == ["SeriesA"]
+
+    # the line that was still being written is read once it is complete
+    with open(file, "ab") as station:
+        station.write(LINES[4][10:] + LINES[5])
+    results = reader.read()
+    assert list(results.columns) == ["SeriesA"] and reader.pending == ["SeriesB"]
+    assert results.index[0] == -2 and results.index[-1] == 1008
+
+    with open(file, "ab") as station:
+        station.write(LINES[6])
+    results = reader.read()
+    pd.testing.assert_frame_equal(results, dpl.readers(str(file), header=True), check_exact=True)
+    assert reader.offset == len(b"".join(LINES))
+
+def test_incremental_reader_rewritten_file(tmp_path):
+    file = tmp_path / "station.rwl"
+    file.write_bytes(b"".join(LINES))
+    reader = dpl.IncrementalReader(str(file), header=True)
+    reader.read()
+
+    file.write_bytes(b"".join(LINES[:3]) + LINES[5].replace(b"SeriesB", b"SeriesC") + LINES[6].replace(b"SeriesB", b"SeriesC"))
+    results = reader.read()
+    pd.testing.assert_frame_equal(results, dpl.readers(str(file), header=True), check_exact=True)
+    assert list(results.columns) == ["SeriesC"]
+
+def test_incremental_reader_error(tmp_path):
+    file = tmp_path / "station.rwl"
+    file.write_bytes(b"".join(LINES[:4]) + b"SeriesA 1008    9x   999\n")
+    reader = dpl.IncrementalReader(str(file), header=True)
+
+    with pytest.raises(ValueError) as errorMsg:
+        reader.read()
+    assert "Error reading line 5" in str(errorMsg.value)
+    assert reader.offset == len(b"".join(LINES[:4]))
+
+def test_incremental_reader_last_line_without_break(tmp_path):
+    file = tmp_path / "station.rwl"
+    file.write_bytes(b"".join(LINES[:6]) + LINES[6].rstrip(b"\n"))
+    reader = dpl.IncrementalReader(str(file), header=True)
+
+    results = reader.read()
+    assert list(results.columns) == ["SeriesA", "SeriesB"] and reader.pending == []
+
+    # the line break written afterwards is not an empty line
+    with open(file, "ab") as station:
+        station.write(b"\r\n")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        results = reader.read()
+    pd.testing.assert_frame_equal(results, dpl.readers(str(file), header=True), check_exact=True)
+    assert reader.offset == len(b"".join(LINES)) + 1
+
+def test_incremental_reader_keeps_built_values(tmp_path):
+    file = tmp_path / "station.rwl"
+    file.write_bytes(b"".join(LINES[:5]))
+    reader = dpl.IncrementalReader(str(file), header=True)
+    first = reader.read()
+
+    # refreshes don't copy or divide again the series already read
+    assert np.shares_memory(first.to_numpy(), reader.read().to_numpy())
+    with pytest.raises(ValueError):
+        first.iloc[0, 0] = 1.0
@@ -0,0 +1,100 @@
+import dplpy as dpl
+import pandas as pd
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILES = {
+    "/siteA.rwl": b"SeriesA 1       10    30    50    70   999\n",
+    "/siteB.rwl": b"SeriesB 1      200   400   600   800 -9999\n",
+    "/broken.rwl": b"SeriesB 1      200   4x0   600   800 -9999\n",
+}
+
+'''
+    Local stand-in for a data server: serves FILES with an ETag over keep-alive
+    connections, answers 503 to the first `failures` requests of a file, and
+    counts requests, connections and 304 responses.
+'''
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.counts["connections"] += 1
+
+    def do_GET(self):
+        counts = self.server.counts
+        counts["requests"] += 1
+        if self.server.failures.get(self.path, 0) > 0:
+            self.server.failures[self.path] -= 1
+            self.reply(503, b"")
+        elif self.path not in FILES:
+            self.reply(404, b"")
+        elif self.headers.get("If-None-Match") == '"v1"':
+            counts["not_modified"] += 1
+            self.reply(304, None)
+        else:
+            self.reply(200, FILES[self.path], {"ETag": '"v1"'})
+
+    def reply(self, status, body, headers={}):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.counts = {"requests": 0, "connections": 0, "not_modified": 0}
+    server.failures = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = "http://127.0.0.1:" + str(server.server_address[1])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_readers_url_many(server, capsys):
+    urls = [server.url + "/siteA.rwl", server.url + "/siteB.rwl", server.url + "/broken.rwl", server.url + "/missing.rwl"]
+
+    data, errors = dpl.readers_url_many(urls, n_jobs=1, backoff=0)
+    assert capsys.readouterr().out == ""
+
+    assert list(data) == urls[:2]
+    pd.testing.assert_frame_equal(data[urls[0]], dpl.readers_url(urls[0]))
+    pd.testing.assert_frame_equal(data[urls[1]], pd.DataFrame(data={"SeriesB": [0.2, 0.4, 0.6, 0.8]},
+                                                               index=pd.Index(data=[1, 2, 3, 4], name="Year")))
+    assert list(errors) == urls[2:]
+    assert errors[urls[2]].startswith("ValueError")
+    assert errors[urls[3]].startswith("ValueError: HTTP error 404")
+    # every request of the batch went over the same connection, plus one for readers_url
+    assert server.counts["connections"] == 2
+
+def test_readers_url_many_retries(server):
+    url = server.url + "/siteA.rwl"
+    server.failures[url[len(server.url):]] = 2
+
+    data, errors = dpl.readers_url_many([url], engine="python", backoff=0)
+    assert list(data) == [url] and errors == {}
+    assert server.counts["requests"] == 3
+
+    server.failures[url[len(server.url):]] = 2
+    data, errors = dpl.readers_url_many([url], retries=1, backoff=0)
+    assert errors[url] == "ValueError: HTTP error 503 fetching " + url
+
+def test_readers_url_many_cache(server, tmp_path):
+    urls = [server.url + "/siteA.rwl", server.url + "/siteB.rwl"]
+
+    first, _ = dpl.readers_url_many(urls, cache=str(tmp_path))
+    second, errors = dpl.readers_url_many(urls, cache=str(tmp_path))
+
+    assert server.counts["not_modified"] == 2 and errors == {}
+    for url in urls:
+        pd.testing.assert_frame_equal(first[url], second[url])
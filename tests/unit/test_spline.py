@@ -30,3 +30,14 @@ def test_spline(mock_csaps: Mock):
     x = np.arange(10)
     y = np.arange(0.1, 1.0)
     assert np.array_equal(spline.spline(x, y, period=0.5), y * 0.5)
+
+def test_spline_banded():
+    rng = np.random.default_rng(0)
+    xs = [np.arange(1801, 1841), np.delete(np.arange(-10, 90), [5, 6, 40]), np.arange(3), np.arange(2)]
+    ys = [rng.random(len(x)) + 0.5 for x in xs]
+    periods = [None, 30, -50, None]
+
+    results = spline.spline_banded(xs, ys, periods)
+    assert len(results) == 4
+    for x, y, period, yi in zip(xs, ys, periods, results):
+        np.testing.assert_allclose(yi, spline.spline(x, y, period), rtol=1e-9)
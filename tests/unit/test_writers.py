@@ -1,7 +1,10 @@
 import dplpy as dpl
 import pandas as pd
+import numpy as np
 import pytest
 import io
+import warnings
+import writers as writers_module
 
 open_wrapper = io.TextIOWrapper(
     io.BytesIO(),
@@ -62,6 +65,33 @@ def test_write_csv(tmpdir):
 
     
 
+def test_write_csv_numpy_engine(tmpdir):
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, float("nan"), 1234.5, -0.0, 2.0],
+                                  "SeriesB": [0.000123, 1e20, float("nan"), -12.25, 1000000.5]},
+                                index=pd.Index(data=[-1, 0, 1, 2, 3], name="Year"))
+
+    python_file = tmpdir.join('python.csv')
+    numpy_file = tmpdir.join('numpy.csv')
+    dpl.writers(input_df, python_file.strpath[:-4], "csv")
+    dpl.writers(input_df, numpy_file.strpath[:-4], "csv", engine="numpy")
+
+    expected_csv_lines = ['"Year","SeriesA","SeriesB"\n',
+                          '-1,0.1,0.000123\n',
+                          '0,NA,1e+20\n',
+                          '1,1234.5,NA\n',
+                          '2,-0.0,-12.25\n',
+                          '3,2.0,1000000.5\n']
+
+    assert expected_csv_lines == numpy_file.readlines()
+    assert python_file.read() == numpy_file.read()
+
+    # values with up to 3 decimals, written straight from their digits
+    input_df = input_df.round(3).fillna(0.25).clip(-1e6, 1e6)
+    dpl.writers(input_df, python_file.strpath[:-4], "csv")
+    dpl.writers(input_df, numpy_file.strpath[:-4], "csv", engine="numpy")
+    assert python_file.read() == numpy_file.read()
+
+
 def test_write_rwl(tmpdir):
     input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7], 
                                   "SeriesB": [0.2, 0.4, 0.6, 0.8]}, 
@@ -77,4 +107,137 @@ def test_write_rwl(tmpdir):
     assert expected_rwl_lines == file.readlines()
 
 
-#TODO: Add tests for crn and txt
\ No newline at end of file
+def test_write_rwl_numpy_engine(tmpdir):
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, float("nan"), 0.7, 1.25, 0.002, 12.5, 0.05, 2.0, 3.0, 1.0, 0.5, 0.25],
+                                  "LongSeriesName": [float("nan"), 0.4, 0.6, 0.8, -0.0004, 0.9995, 1.0, 2.0, 3.0, 4.0, float("nan"), float("nan"), float("nan")]},
+                                index=pd.Index(data=range(-4, 9), name="Year"))
+
+    python_file = tmpdir.join('python.rwl')
+    numpy_file = tmpdir.join('numpy.rwl')
+    dpl.writers(input_df, python_file.strpath[:-4], "rwl")
+    dpl.writers(input_df, numpy_file.strpath[:-4], "rwl", engine="numpy")
+
+    expected_rwl_lines = ['SeriesA   -4  0100  0300 -9999\n',
+                          'SeriesA   -1  0700\n',
+                          'SeriesA    0  1250  0002 12500  0050  2000  3000  1000  0500  0250 -9999\n',
+                          'LongSeriesName   -3  0400  0600  0800\n',
+                          'LongSeriesName   0 -0000  1000  1000  2000  3000  4000 -9999\n']
+
+    assert expected_rwl_lines == numpy_file.readlines()
+    assert python_file.read() == numpy_file.read()
+
+
+def test_write_rwl_infinite_values(tmpdir):
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, float("inf"), -float("inf"), 0.7]},
+                                index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+
+    python_file = tmpdir.join('python.rwl')
+    numpy_file = tmpdir.join('numpy.rwl')
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        dpl.writers(input_df, python_file.strpath[:-4], "rwl")
+        dpl.writers(input_df, numpy_file.strpath[:-4], "rwl", engine="numpy")
+    assert python_file.read() == numpy_file.read()
+
+
+def test_write_invalid_engine():
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7]},
+                                index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.writers(input_df, "label", "rwl", engine="fortran")
+    assert "unsupported writer engine 'fortran'" in str(errorMsg.value)
+
+
+def test_write_txt(tmpdir):
+    rng = np.random.default_rng(0)
+    input_df = pd.DataFrame(data={"SeriesA": 1 + rng.random(40),
+                                  "SeriesB": 1 + rng.random(40),
+                                  "SeriesC": 1 + rng.random(40)},
+                                index=pd.Index(data=range(1001, 1041), name="Year"))
+    input_df.loc[:1010, "SeriesB"] = np.nan
+    input_df.loc[1031:, "SeriesC"] = np.nan
+
+    file = tmpdir.join('output.txt')
+    dpl.writers(input_df, file.strpath[:-4], "txt")
+    lines = file.readlines()
+
+    assert lines[0].split() == ["year", "num", "seg", "age", "raw", "std", "res", "ars"]
+    assert len(lines) == 41
+    rwi_data = dpl.detrend(input_df, fit="spline", method="residual", plot=False)
+    for line, year in zip(lines[1:], range(1001, 1041)):
+        year_data = input_df.loc[year].dropna()
+        expected = [str(year), f"{len(year_data):.3f}",
+                    f"{input_df[year_data.index].notna().sum().mean():.3f}",
+                    f"{np.mean([year - input_df[name].first_valid_index() + 1 for name in year_data.index]):.3f}",
+                    f"{year_data.mean():.3f}",
+                    f"{rwi_data.loc[year].mean():.3f}"]
+        assert line.split()[:5] + [line.split()[6]] == expected
+
+
+def test_write_precomputed_chronology(tmpdir, monkeypatch):
+    rng = np.random.default_rng(1)
+    input_df = pd.DataFrame(data={"SeriesA": 1 + rng.random(30),
+                                  "SeriesB": 1 + rng.random(30)},
+                                index=pd.Index(data=range(1001, 1031), name="Year"))
+    rwi_data = dpl.detrend(input_df, fit="horizontal", plot=False)
+    chron_data = dpl.chron(rwi_data, prewhiten=True, plot=False)
+
+    expected = {}
+    for format in ["crn", "txt"]:
+        file = tmpdir.join('expected.' + format)
+        with open(file.strpath, "w") as output:
+            if format == "crn":
+                writers_module.write_crn_chron(chron_data, file.strpath[:-4], output)
+            else:
+                writers_module.write_txt_chron(input_df, rwi_data, chron_data, output)
+        expected[format] = file.read()
+
+    # nothing is detrended or averaged again
+    def fail(*args, **kwargs):
+        raise AssertionError("recomputed")
+    monkeypatch.setattr(writers_module, "detrend", fail)
+    monkeypatch.setattr(writers_module, "chron", fail)
+
+    file = tmpdir.join('expected.crn')
+    dpl.writers(input_df, file.strpath[:-4], "crn", chron_data=chron_data)
+    assert file.read() == expected["crn"]
+    file = tmpdir.join('expected.txt')
+    dpl.writers(input_df, file.strpath[:-4], "txt", rwi_data=rwi_data, chron_data=chron_data)
+    assert file.read() == expected["txt"]
+
+
+def test_write_crn_from_rwi(tmpdir):
+    rng = np.random.default_rng(2)
+    input_df = pd.DataFrame(data={"SeriesA": 1 + rng.random(30),
+                                  "SeriesB": 0.5 + np.linspace(1, 0, 30) + rng.random(30)},
+                                index=pd.Index(data=range(1001, 1031), name="Year"))
+    rwi_data = dpl.detrend(input_df, fit="linear", plot=False)
+    file = tmpdir.join('output.crn')
+
+    dpl.writers(input_df, file.strpath[:-4], "crn")
+    default = file.read()
+    dpl.writers(input_df, file.strpath[:-4], "crn", chron_data=dpl.chron(rwi_data, plot=False))
+    expected = file.read()
+    dpl.writers(input_df, file.strpath[:-4], "crn", rwi_data=rwi_data)
+    assert file.read() == expected
+    assert expected != default
+
+
+def test_write_invalid_chronology(tmpdir):
+    input_df = pd.DataFrame(data={"SeriesA": [0.1, 0.3, 0.5, 0.7]},
+                                index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+    chron_data = pd.DataFrame(data={"Mean RWI": [1.0, 0.9, 1.1, 1.0], "Sample depth": [1, 1, 1, 1]},
+                              index=pd.Index(data=[1, 2, 3, 4], name="Year"))
+    file = tmpdir.join('output.txt')
+
+    with pytest.raises(ValueError) as errorMsg:
+        dpl.writers(input_df, file.strpath[:-4], "txt", rwi_data=input_df, chron_data=chron_data)
+    assert "Expected chron_data to have column(s) Mean Res" in str(errorMsg.value)
+
+    with pytest.raises(TypeError) as errorMsg:
+        dpl.writers(input_df, file.strpath[:-4], "crn", chron_data=chron_data["Mean RWI"])
+    assert "Expected chron_data to be pandas dataframe" in str(errorMsg.value)
+
+
+#TODO: Add tests for crn
\ No newline at end of file